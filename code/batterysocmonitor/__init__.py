@@ -0,0 +1,38 @@
+#-------------------------------------------------------------------------------
+# BatterySoCMonitor
+#
+# Monitor the batteries state of charge and approximate the total battery
+#     capacity in hours.
+#
+# https://github.com/Andreas-Menzel/BatterySoCMonitor
+#-------------------------------------------------------------------------------
+# @author: Andreas Menzel
+# @license: MIT License
+# @copyright: Copyright (c) 2021 Andreas Menzel
+#-------------------------------------------------------------------------------
+#
+# The package can be imported without side effects. The modules only import
+#     what they need, so each command (see cli) loads only its own part:
+#
+#     cli           command line interface (monitor, analyze, report,
+#                       benchmark)
+#     monitor       monitoring of the battery
+#     analysis      analysis of existing log-files
+#     logfile       text and binary log-files
+#     estimators    approximation of the consumption
+#     phases        charge, discharge and idle phases
+#     sensors       sources of battery readings
+#     telemetry     system telemetry captured with the samples
+#     remote        several local and remote batteries (asyncio)
+#     timing        clocks, scheduler and profiler
+#     hooks         commands and events
+#     history       per-battery history of the runs
+#     checkpoint    checkpoint of a run (see --resume)
+#     metrics       OpenMetrics exporter
+#     workers       worker processes
+#     dashboard     live dashboard in the terminal
+#     benchmark     benchmarks of the startup and the hot paths
+#     output        output to the console and the log-file
+#-------------------------------------------------------------------------------
+
+script_version = '3.0.0'
@@ -0,0 +1,9 @@
+#-------------------------------------------------------------------------------
+# BatterySoCMonitor
+#
+# python -m batterysocmonitor <command> [options]
+#-------------------------------------------------------------------------------
+
+from .cli import main
+
+main()
@@ -0,0 +1,285 @@
+#-------------------------------------------------------------------------------
+# BatterySoCMonitor - analysis
+#
+# Analysis of existing log-files.
+#-------------------------------------------------------------------------------
+# @author: Andreas Menzel
+# @license: MIT License
+# @copyright: Copyright (c) 2021 Andreas Menzel
+#-------------------------------------------------------------------------------
+
+from array import array
+import os
+import sys
+
+from .estimators import consumption_from_rate, create_estimator, regression_consumption, rolling_median
+from .logfile import LogSink, percentage_to_human_form, read_log, seconds_to_human_form
+from . import output
+from .output import myPrint, close_log_sink
+from .phases import DischargeTimeline, PhaseDetector, plugged_from_secsleft, print_phase
+
+
+# sample_interval
+#
+# @param    dict    info    Information of the log-file (see read_log).
+#
+# @return   Returns the sample rate of the log-file or None if unknown.
+def sample_interval(info):
+    try:
+        return float(info['parameters']['sample_rate'])
+    except (KeyError, ValueError):
+        return None
+
+
+# analyze_log
+#
+# Recalculates the consumption of a log-file and splits it into charge,
+#     discharge and idle phases (one pass). Only the discharging samples are
+#     passed to the estimator, the time while the script was not running (see
+#     --resume) is removed like in the monitor command.
+#
+# @param    string  filename    Filename of the log-file.
+# @param    string  method      Method (see --estimator).
+# @param    int     window      Number of samples (see --window).
+#
+# @return   Returns a dictionary with the summary of the log-file.
+def analyze_log(filename, method='anchor', window=360):
+    info = {}
+    estimator = create_estimator(method, window)
+    detector = PhaseDetector()
+    timeline = DischargeTimeline()
+    times = array('d')
+    socs = array('d')
+    first = None
+    last = None
+    samples = 0
+    resumes = 0
+    for sample in read_log(filename, info):
+        if first == None:
+            first = sample
+        last = sample
+        samples += 1
+
+        if info['resumes'] != resumes:
+            resumes = info['resumes']
+            timeline.interrupt(sample_interval(info))
+
+        detector.update(sample.time, sample.soc, plugged_from_secsleft(sample.secsleft))
+        if detector.current.kind != 'discharge':
+            timeline.interrupt(sample_interval(info))
+            continue
+        time, soc = timeline.update(sample.time, sample.soc)
+        if method == 'regression':
+            times.append(time)
+            socs.append(soc)
+        else:
+            estimator.update(time, soc)
+
+    summary = {
+        'file': filename,
+        'version': info['version'],
+        'beautify': info['beautify'],
+        'samples': samples,
+        'time_executed': -1,
+        'soc_start': -1,
+        'soc_end': -1,
+        'secsleft_start': -1,
+        'secsleft_end': -1,
+        'corrected_percentages': info['corrected_percentages'],
+    }
+    if first != None:
+        summary['time_executed'] = round(last.time - first.time)
+        summary['soc_start'] = first.soc
+        summary['soc_end'] = last.soc
+        summary['secsleft_start'] = round(first.secsleft)
+        summary['secsleft_end'] = round(last.secsleft)
+    if method == 'regression':
+        summary['consumption'], summary['consumption_spp'], summary['consumption_sfb'] = -1, -1, -1
+        summary['consumption_low'], summary['consumption_high'] = -1, -1
+        # only the discharging samples (none in a log-file of a charge)
+        if len(times) >= 3:
+            consumption, low, high = regression_consumption(times, socs, window)
+            summary['consumption'], summary['consumption_spp'], summary['consumption_sfb'] = consumption_from_rate(float(rolling_median(consumption, window)[-1]))
+            summary['consumption_low'] = round(float(low[-1]), 2)
+            summary['consumption_high'] = round(float(high[-1]), 2)
+    else:
+        summary['consumption'], summary['consumption_spp'], summary['consumption_sfb'] = estimator.final()
+
+    summary.update(detector.statistics())
+    summary['phases'] = [phase.summary() for phase in detector.all_phases()]
+    summary['telemetry'] = dict((name, round(total / count, 2)) for name, (total, count) in info['telemetry'].items())
+    return summary
+
+
+# report_log
+#
+# Analyzes a log-file for the report (see analyze_log). Errors are returned
+#     instead of raised, so one file does not abort the report.
+#
+# @param    string  filename    Filename of the log-file.
+# @param    string  method      Method (see --estimator).
+# @param    int     window      Number of samples (see --window).
+#
+# @return   Returns the summary of the log-file (None if it was skipped) and
+#               the reason why it was skipped (None if not skipped).
+def report_log(filename, method='anchor', window=360):
+    try:
+        summary = analyze_log(filename, method, window)
+    except (OSError, UnicodeDecodeError, RuntimeError, ValueError) as e:
+        return None, str(e)
+    if summary['version'] == None:
+        return None, 'no BatterySoCMonitor header'
+    return summary, None
+
+
+# print_analysis
+#
+# Prints the summary of a log-file (see analyze_log).
+#
+# @param    dict    summary     Summary of the log-file.
+# @param    bool    beautify    Print in human readable form.
+#
+# @return   None
+def print_analysis(summary, beautify):
+    if beautify:
+        myPrint(seconds_to_human_form(summary['time_executed']), end='\t')
+        myPrint(percentage_to_human_form(summary['soc_start']), end='\t')
+        myPrint(percentage_to_human_form(summary['soc_end']), end='\t')
+        myPrint(percentage_to_human_form(summary['consumption']), '/ h', end='\t')
+        myPrint(seconds_to_human_form(summary['consumption_spp']), end='\t')
+        myPrint(seconds_to_human_form(summary['consumption_sfb']), end='\t')
+    else:
+        myPrint(summary['time_executed'], end='\t')
+        myPrint(summary['soc_start'], end='\t')
+        myPrint(summary['soc_end'], end='\t')
+        myPrint(summary['consumption'], end='\t')
+        myPrint(summary['consumption_spp'], end='\t')
+        myPrint(summary['consumption_sfb'], end='\t')
+    myPrint(summary['version'], summary['file'], sep='\t')
+
+
+# analyze
+#
+# Analyzes log-files and prints one summary row per file.
+#
+# @param    Namespace   args    Arguments of the analyze command.
+#
+# @return   None
+def analyze(args):
+    if args.log_file != None and args.log_file != '#NOT_SET#':
+        output.log_sink = LogSink(args.log_file, args.log_flush_size, args.log_flush_interval)
+
+    if args.beautify:
+        myPrint('timeExecuted\tbat %\tbat %\tconsumption\ttime / %\ttime / 100%\tversion\tfile')
+        myPrint('hh:mm:ss\t(start)\t(end)\t(median)\t(median)\t(median)')
+        myPrint('---------\t-------\t-------\t-----------\t---------\t---------\t-------\t----')
+    else:
+        myPrint('# <sec>\t<soc>\t<soc>\t<cons>\t<sec/%>\t<sec/100%>\t<version>\t<file>')
+
+    failed = False
+    for filename in args.log_files:
+        try:
+            summary = analyze_log(filename, args.estimator, args.window)
+        except (OSError, UnicodeDecodeError, RuntimeError, ValueError) as e:
+            myPrint('ERROR: could not analyze ' + filename + ':', e)
+            failed = True
+            continue
+        print_analysis(summary, args.beautify)
+        if summary['corrected_percentages'] > 0:
+            myPrint('# warning', filename, 'version ' + str(summary['version']) + ' wrote e.g. 30.08% as 30.80%, '
+                + str(summary['corrected_percentages']) + ' percentages were resolved by the previous row', sep='\t')
+        if args.verbose:
+            for phase in summary['phases']:
+                print_phase(phase, args.beautify)
+            for name, mean in summary['telemetry'].items():
+                myPrint('# telemetry_mean', name, mean, sep='\t')
+
+    close_log_sink()
+    if failed:
+        sys.exit(1)
+
+
+# find_log_files
+#
+# Expands directories and glob patterns to a list of log-files.
+#
+# @param    [string]    paths   Log-files, directories or glob patterns.
+#
+# @return   Returns the sorted list of log-files.
+def find_log_files(paths):
+    from glob import glob
+
+    filenames = []
+    for path in paths:
+        if os.path.isdir(path):
+            for entry in os.scandir(path):
+                if entry.is_file():
+                    filenames.append(entry.path)
+        elif os.path.isfile(path):
+            filenames.append(path)
+        else:
+            filenames += [f for f in glob(path) if os.path.isfile(f)]
+
+    return sorted(set(filenames))
+
+
+# report
+#
+# Analyzes many log-files in parallel and writes the summaries as one CSV or
+#     JSON report. Files that can not be read or have no header of
+#     BatterySoCMonitor (e.g. a README in the directory) are skipped and
+#     listed on stderr.
+#
+# @param    Namespace   args    Arguments of the report command.
+#
+# @return   None
+def report(args):
+    filenames = find_log_files(args.paths)
+    if len(filenames) == 0:
+        print('ERROR: report did not match any log-file')
+        sys.exit(1)
+
+    jobs = args.jobs
+    if jobs == None:
+        jobs = os.cpu_count() or 1
+    jobs = max(1, min(jobs, len(filenames)))
+
+    if jobs == 1:
+        results = [report_log(f, args.estimator, args.window) for f in filenames]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        from functools import partial
+
+        # send the files in chunks to keep the inter-process overhead small
+        chunksize = max(1, len(filenames) // (jobs * 4))
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            results = list(executor.map(partial(report_log, method=args.estimator, window=args.window), filenames, chunksize=chunksize))
+
+    summaries = []
+    for filename, (summary, reason) in zip(filenames, results):
+        if summary == None:
+            print('# skipped', filename, reason, sep='\t', file=sys.stderr)
+        else:
+            summaries.append(summary)
+    if len(summaries) == 0:
+        print('ERROR: report did not find any log-file of BatterySoCMonitor')
+        sys.exit(1)
+
+    if args.report_file != None:
+        f = open(args.report_file, 'w', newline='')
+    else:
+        f = sys.stdout
+
+    if args.report_format == 'json':
+        import json
+        json.dump(summaries, f, indent=2)
+        f.write('\n')
+    else:
+        import csv
+        # the phases and the telemetry are only included in the JSON report
+        writer = csv.DictWriter(f, fieldnames=[key for key in summaries[0].keys() if key not in ['phases', 'telemetry']], extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(summaries)
+
+    if f != sys.stdout:
+        f.close()
@@ -0,0 +1,396 @@
+#-------------------------------------------------------------------------------
+# BatterySoCMonitor - benchmark
+#
+# Benchmarks of the script and of its hot paths (the benchmark command).
+#-------------------------------------------------------------------------------
+# @author: Andreas Menzel
+# @license: MIT License
+# @copyright: Copyright (c) 2021 Andreas Menzel
+#-------------------------------------------------------------------------------
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from time import perf_counter
+
+
+# write_small_log
+#
+# Writes a small log-file (one hour, one sample per minute) for the startup
+#     benchmark of the analyze command.
+#
+# @param    string  filename    Filename of the log-file.
+#
+# @return   None
+def write_small_log(filename):
+    from . import script_version
+
+    with open(filename, 'w') as f:
+        f.write('# Welcome to BatterySoCMonitor version ' + script_version + '!\n')
+        f.write('# sample_rate\t:\t60\n\n')
+        f.write('# <sec>\t<soc>\t<until>\t<cons>\t<sec/%>\t<sec/100%>\n')
+        for minute in range(61):
+            f.write(str(minute * 60) + '\t' + str(round(100 - minute / 6, 2)) + '\t' + str(36000 - minute * 60) + '\t-1\t-1\t-1\n')
+
+
+# measure_command
+#
+# Runs a command repeatedly and measures the wall time until it terminated.
+#
+# @param    [string]    command     Command.
+# @param    int         repeat      Number of runs.
+#
+# @return   Returns the durations (in seconds) of the runs.
+def measure_command(command, repeat):
+    # the package is imported from the directory it is in, even if it is not
+    # installed
+    env = dict(os.environ)
+    path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env['PYTHONPATH'] = path + os.pathsep + env.get('PYTHONPATH', '')
+
+    durations = []
+    for _ in range(repeat):
+        started = perf_counter()
+        subprocess.run(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        durations.append(perf_counter() - started)
+    return durations
+
+
+# startup_benchmarks
+#
+# @param    int     repeat  Number of runs of each command.
+#
+# @return   Returns a list of (name, durations) tuples of the startup of the
+#               interpreter alone and of the commands.
+def startup_benchmarks(repeat):
+    script = [sys.executable, '-m', 'batterysocmonitor']
+    results = [('python', measure_command([sys.executable, '-c', 'pass'], repeat))]
+
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, 'small.log')
+        write_small_log(filename)
+        results.append(('version', measure_command(script + ['--version'], repeat)))
+        results.append(('analyze', measure_command(script + ['analyze', filename], repeat)))
+        results.append(('help', measure_command(script + ['monitor', '--help'], repeat)))
+    return results
+
+
+# measure_function
+#
+# Calls a function repeatedly and measures the duration of each call.
+#
+# @param    function    function    Function executing operations operations.
+# @param    int         repeat      Number of calls.
+# @param    int         operations  Number of operations per call.
+#
+# @return   Returns the durations (in seconds) of one operation.
+def measure_function(function, repeat, operations):
+    durations = []
+    for _ in range(repeat):
+        started = perf_counter()
+        function()
+        durations.append((perf_counter() - started) / operations)
+    return durations
+
+
+# tick_benchmark
+#
+# Measures one sample of the monitor command (sensor, estimator, phases,
+#     output) with a synthetic battery and a virtual clock (see --simulate).
+#     The run is repeated with few samples, so the difference contains
+#     neither the startup nor the summary.
+#
+# @param    int     repeat      Number of runs.
+# @param    int     samples     Number of samples of a run.
+#
+# @return   Returns the durations (in seconds) of one sample.
+def tick_benchmark(repeat, samples):
+    script = [sys.executable, '-m', 'batterysocmonitor', 'monitor', '--sample_rate', '1', '--output_rate', '1', '--simulate']
+    few = 100
+
+    # the battery is empty after the samples (one sample per second)
+    durations = []
+    for _ in range(repeat):
+        full = measure_command(script + ['synthetic:' + str(100 * 3600 / samples)], 1)[0]
+        short = measure_command(script + ['synthetic:' + str(100 * 3600 / few)], 1)[0]
+        durations.append(max(full - short, 0) / (samples - few))
+    return durations
+
+
+# estimator_benchmarks
+#
+# Measures one update of each estimator after samples and after 10 * samples
+#     samples of a synthetic discharge. The duration of one update must not
+#     grow with the number of samples (constant memory and time per sample),
+#     so the ratio of the long to the short run stays close to 1 (10 if an
+#     update is proportional to the samples). The regression is skipped if
+#     numpy is not installed.
+#
+# @param    int     repeat      Number of runs.
+# @param    int     samples     Number of samples of the short run.
+#
+# @return   Returns a list of (name, durations) tuples (durations of one
+#               update in seconds) and a list of (name, ratios) tuples
+#               (long / short of each run).
+def estimator_benchmarks(repeat, samples):
+    from .estimators import create_estimator, load_numpy
+
+    estimators = ['anchor', 'streaming']
+    if load_numpy() != None:
+        estimators.append('regression')
+
+    results = []
+    ratios = []
+    for name in estimators:
+        durations = {}
+        for count, suffix in [(samples, 'short'), (10 * samples, 'long')]:
+            def update_samples():
+                estimator = create_estimator(name, 360)
+                for sample in range(count):
+                    estimator.update(sample, 100 - sample / count * 100)
+            durations[suffix] = measure_function(update_samples, repeat, count)
+            results.append((name + '_' + suffix, durations[suffix]))
+        ratios.append((name, [long / short for short, long in zip(durations['short'], durations['long'])]))
+    return results, ratios
+
+
+# output_benchmark
+#
+# Measures myPrint of one data row to the console (os.devnull) and to a
+#     log-file.
+#
+# @param    int     repeat  Number of runs.
+#
+# @return   Returns the durations (in seconds) of one row.
+def output_benchmark(repeat):
+    from contextlib import redirect_stdout
+    from . import output
+    from .logfile import LogSink
+    from .output import myPrint
+
+    rows = 10000
+
+    def print_rows():
+        for row in range(rows):
+            myPrint(row, 87.65, 24570, 3.42, 1052, 105263, sep='\t')
+
+    with tempfile.TemporaryDirectory() as directory, open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        output.log_sink = LogSink(os.path.join(directory, 'output.log'), 4096, 60)
+        try:
+            durations = measure_function(print_rows, repeat, rows)
+        finally:
+            output.log_sink.close()
+            output.log_sink = None
+    return durations
+
+
+# format_benchmarks
+#
+# @param    int     repeat  Number of runs.
+#
+# @return   Returns a list of (name, durations) tuples of
+#               seconds_to_human_form and percentage_to_human_form (durations
+#               of one call in seconds).
+def format_benchmarks(repeat):
+    from .logfile import percentage_to_human_form, seconds_to_human_form
+
+    seconds = list(range(-1, 360000, 36)) # up to 100 hours
+    percentages = [p / 100 for p in range(-100, 10000)] # -1% to 99.99%
+
+    def format_seconds():
+        for value in seconds:
+            seconds_to_human_form(value)
+
+    def format_percentages():
+        for value in percentages:
+            percentage_to_human_form(value)
+
+    return [
+        ('seconds_to_human_form', measure_function(format_seconds, repeat, len(seconds))),
+        ('percentage_to_human_form', measure_function(format_percentages, repeat, len(percentages))),
+    ]
+
+
+# corpus_files
+#
+# Copies the demo log-files (or a small synthetic log-file if the demo
+#     log-files are not found) scale times into a directory.
+#
+# @param    string  directory   Directory of the copies.
+# @param    int     scale       Number of copies of each log-file.
+#
+# @return   Returns the filenames of the copies.
+def corpus_files(directory, scale):
+    demo = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'demo-log-files')
+    originals = []
+    if os.path.isdir(demo):
+        originals = [os.path.join(demo, f) for f in sorted(os.listdir(demo))]
+    if len(originals) == 0:
+        originals = [os.path.join(directory, 'small.log')]
+        write_small_log(originals[0])
+
+    filenames = []
+    for original in originals:
+        with open(original, 'rb') as f:
+            content = f.read()
+        for copy in range(scale):
+            filename = os.path.join(directory, str(copy) + '_' + os.path.basename(original))
+            with open(filename, 'wb') as f:
+                f.write(content)
+            filenames.append(filename)
+    return filenames
+
+
+# parse_benchmarks
+#
+# @param    int     repeat  Number of runs.
+# @param    int     scale   Number of copies of the log-files (see
+#                               corpus_files).
+#
+# @return   Returns a list of (name, durations) tuples of read_log,
+#               analyze_log and the report command (new process with all
+#               CPUs, durations of one data row in seconds).
+def parse_benchmarks(repeat, scale):
+    from .analysis import analyze_log
+    from .logfile import read_log
+
+    with tempfile.TemporaryDirectory() as directory:
+        filenames = corpus_files(directory, scale)
+        rows = sum(1 for filename in filenames for _ in read_log(filename, {}))
+
+        def parse():
+            for filename in filenames:
+                for _ in read_log(filename, {}):
+                    pass
+
+        def analyze():
+            for filename in filenames:
+                analyze_log(filename)
+
+        report = [sys.executable, '-m', 'batterysocmonitor', 'report', directory, '--report_file', os.devnull]
+        return [
+            ('read_log', measure_function(parse, repeat, rows)),
+            ('analyze_log', measure_function(analyze, repeat, rows)),
+            ('report', [d / rows for d in measure_command(report, repeat)]),
+        ]
+
+
+# run_benchmarks
+#
+# @param    Namespace   args    Arguments of the benchmark command.
+#
+# @return   Returns a dictionary with the name of each benchmark as key and a
+#               dictionary with the unit and the durations (in the unit) as
+#               value. The unit of the ratios of the estimators is x.
+def run_benchmarks(args):
+    results = {}
+
+    def add(name, unit, durations):
+        factor = {'ms': 1e3, 'us': 1e6, 'x': 1}[unit]
+        results[name] = {'unit': unit, 'runs': [round(d * factor, 3) for d in durations]}
+
+    if 'startup' in args.select:
+        for name, durations in startup_benchmarks(args.repeat):
+            add('startup_' + name, 'ms', durations)
+    if 'tick' in args.select:
+        add('tick', 'us', tick_benchmark(args.repeat, args.samples))
+    if 'estimator' in args.select:
+        durations, ratios = estimator_benchmarks(args.repeat, args.samples)
+        for name, runs in durations:
+            add('estimator_' + name, 'us', runs)
+        for name, runs in ratios:
+            add('estimator_' + name + '_ratio', 'x', runs)
+    if 'output' in args.select:
+        add('output_myprint', 'us', output_benchmark(args.repeat))
+    if 'format' in args.select:
+        for name, durations in format_benchmarks(args.repeat):
+            add('format_' + name, 'us', durations)
+    if 'parse' in args.select:
+        for name, durations in parse_benchmarks(args.repeat, args.scale):
+            add('parse_' + name, 'us', durations)
+
+    for result in results.values():
+        runs = sorted(result['runs'])
+        result['min'] = runs[0]
+        result['median'] = runs[len(runs) // 2]
+    return results
+
+
+# read_baseline
+#
+# @param    string  filename    Filename of the results (see
+#                                   --benchmark_file).
+#
+# @return   Returns the benchmarks of the results (see run_benchmarks).
+def read_baseline(filename):
+    with open(filename, 'r') as f:
+        baseline = json.load(f)
+    if not isinstance(baseline, dict) or not isinstance(baseline.get('benchmarks'), dict):
+        raise ValueError('no benchmarks found')
+    return baseline['benchmarks']
+
+
+# benchmark
+#
+# Prints the minimum and the median duration of the benchmarks and compares
+#     the medians to the baseline. Terminates with exit status 1 if a median
+#     is more than --threshold percent above the baseline.
+#
+# @param    Namespace   args    Arguments of the benchmark command.
+#
+# @return   None
+def benchmark(args):
+    from platform import platform, python_version
+    from . import script_version
+
+    if args.repeat < 1 or args.samples < 200 or args.scale < 1:
+        print('ERROR: --repeat and --scale must be at least 1, --samples at least 200')
+        sys.exit(1)
+
+    baseline = None
+    if args.baseline != None:
+        try:
+            baseline = read_baseline(args.baseline)
+        except (OSError, ValueError) as e:
+            print('ERROR: could not read the baseline ' + args.baseline + ':', e)
+            sys.exit(1)
+
+    results = run_benchmarks(args)
+
+    if args.benchmark_file != None:
+        with open(args.benchmark_file, 'w') as f:
+            json.dump({
+                'version': script_version,
+                'python': python_version(),
+                'platform': platform(),
+                'repeat': args.repeat,
+                'samples': args.samples,
+                'scale': args.scale,
+                'benchmarks': results,
+            }, f, indent=2)
+            f.write('\n')
+
+    regressions = []
+    if baseline == None:
+        print('# <benchmark>\t<min>\t<median>\t<unit>')
+    else:
+        print('# <benchmark>\t<min>\t<median>\t<unit>\t<baseline>\t<change %>')
+    for name, result in results.items():
+        row = [name, result['min'], result['median'], result['unit']]
+        if baseline != None:
+            reference = baseline.get(name)
+            if reference == None or reference.get('unit') != result['unit'] or not reference.get('median', 0) > 0:
+                row += ['-', '-']
+            else:
+                change = round((result['median'] / reference['median'] - 1) * 100, 1)
+                row += [reference['median'], '{:+.1f}'.format(change)]
+                if change > args.threshold:
+                    regressions.append(name)
+        print(*row, sep='\t')
+
+    if len(regressions) > 0:
+        print('# regressions', ':', ', '.join(regressions), sep='\t')
+        print('ERROR: ' + str(len(regressions)) + ' benchmark(s) more than ' + '{:g}'.format(args.threshold) + '% slower than the baseline')
+        sys.exit(1)
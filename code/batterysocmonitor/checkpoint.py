@@ -0,0 +1,104 @@
+#-------------------------------------------------------------------------------
+# BatterySoCMonitor - checkpoint
+#
+# Crash-safe checkpoint of a run (see --checkpoint and --resume).
+#-------------------------------------------------------------------------------
+# @author: Andreas Menzel
+# @license: MIT License
+# @copyright: Copyright (c) 2021 Andreas Menzel
+#-------------------------------------------------------------------------------
+
+import os
+from time import perf_counter
+
+from .logfile import BinaryLog, read_binary_log
+
+
+# Checkpoint
+#
+# Append-only file with the state of the run at the start (JSON header) and one
+#     record per sample (format of BinaryLog). The records are collected in
+#     memory and written and synchronized to disk (fsync) at most every
+#     interval seconds, so a checkpoint costs one write and one fsync per
+#     interval. After a crash at most the samples of the last interval are
+#     lost; an incomplete record is removed when the file is opened again.
+#
+#     The state of the estimator, the events and the history is not saved. It
+#     is restored by replaying the records (see read_checkpoint).
+class Checkpoint(BinaryLog):
+    description = 'checkpoint'
+    magic = b'BSCMCKP\0'
+    version = 1
+    # time: seconds since the start of the run (including the time the script
+    #     was not running). estimator_time, estimator_soc: time and state of
+    #     charge passed to the estimator (without the gaps between the
+    #     processes, see monitor)
+    fields = ['time', 'estimator_time', 'soc', 'estimator_soc', 'secsleft', 'power_now', 'power_plugged']
+
+    # __init__
+    #
+    # @param    string  filename    Filename of the checkpoint.
+    # @param    dict    session     State of the run at the start (only used
+    #                                   for a new checkpoint).
+    # @param    int     interval    Seconds after which the records are
+    #                                   written and synchronized.
+    #
+    # @return   None
+    def __init__(self, filename, session, interval):
+        # the interval alone triggers the writes
+        super().__init__(filename, session, float('inf'), interval)
+        self.records = 0
+        self.syncs = 0
+        self.sync_time_max = 0
+
+    # write
+    #
+    # @param    [float]     values  One value per field (None if unknown).
+    #
+    # @return   None
+    def write(self, values):
+        self.records += 1
+        super().write(values)
+
+    # flush
+    #
+    # Writes the buffered records and synchronizes the file to disk.
+    #
+    # @return   None
+    def flush(self):
+        if len(self.buffer) == 0:
+            super().flush()
+            return
+
+        sync_start = perf_counter()
+        super().flush()
+        os.fsync(self.file.fileno())
+        self.syncs += 1
+        self.sync_time_max = max(self.sync_time_max, perf_counter() - sync_start)
+
+    # statistics
+    #
+    # @return   Returns a list of (name, value) tuples.
+    def statistics(self):
+        return [
+            ('checkpoint_records', self.records),
+            ('checkpoint_syncs', self.syncs),
+            ('checkpoint_sync_max_ms', round(self.sync_time_max * 1000, 3)),
+        ]
+
+
+# read_checkpoint
+#
+# @param    string  filename    Filename of the checkpoint.
+#
+# @return   Returns the state of the run at the start (dict) and the records
+#               (dicts with the fields of Checkpoint, None if unknown).
+def read_checkpoint(filename):
+    header, records = read_binary_log(filename, Checkpoint)
+    if header['fields'] != Checkpoint.fields:
+        raise RuntimeError(filename + ' has different fields')
+
+    samples = []
+    for record in records:
+        samples.append(dict(zip(Checkpoint.fields, [None if float(v) != float(v) else float(v) for v in record])))
+    return header['parameters'], samples
@@ -0,0 +1,367 @@
+#-------------------------------------------------------------------------------
+# BatterySoCMonitor - cli
+#
+# Command line interface. Each command imports only the modules it needs.
+#-------------------------------------------------------------------------------
+# @author: Andreas Menzel
+# @license: MIT License
+# @copyright: Copyright (c) 2021 Andreas Menzel
+#-------------------------------------------------------------------------------
+
+import sys
+
+from . import script_version
+from .estimators import minimum_window
+
+
+commands = ['monitor', 'analyze', 'report', 'benchmark']
+benchmark_groups = ['startup', 'tick', 'estimator', 'output', 'format', 'parse']
+
+
+# create_parser
+#
+# @return   Returns the argument parser with the commands monitor, analyze,
+#               report and benchmark.
+def create_parser():
+    import argparse
+
+    output_options = argparse.ArgumentParser(add_help=False)
+    output_options.add_argument('-v', '--verbose',
+        action='store_true',
+        help='Print more information')
+    output_options.add_argument('-b', '--beautify',
+        action='store_true',
+        help='Print information in human readable form')
+    output_options.add_argument('-l', '--log_file',
+        metavar='',
+        nargs='?',
+        const='#NOT_SET#',
+        help='Filename of the log-file')
+    output_options.add_argument('--log_flush_size',
+        metavar='',
+        type=int,
+        default=4096,
+        help='Number of buffered bytes after which the log-file is written to disk')
+    output_options.add_argument('--log_flush_interval',
+        metavar='',
+        type=int,
+        default=60,
+        help='Maximum delay (in seconds) before buffered output is written to the log-file. The buffer is also written on Ctrl+C, SIGTERM and errors')
+
+    estimator_options = argparse.ArgumentParser(add_help=False)
+    estimator_options.add_argument('--estimator',
+        choices=['anchor', 'regression', 'streaming'],
+        default='anchor',
+        help='Method used to approximate the consumption. anchor: between the first and the last change of the state of charge. regression: rolling median of a least-squares fit (requires numpy). streaming: least-squares fit of all samples, updated in constant time')
+    estimator_options.add_argument('--window',
+        metavar='',
+        type=int,
+        default=360,
+        help='Number of samples used for the regression and the rolling median, span of the moving average of the streaming estimator (see --estimator)')
+
+    parser = argparse.ArgumentParser(description='Monitor the batteries state of charge and approximate the total battery capacity in hours.', prog='BatterySoCMonitor')
+    parser.add_argument('--version', action='version', version='%(prog)s ' + script_version)
+    subparsers = parser.add_subparsers(dest='command', metavar='<command>')
+
+    monitor = subparsers.add_parser('monitor',
+        parents=[output_options, estimator_options],
+        help='Monitor the battery (default)',
+        description='Monitor the batteries state of charge and approximate the total battery capacity in hours.')
+    monitor.add_argument('--sample_rate',
+        metavar='',
+        type=float,
+        help='Delay (in seconds) between each measurement. Must be a divisor of --output_rate')
+    monitor.add_argument('--output_rate',
+        metavar='',
+        type=float,
+        help='Delay (in seconds) between each data output. Must be a multiple of --sample_rate. The last sample is always written')
+    monitor.add_argument('--dashboard',
+        metavar='',
+        nargs='?',
+        type=float,
+        const=4,
+        default=None,
+        help='Show a live dashboard with sparklines of the state of charge and the consumption instead of the rows, drawn at most this many times per second (default: 4). The log-file is not affected')
+    monitor.add_argument('--history_size',
+        metavar='',
+        type=int,
+        default=500,
+        help='Maximum number of outputs shown in the sparklines of the dashboard (see --dashboard). The sparklines show the latest outputs that fit into the width of the terminal, older outputs are discarded (default: 500)')
+    monitor.add_argument('--sensor',
+        choices=['auto', 'sysfs', 'psutil'],
+        default='auto',
+        help='Source of the battery data. sysfs: read /sys/class/power_supply directly (Linux only). auto: sysfs if available, psutil otherwise')
+    monitor.add_argument('--battery',
+        metavar='',
+        default=None,
+        help='Name of the battery in /sys/class/power_supply (default: first battery found, see --sensor)')
+    monitor.add_argument('--simulate',
+        metavar='',
+        default=None,
+        help='Replay a log-file or simulate a linear discharge (synthetic:<%% / h>[:<start soc>]) with a virtual clock instead of reading the battery')
+    monitor.add_argument('--sources',
+        metavar='',
+        nargs='+',
+        help='Monitor several batteries concurrently. Each source is local, local:<battery> or <host>:<port> (see --serve), optionally followed by @<sample rate>')
+    monitor.add_argument('--serve',
+        metavar='',
+        default=None,
+        help='Serve the local battery to other instances (see --sources) at [<host>:]<port>. The default host 127.0.0.1 only accepts local connections. The readings are neither authenticated nor encrypted, only use 0.0.0.0 or another address in trusted networks')
+    monitor.add_argument('--metrics',
+        metavar='',
+        default=None,
+        help='Export the current values as OpenMetrics (Prometheus) at http://[<host>:]<port>/metrics. The default host 127.0.0.1 only accepts local scrapes, use 0.0.0.0 or another address to export the values to other machines')
+    monitor.add_argument('--binary_log',
+        metavar='',
+        default=None,
+        help='Filename of an additional log-file in the binary format (every sample, see --convert)')
+    monitor.add_argument('--convert',
+        metavar='',
+        nargs=2,
+        help='Convert a log-file from the text to the binary format or vice versa: <input> <output>')
+    monitor.add_argument('--force',
+        action='store_true',
+        help='Overwrite the output log-file of --convert if it exists')
+    monitor.add_argument('--history',
+        metavar='',
+        default=None,
+        help='Filename of a database (SQLite) with the runs of each battery. The summary of the run is added and the capacity fade and the time until --minimum_soc are predicted from the previous runs')
+    monitor.add_argument('--checkpoint',
+        metavar='',
+        default=None,
+        help='Filename of a checkpoint of the run. Each sample is appended and the file is synchronized to disk every --checkpoint_interval seconds (see --resume)')
+    monitor.add_argument('--checkpoint_interval',
+        metavar='',
+        type=int,
+        default=60,
+        help='Maximum delay (in seconds) before samples are written to the checkpoint (default: 60)')
+    monitor.add_argument('--resume',
+        action='store_true',
+        help='Continue the run saved in the checkpoint (e.g. after a crash or a shutdown by --cmd_min_soc). Starts a new run if the checkpoint does not exist yet')
+    monitor.add_argument('--minimum_soc',
+        metavar='',
+        type=int,
+        default=None,
+        help='Terminate script when batteries state of charge is below or equal to this percentage')
+    monitor.add_argument('--maximum_soc',
+        metavar='',
+        type=int,
+        default=None,
+        help='Terminate script when batteries state of charge is above or equal to this percentage')
+    monitor.add_argument('--cmd_min_soc',
+        metavar='',
+        help='Command that will be executed when the script terminates because of the batteries state of charge (see --minimum_soc)')
+    monitor.add_argument('--cmd_max_soc',
+        metavar='',
+        help='Command that will be executed when the script terminates because of the batteries state of charge (see --maximum_soc)')
+    monitor.add_argument('--cmd_start',
+        metavar='',
+        help='Command that will be executed when the script starts')
+    monitor.add_argument('--cmd_end',
+        metavar='',
+        help='Command that will be executed when the script terminates')
+    monitor.add_argument('--event',
+        metavar=('CONDITION', 'COMMAND'),
+        nargs=2,
+        action='append',
+        help='Execute COMMAND every time CONDITION becomes true. Condition: <metric><operator><value> with the metric soc, secsleft, consumption, spp, sfb, power or predicted (see --history) and the operator <, <=, > or >= (e.g. soc<=20). Can be specified multiple times')
+    monitor.add_argument('--stop_event',
+        metavar=('CONDITION', 'COMMAND'),
+        nargs=2,
+        action='append',
+        help='Like --event, but terminate the script after executing COMMAND (use \'\' for no command)')
+    monitor.add_argument('--hook_workers',
+        metavar='',
+        type=int,
+        default=2,
+        help='Maximum number of commands (see --cmd_* and --event) executed at the same time (default: 2)')
+    monitor.add_argument('--hook_timeout',
+        metavar='',
+        type=float,
+        default=60,
+        help='Kill commands (see --cmd_* and --event) after this many seconds (default: 60)')
+    monitor.add_argument('--profile_self',
+        action='store_true',
+        help='Measure the duration of each phase of a sample, the CPU time and the wakeups of the script and print them when the script terminates')
+    monitor.add_argument('--telemetry',
+        metavar='',
+        nargs='*',
+        default=None,
+        help='Capture system telemetry with the samples and write it as # telemetry lines before the rows. Collector: cpu (utilization and frequency), load, backlight, network, disk or processes (most CPU time, requires psutil), optionally followed by /<divisor> to run it every divisor-th sample (default: 5 for network and disk, 30 for processes, 1 otherwise). Without collectors: all available collectors')
+    monitor.add_argument('--telemetry_budget',
+        metavar='',
+        type=float,
+        default=1,
+        help='Maximum average duration of the telemetry per sample in percent of --sample_rate. The divisor of the most expensive collector is doubled while the budget is exceeded (default: 1)')
+    monitor.add_argument('--telemetry_processes',
+        metavar='',
+        type=int,
+        default=3,
+        help='Number of processes captured by the processes collector (see --telemetry, default: 3)')
+    monitor.add_argument('-w', '--workers',
+        metavar='',
+        nargs='+',
+        help='Specify a list of worker jobs. Each worker creates a new process. A job is cpuLoad (busy loop) or a list of phases joined with +. Phase: cpu[:<utilization %%>][@<core>], memory[:<MB>], disk[:<MB>] or idle, followed by /<seconds> (optional for the last phase). <core> must be one of the cores the script may run on')
+
+    analyze = subparsers.add_parser('analyze',
+        parents=[output_options, estimator_options],
+        help='Analyze log-files',
+        description='Recalculate the consumption of log-files written by any version of BatterySoCMonitor and print one summary row per file.')
+    analyze.add_argument('log_files',
+        metavar='log_file',
+        nargs='+',
+        help='Log-file (text or binary format)')
+
+    report = subparsers.add_parser('report',
+        parents=[estimator_options],
+        help='Create a report of many log-files',
+        description='Analyze many log-files in parallel and write one CSV or JSON report.')
+    report.add_argument('paths',
+        metavar='path',
+        nargs='+',
+        help='Log-file, directory or glob pattern')
+    report.add_argument('--report_format',
+        choices=['csv', 'json'],
+        default='csv',
+        help='Format of the report')
+    report.add_argument('--report_file',
+        metavar='',
+        help='Filename of the report. The report is printed if not specified')
+    report.add_argument('-j', '--jobs',
+        metavar='',
+        type=int,
+        default=None,
+        help='Number of processes used to analyze log-files (default: number of CPUs)')
+
+    benchmark = subparsers.add_parser('benchmark',
+        help='Measure the startup time and the hot paths',
+        description='Measure the startup time of the commands (new process for each run), one sample of the monitor command (synthetic battery, no battery required), one update of the estimators, the output, the human readable form and the parsing of log-files. The results can be saved and compared to a previous run.')
+    benchmark.add_argument('--select',
+        choices=benchmark_groups,
+        nargs='+',
+        default=benchmark_groups,
+        help='Benchmarks to run (default: all)')
+    benchmark.add_argument('--repeat',
+        metavar='',
+        type=int,
+        default=20,
+        help='Number of runs of each benchmark (default: 20)')
+    benchmark.add_argument('--samples',
+        metavar='',
+        type=int,
+        default=5000,
+        help='Number of samples of each run of the monitor command and of the short run of the estimators (default: 5000)')
+    benchmark.add_argument('--scale',
+        metavar='',
+        type=int,
+        default=4,
+        help='Number of copies of the demo log-files parsed in each run (default: 4)')
+    benchmark.add_argument('--benchmark_file',
+        metavar='',
+        default=None,
+        help='Filename of the results (JSON)')
+    benchmark.add_argument('--baseline',
+        metavar='',
+        default=None,
+        help='Results of a previous run (see --benchmark_file). The medians are compared and the exit status is 1 if a benchmark is slower than --threshold')
+    benchmark.add_argument('--threshold',
+        metavar='',
+        type=float,
+        default=20,
+        help='Maximum increase (in percent) of the median compared to --baseline (default: 20)')
+
+    return parser
+
+
+# translate_arguments
+#
+# Translates the command line of version 2 (no command, --analyze and
+#     --report) to the commands.
+#
+# @param    [string]    argv    Arguments.
+#
+# @return   Returns the translated arguments.
+def translate_arguments(argv):
+    if len(argv) > 0 and (argv[0] in commands or argv[0] in ['-h', '--help', '--version']):
+        return argv
+
+    for option, command in [('--analyze', 'analyze'), ('--report', 'report')]:
+        if option in argv:
+            argv = list(argv)
+            argv.remove(option)
+            return [command] + argv
+    return ['monitor'] + argv
+
+
+# check_arguments
+#
+# Checks the numeric options that the parser can not check.
+#
+# @param    Namespace   args    Arguments.
+#
+# @return   Returns an error message or None if the arguments are valid.
+def check_arguments(args):
+    if args.command == 'monitor' and args.history_size < 1:
+        return '--history_size must be at least 1'
+    if args.command in ['monitor', 'analyze', 'report']:
+        if args.window < 1:
+            return '--window must be at least 1'
+        if args.window < minimum_window(args.estimator):
+            return '--window must be at least ' + str(minimum_window(args.estimator)) + ' for --estimator ' + args.estimator
+    return None
+
+
+# main
+#
+# @param    [string]    argv    Arguments (default: sys.argv).
+#
+# @return   None
+def main(argv=None):
+    if argv == None:
+        argv = sys.argv[1:]
+
+    # answered without importing anything
+    if argv == ['--version']:
+        print('BatterySoCMonitor ' + script_version)
+        return
+
+    args = create_parser().parse_args(translate_arguments(argv))
+
+    if args.command == 'benchmark':
+        from .benchmark import benchmark
+        benchmark(args)
+        return
+
+    error = check_arguments(args)
+    if error != None:
+        print('ERROR: ' + error)
+        sys.exit(1)
+
+    if args.estimator == 'regression':
+        from .estimators import load_numpy
+        if load_numpy() == None:
+            print('ERROR: --estimator regression requires numpy')
+            sys.exit(1)
+
+    if args.command == 'analyze':
+        from .analysis import analyze
+        analyze(args)
+    elif args.command == 'report':
+        from .analysis import report
+        report(args)
+    elif args.convert != None:
+        from .logfile import convert
+        try:
+            convert(args.convert[0], args.convert[1], args.log_flush_size, args.log_flush_interval, args.force)
+        except (OSError, RuntimeError, ValueError) as e:
+            print('ERROR: could not convert ' + args.convert[0] + ': ' + str(e))
+            sys.exit(1)
+    elif args.serve != None:
+        from .remote import serve
+        serve(args)
+    elif args.sources != None:
+        from .remote import collect
+        collect(args)
+    else:
+        from .monitor import run
+        run(args)
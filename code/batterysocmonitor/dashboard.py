@@ -0,0 +1,256 @@
+#-------------------------------------------------------------------------------
+# BatterySoCMonitor - dashboard
+#
+# Live dashboard in the terminal (see --dashboard).
+#-------------------------------------------------------------------------------
+# @author: Andreas Menzel
+# @license: MIT License
+# @copyright: Copyright (c) 2021 Andreas Menzel
+#-------------------------------------------------------------------------------
+
+import sys
+from collections import deque
+from shutil import get_terminal_size
+from threading import Event, Lock, Thread
+
+from . import script_version
+from .logfile import percentage_to_human_form, seconds_to_human_form
+
+
+# sparkline
+#
+# @param    [float]     values      Values (None: unknown).
+# @param    float       low         Value of the lowest bar.
+# @param    float       high        Value of the highest bar.
+# @param    string      bars        Characters from the lowest to the highest
+#                                       bar.
+#
+# @return   Returns a string with one character per value (space if unknown).
+def sparkline(values, low, high, bars):
+    line = ''
+    for value in values:
+        if value == None:
+            line += ' '
+        elif high <= low:
+            line += bars[0]
+        else:
+            value = min(max(value, low), high)
+            line += bars[round((value - low) / (high - low) * (len(bars) - 1))]
+    return line
+
+
+# Dashboard
+#
+# Shows the latest values, sparklines of the state of charge and the
+#     consumption and the latest output lines on the alternate screen of the
+#     terminal. The frame is composed in memory and only the changed cells are
+#     written. A thread draws at most frame_rate frames per second, independent
+#     of --sample_rate and --output_rate.
+class Dashboard:
+    # number of output lines kept
+    message_lines = 100
+
+    # __init__
+    #
+    # @param    float   frame_rate  Maximum number of frames per second.
+    # @param    bool    show_power  Show the power.
+    # @param    bool    show_predicted  Show the predicted time (see --history).
+    # @param    int     history_size    Maximum number of values in the
+    #                                       sparklines (they are limited to the
+    #                                       width of the terminal as well).
+    # @param    file    stream      Terminal (default: sys.stdout).
+    #
+    # @return   None
+    def __init__(self, frame_rate, show_power, show_predicted, history_size=500, stream=None):
+        self.stream = stream
+        if self.stream == None:
+            self.stream = sys.stdout
+        self.interval = 1 / frame_rate
+        self.show_power = show_power
+        self.show_predicted = show_predicted
+
+        self.bars = '▁▂▃▄▅▆▇█'
+        try:
+            self.bars.encode(self.stream.encoding or 'ascii')
+        except (UnicodeEncodeError, LookupError):
+            self.bars = '_.-=+*#@'
+
+        self.lock = Lock()
+        self.values = None
+        self.soc = deque(maxlen=history_size)
+        self.consumption = deque(maxlen=history_size)
+        self.messages = deque(maxlen=Dashboard.message_lines)
+        self.partial_line = ''
+        self.changed = True
+
+        self.screen = [] # lines on the terminal
+        self.size = None
+        self.frames = 0
+        self.bytes_written = 0
+
+        # alternate screen, hide cursor
+        self.stream.write('\033[?1049h\033[?25l')
+        self.stream.flush()
+
+        self.stopped = Event()
+        self.thread = Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    # update
+    #
+    # @param    dict    values  Values of the latest output (time_executed, soc,
+    #                               secsleft, consumption, spp, sfb, power,
+    #                               predicted, phase).
+    #
+    # @return   None
+    def update(self, values):
+        with self.lock:
+            self.values = values
+            self.soc.append(values['soc'])
+            if values['consumption'] == -1:
+                self.consumption.append(None)
+            else:
+                self.consumption.append(values['consumption'])
+            self.changed = True
+
+    # write
+    #
+    # Adds output (see myPrint) to the output lines.
+    #
+    # @param    string  text    Text.
+    #
+    # @return   None
+    def write(self, text):
+        with self.lock:
+            lines = (self.partial_line + text).split('\n')
+            self.partial_line = lines.pop()
+            if len(lines) > 0:
+                self.messages.extend(lines)
+                self.changed = True
+
+    # compose
+    #
+    # @param    int     width   Number of columns of the terminal.
+    # @param    int     height  Number of lines of the terminal.
+    #
+    # @return   Returns the lines of the frame.
+    def compose(self, width, height):
+        with self.lock:
+            values = self.values
+            soc = list(self.soc)
+            consumption = list(self.consumption)
+            messages = list(self.messages)
+
+        lines = ['BatterySoCMonitor ' + script_version + ' (Ctrl+C to terminate)', '']
+        if values != None:
+            lines.append('timeExecuted\t' + seconds_to_human_form(round(values['time_executed'])))
+            lines.append('bat %\t\t' + percentage_to_human_form(values['soc']))
+            lines.append('timeRemaining\t' + seconds_to_human_form(values['secsleft']))
+            lines.append('consumption\t' + percentage_to_human_form(values['consumption']) + ' / h')
+            lines.append('time / %\t' + seconds_to_human_form(values['spp']))
+            lines.append('time / 100%\t' + seconds_to_human_form(values['sfb']))
+            if self.show_power:
+                lines.append('power\t\t' + '{:6.2f} W'.format(values['power']))
+            if self.show_predicted:
+                lines.append('predicted\t' + seconds_to_human_form(values['predicted']))
+            phase = values['phase']
+            line = 'phase\t\t' + phase['kind'] + ' since ' + seconds_to_human_form(round(phase['time_start']))
+            if phase['rate'] != None:
+                line += ', {:+.2f}% / h'.format(phase['rate'])
+            if phase['kind'] == 'charge' and phase['until'] != -1:
+                line += ', full in ' + seconds_to_human_form(phase['until'])
+            lines.append(line)
+            lines.append('')
+
+            length = max(width - 34, 1)
+            soc = soc[-length:]
+            lines.append('bat %\t\t' + sparkline(soc, 0, 100, self.bars) + '  0 - 100%')
+            consumption = consumption[-length:]
+            known = [c for c in consumption if c != None]
+            if len(known) > 0:
+                low = min(known)
+                high = max(known)
+                lines.append('consumption\t' + sparkline(consumption, low, high, self.bars)
+                    + '  ' + str(round(low, 2)) + ' - ' + str(round(high, 2)) + '% / h')
+            lines.append('')
+
+        if height > len(lines):
+            lines += messages[-(height - len(lines)):]
+        return [line.expandtabs()[:width] for line in lines[:height]]
+
+    # draw
+    #
+    # Writes the changed cells of the frame to the terminal.
+    #
+    # @return   None
+    def draw(self):
+        size = get_terminal_size()
+        lines = self.compose(size.columns, size.lines)
+
+        output = []
+        if size != self.size:
+            output.append('\033[H\033[2J')
+            self.screen = []
+            self.size = size
+        for row, line in enumerate(lines):
+            previous = ''
+            if row < len(self.screen):
+                previous = self.screen[row]
+            if line == previous:
+                continue
+
+            first = 0
+            while first < min(len(line), len(previous)) and line[first] == previous[first]:
+                first += 1
+            last = len(line)
+            if len(line) == len(previous):
+                while last > first and line[last - 1] == previous[last - 1]:
+                    last -= 1
+
+            output.append('\033[' + str(row + 1) + ';' + str(first + 1) + 'H' + line[first:last])
+            if len(line) < len(previous):
+                output.append('\033[K')
+        for row in range(len(lines), len(self.screen)):
+            output.append('\033[' + str(row + 1) + ';1H\033[K')
+        self.screen = lines
+
+        if len(output) > 0:
+            frame = ''.join(output)
+            self.stream.write(frame)
+            self.stream.flush()
+            self.frames += 1
+            self.bytes_written += len(frame)
+
+    # run
+    #
+    # Draws the changed frames until the dashboard is closed.
+    #
+    # @return   None
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            with self.lock:
+                changed = self.changed
+                self.changed = False
+            if changed:
+                self.draw()
+
+    # close
+    #
+    # Stops drawing and restores the terminal.
+    #
+    # @return   None
+    def close(self):
+        self.stopped.set()
+        self.thread.join()
+        # show cursor, main screen
+        self.stream.write('\033[?25h\033[?1049l')
+        self.stream.flush()
+
+    # statistics
+    #
+    # @return   Returns a list of (name, value) tuples.
+    def statistics(self):
+        return [
+            ('dashboard_frames', self.frames),
+            ('dashboard_bytes_written', self.bytes_written),
+        ]
@@ -0,0 +1,483 @@
+#-------------------------------------------------------------------------------
+# BatterySoCMonitor - estimators
+#
+# Approximation of the consumption from the state of charge.
+#-------------------------------------------------------------------------------
+# @author: Andreas Menzel
+# @license: MIT License
+# @copyright: Copyright (c) 2021 Andreas Menzel
+#-------------------------------------------------------------------------------
+
+from array import array
+
+# imported on first use (see load_numpy)
+numpy = None
+
+
+# load_numpy
+#
+# Imports numpy (optional, only needed for the regression estimator and to
+#     read binary log-files faster).
+#
+# @return   Returns the numpy module or None if it is not installed.
+def load_numpy():
+    global numpy
+
+    if numpy == None:
+        try:
+            import numpy as module
+            numpy = module
+        except ImportError:
+            pass
+    return numpy
+
+
+# SampleStore
+#
+# Fixed-capacity ring buffer for samples of one type. Only the last capacity
+#     samples are kept in a typed array.
+class SampleStore:
+    # __init__
+    #
+    # @param    string  typecode    Typecode of the array (see module array).
+    # @param    int     capacity    Number of samples kept in the ring buffer.
+    #
+    # @return   None
+    def __init__(self, typecode, capacity):
+        if capacity < 1:
+            raise ValueError('capacity must be at least 1')
+
+        self.capacity = capacity
+        self.count = 0
+        self.ring = array(typecode, [0]) * capacity
+
+    # append
+    #
+    # Saves a sample and overwrites the oldest one if the buffer is full.
+    #
+    # @param    number  value   Sample.
+    #
+    # @return   Returns the index of the sample.
+    def append(self, value):
+        index = self.count
+        self.ring[index % self.capacity] = value
+        self.count += 1
+        return index
+
+    # values
+    #
+    # @return   Returns the samples in the ring buffer (oldest first).
+    def values(self):
+        if self.count <= self.capacity:
+            return self.ring[:self.count]
+        split = self.count % self.capacity
+        return self.ring[split:] + self.ring[:split]
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if index < 0 or index >= self.count:
+            raise IndexError('sample index out of range')
+        if index < self.count - self.capacity:
+            raise IndexError('sample ' + str(index) + ' was discarded')
+        return self.ring[index % self.capacity]
+
+
+# calculate_consumption
+#
+# Calculates the consumption between two samples.
+#
+# @param    float   soc_first   State of charge of the first sample.
+# @param    float   soc_last    State of charge of the last sample.
+# @param    float   seconds     Seconds between both samples.
+#
+# @return   Returns the consumption in (% / h), (sec / %) and (sec / 100%) or
+#               -1 for each value if the battery was not discharging.
+def calculate_consumption(soc_first, soc_last, seconds):
+    if not soc_first > soc_last or not seconds > 0:
+        return -1, -1, -1
+    consumption_spp = seconds / (soc_first - soc_last)
+    return round((soc_first - soc_last) / (seconds / (60*60)), 2), round(consumption_spp), round(consumption_spp * 100)
+
+
+# ConsumptionEstimator
+#
+# Approximates the median consumption from the samples where the state of
+#     charge changed. Until the state of charge changed twice, the (inaccurate)
+#     consumption since the first sample is used. Only these anchor samples are
+#     kept, so the estimator needs constant memory.
+class ConsumptionEstimator:
+    def __init__(self):
+        self.first_sample = None
+        self.first_soc_change = None
+        self.last_soc_change = None
+        self.last_soc = None
+
+    # update
+    #
+    # @param    float   seconds             Time of the sample (in seconds).
+    # @param    float   state_of_charge     State of charge of the sample.
+    #
+    # @return   Returns the consumption in (% / h), (sec / %) and (sec / 100%)
+    #               or -1 for each value if it is still unknown.
+    def update(self, seconds, state_of_charge):
+        if self.first_sample == None:
+            self.first_sample = (seconds, state_of_charge)
+            self.last_soc = state_of_charge
+        elif self.last_soc != state_of_charge:
+            self.last_soc = state_of_charge
+            if self.first_soc_change == None:
+                self.first_soc_change = (seconds, state_of_charge)
+            else:
+                self.last_soc_change = (seconds, state_of_charge)
+
+        if self.last_soc_change != None:
+            return self.final()
+        if self.first_soc_change != None:
+            return calculate_consumption(self.first_sample[1], self.first_soc_change[1], self.first_soc_change[0] - self.first_sample[0])
+        return -1, -1, -1
+
+    # final
+    #
+    # @return   Returns the consumption between the first and the last change
+    #               of the state of charge or -1 for each value if the state of
+    #               charge did not change twice.
+    def final(self):
+        if self.first_soc_change == None or self.last_soc_change == None:
+            return -1, -1, -1
+        return calculate_consumption(self.first_soc_change[1], self.last_soc_change[1], self.last_soc_change[0] - self.first_soc_change[0])
+
+    # statistics
+    #
+    # @return   Returns a list of (name, value) tuples with additional
+    #               statistics of the estimator.
+    def statistics(self):
+        return []
+
+
+# consumption_from_rate
+#
+# @param    float   consumption     Consumption in (% / h).
+#
+# @return   Returns the consumption in (% / h), (sec / %) and (sec / 100%) or
+#               -1 for each value if the battery is not discharging.
+def consumption_from_rate(consumption):
+    if not consumption > 0:
+        return -1, -1, -1
+    consumption_spp = 3600 / consumption
+    return round(consumption, 2), round(consumption_spp), round(consumption_spp * 100)
+
+
+# regression_consumption
+#
+# Fits a line to the state of charge of every window of samples (least
+#     squares) in one vectorized pass. Requires numpy.
+#
+# @param    ndarray times   Time of the samples (in seconds).
+# @param    ndarray socs    State of charge of the samples.
+# @param    int     window  Number of samples per window.
+#
+# @return   Returns three arrays with the consumption in (% / h) and the lower
+#               and upper bound of its 95% confidence interval for each window
+#               (one value per sample, starting at sample window - 1).
+def regression_consumption(times, socs, window):
+    load_numpy()
+    window = min(window, len(socs))
+    x = numpy.asarray(times, dtype=numpy.float64)
+    y = numpy.asarray(socs, dtype=numpy.float64)
+    x = x - x[0]
+
+    # sums over each window from the difference of the cumulative sums
+    def window_sums(values):
+        sums = numpy.concatenate(([0.0], numpy.cumsum(values)))
+        return sums[window:] - sums[:-window]
+
+    sum_x = window_sums(x)
+    sum_y = window_sums(y)
+    sxx = window_sums(x * x) - sum_x * sum_x / window
+    sxy = window_sums(x * y) - sum_x * sum_y / window
+    syy = window_sums(y * y) - sum_y * sum_y / window
+
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        slope = sxy / sxx
+        sse = numpy.maximum(syy - slope * sxy, 0)
+        if window > 2:
+            slope_error = numpy.sqrt(sse / (window - 2) / sxx)
+        else:
+            slope_error = numpy.zeros_like(slope)
+
+    consumption = -slope * 3600
+    error = 1.96 * slope_error * 3600
+    return consumption, consumption - error, consumption + error
+
+
+# rolling_median
+#
+# Calculates the median of every window of values. Requires numpy.
+#
+# @param    ndarray values  Values.
+# @param    int     window  Number of values per window.
+#
+# @return   Returns an array with one median per window (starting at value
+#               window - 1).
+def rolling_median(values, window):
+    load_numpy()
+    values = numpy.asarray(values, dtype=numpy.float64)
+    window = min(window, len(values))
+    windows = numpy.lib.stride_tricks.sliding_window_view(values, window)
+
+    # process in blocks to limit the memory used by the copies of median()
+    block = max(1, 2**22 // window)
+    medians = numpy.empty(len(windows))
+    for i in range(0, len(windows), block):
+        medians[i:i + block] = numpy.nanmedian(windows[i:i + block], axis=1)
+    return medians
+
+
+# RegressionEstimator
+#
+# Approximates the consumption with the rolling median of the least-squares
+#     consumption of the last window samples. Uses constant memory and
+#     O(window) time per sample. Requires numpy.
+class RegressionEstimator:
+    # __init__
+    #
+    # @param    int     window  Number of samples for the regression and the
+    #                           rolling median.
+    #
+    # @return   None
+    def __init__(self, window):
+        load_numpy()
+        self.window = window
+        self.times = SampleStore('d', window)
+        self.socs = SampleStore('d', window)
+        self.consumptions = SampleStore('d', window)
+        self.bounds = (-1, -1)
+        self.last = (-1, -1, -1)
+
+    # update
+    #
+    # @param    float   seconds             Time of the sample (in seconds).
+    # @param    float   state_of_charge     State of charge of the sample.
+    #
+    # @return   Returns the consumption in (% / h), (sec / %) and (sec / 100%)
+    #               or -1 for each value if it is still unknown.
+    def update(self, seconds, state_of_charge):
+        self.times.append(seconds)
+        self.socs.append(state_of_charge)
+        if len(self.socs) < 3:
+            return self.last
+
+        times = numpy.frombuffer(self.times.values(), dtype=numpy.float64)
+        socs = numpy.frombuffer(self.socs.values(), dtype=numpy.float64)
+        consumption, low, high = regression_consumption(times, socs, self.window)
+        self.consumptions.append(consumption[-1])
+        self.bounds = (round(float(low[-1]), 2), round(float(high[-1]), 2))
+
+        consumptions = numpy.frombuffer(self.consumptions.values(), dtype=numpy.float64)
+        self.last = consumption_from_rate(float(numpy.nanmedian(consumptions)))
+        return self.last
+
+    # final
+    #
+    # @return   Returns the last consumption in (% / h), (sec / %) and
+    #               (sec / 100%).
+    def final(self):
+        return self.last
+
+    # statistics
+    #
+    # @return   Returns a list of (name, value) tuples with additional
+    #               statistics of the estimator.
+    def statistics(self):
+        return [
+            ('consumption_95%_low', self.bounds[0]),
+            ('consumption_95%_high', self.bounds[1]),
+        ]
+
+
+# P2Quantile
+#
+# Streaming approximation of a quantile with the P-square algorithm (Jain and
+#     Chlamtac). Uses five markers, so memory and time per value are constant.
+class P2Quantile:
+    # __init__
+    #
+    # @param    float   quantile    Quantile to approximate (0 < quantile < 1).
+    #
+    # @return   None
+    def __init__(self, quantile):
+        self.quantile = quantile
+        self.heights = []
+        self.positions = [1, 2, 3, 4, 5]
+        self.desired = [1, 1 + 2 * quantile, 1 + 4 * quantile, 3 + 2 * quantile, 5]
+        self.increments = [0, quantile / 2, quantile, (1 + quantile) / 2, 1]
+
+    # add
+    #
+    # @param    float   value   Value.
+    #
+    # @return   None
+    def add(self, value):
+        heights = self.heights
+        if len(heights) < 5:
+            heights.append(value)
+            heights.sort()
+            return
+
+        if value < heights[0]:
+            heights[0] = value
+            k = 0
+        elif value >= heights[4]:
+            heights[4] = value
+            k = 3
+        else:
+            k = 0
+            while value >= heights[k + 1]:
+                k += 1
+
+        positions = self.positions
+        for i in range(k + 1, 5):
+            positions[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+
+        # adjust the heights of the three inner markers
+        for i in range(1, 4):
+            d = self.desired[i] - positions[i]
+            if (d >= 1 and positions[i + 1] - positions[i] > 1) or (d <= -1 and positions[i - 1] - positions[i] < -1):
+                d = 1 if d > 0 else -1
+                height = heights[i] + d / (positions[i + 1] - positions[i - 1]) * (
+                    (positions[i] - positions[i - 1] + d) * (heights[i + 1] - heights[i]) / (positions[i + 1] - positions[i])
+                    + (positions[i + 1] - positions[i] - d) * (heights[i] - heights[i - 1]) / (positions[i] - positions[i - 1]))
+                if not heights[i - 1] < height < heights[i + 1]:
+                    # linear formula if the parabolic one leaves the bounds
+                    height = heights[i] + d * (heights[i + d] - heights[i]) / (positions[i + d] - positions[i])
+                heights[i] = height
+                positions[i] += d
+
+    # value
+    #
+    # @return   Returns the approximated quantile or None if no value was added.
+    def value(self):
+        heights = self.heights
+        if len(heights) == 0:
+            return None
+        if len(heights) < 5:
+            return heights[min(len(heights) - 1, int(len(heights) * self.quantile))]
+        return heights[2]
+
+
+# StreamingEstimator
+#
+# Approximates the consumption with a least-squares fit of all samples. The
+#     sums of the fit (Welford), a moving average (EWMA) and a median (see
+#     P2Quantile) of the consumption between two samples as well as the minimum
+#     and maximum state of charge are updated in constant time and memory.
+class StreamingEstimator:
+    # __init__
+    #
+    # @param    int     span    Span (in samples) of the moving average.
+    #
+    # @return   None
+    def __init__(self, span):
+        self.alpha = 2 / (span + 1)
+        self.count = 0
+        self.mean_time = 0
+        self.mean_soc = 0
+        self.sum_time_time = 0
+        self.sum_time_soc = 0
+        self.previous = None
+        self.ewma = None
+        self.median = P2Quantile(0.5)
+        self.soc_min = None
+        self.soc_max = None
+        self.last = (-1, -1, -1)
+
+    # update
+    #
+    # @param    float   seconds             Time of the sample (in seconds).
+    # @param    float   state_of_charge     State of charge of the sample.
+    #
+    # @return   Returns the consumption in (% / h), (sec / %) and (sec / 100%)
+    #               or -1 for each value if it is still unknown.
+    def update(self, seconds, state_of_charge):
+        self.count += 1
+        delta_time = seconds - self.mean_time
+        self.mean_time += delta_time / self.count
+        self.mean_soc += (state_of_charge - self.mean_soc) / self.count
+        self.sum_time_time += delta_time * (seconds - self.mean_time)
+        self.sum_time_soc += delta_time * (state_of_charge - self.mean_soc)
+
+        if self.soc_min == None or state_of_charge < self.soc_min:
+            self.soc_min = state_of_charge
+        if self.soc_max == None or state_of_charge > self.soc_max:
+            self.soc_max = state_of_charge
+
+        if self.previous != None and seconds > self.previous[0]:
+            rate = (self.previous[1] - state_of_charge) / (seconds - self.previous[0]) * 3600
+            if self.ewma == None:
+                self.ewma = rate
+            else:
+                self.ewma += self.alpha * (rate - self.ewma)
+            self.median.add(rate)
+        self.previous = (seconds, state_of_charge)
+
+        if self.sum_time_time > 0:
+            self.last = consumption_from_rate(-self.sum_time_soc / self.sum_time_time * 3600)
+        return self.last
+
+    # final
+    #
+    # @return   Returns the last consumption in (% / h), (sec / %) and
+    #               (sec / 100%).
+    def final(self):
+        return self.last
+
+    # statistics
+    #
+    # @return   Returns a list of (name, value) tuples with additional
+    #               statistics of the estimator.
+    def statistics(self):
+        ewma = -1
+        if self.ewma != None:
+            ewma = round(self.ewma, 2)
+        median = self.median.value()
+        if median == None:
+            median = -1
+
+        return [
+            ('consumption_ewma', ewma),
+            ('consumption_p50', round(median, 2)),
+            ('soc_min', self.soc_min),
+            ('soc_max', self.soc_max),
+        ]
+
+
+# minimum_window
+#
+# @param    string  estimator   Method (see --estimator).
+#
+# @return   Returns the minimum number of samples of --window (a line needs 3
+#               samples for its confidence interval).
+def minimum_window(estimator):
+    if estimator == 'regression':
+        return 3
+    return 1
+
+
+# create_estimator
+#
+# @param    string  estimator   Method (see --estimator).
+# @param    int     window      Number of samples (see --window).
+#
+# @return   Returns a new consumption estimator.
+def create_estimator(estimator, window):
+    if window < minimum_window(estimator):
+        raise ValueError('the window of ' + estimator + ' must be at least ' + str(minimum_window(estimator)))
+    if estimator == 'regression':
+        return RegressionEstimator(window)
+    if estimator == 'streaming':
+        return StreamingEstimator(window)
+    return ConsumptionEstimator()
@@ -0,0 +1,215 @@
+#-------------------------------------------------------------------------------
+# BatterySoCMonitor - history
+#
+# Per-battery history of the runs and prediction of the remaining time.
+#-------------------------------------------------------------------------------
+# @author: Andreas Menzel
+# @license: MIT License
+# @copyright: Copyright (c) 2021 Andreas Menzel
+#-------------------------------------------------------------------------------
+
+from math import floor
+import sqlite3
+
+
+# HistoryStore
+#
+# Database (SQLite, see --history) with the summary of each run per battery.
+#     The capacity fade is a least-squares fit over time of the runtime of a
+#     full charge and of the health (energy_full / energy_full_design). Only
+#     the sums of the fit are stored and updated with each run, and the
+#     discharge curve is stored as running mean of the seconds per percent,
+#     so neither a lookup nor an update reads the stored runs.
+class HistoryStore:
+    schema = [
+        'CREATE TABLE IF NOT EXISTS batteries (id INTEGER PRIMARY KEY, key TEXT UNIQUE NOT NULL, model TEXT, serial TEXT, first_run REAL)',
+        'CREATE TABLE IF NOT EXISTS runs (id INTEGER PRIMARY KEY, battery INTEGER NOT NULL, time_started REAL, seconds REAL, soc_start REAL, soc_end REAL, consumption REAL, consumption_sfb REAL, energy_full REAL, energy_full_design REAL, sensor TEXT, version TEXT)',
+        'CREATE INDEX IF NOT EXISTS runs_battery ON runs (battery, time_started)',
+        'CREATE TABLE IF NOT EXISTS fits (battery INTEGER NOT NULL, name TEXT NOT NULL, n INTEGER, sx REAL, sy REAL, sxx REAL, sxy REAL, PRIMARY KEY (battery, name))',
+        'CREATE TABLE IF NOT EXISTS curve (battery INTEGER NOT NULL, percent INTEGER NOT NULL, n INTEGER, seconds REAL, PRIMARY KEY (battery, percent))',
+    ]
+
+    # __init__
+    #
+    # @param    string  filename    Filename of the database.
+    #
+    # @return   None
+    def __init__(self, filename):
+        self.connection = sqlite3.connect(filename)
+        with self.connection:
+            for statement in HistoryStore.schema:
+                self.connection.execute(statement)
+
+    # battery
+    #
+    # @param    string  key     Key of the battery (see battery_identity).
+    # @param    string  model   Model or None.
+    # @param    string  serial  Serial number or None.
+    #
+    # @return   Returns the id of the battery (added if unknown).
+    def battery(self, key, model, serial):
+        with self.connection:
+            self.connection.execute('INSERT OR IGNORE INTO batteries (key, model, serial) VALUES (?, ?, ?)', (key, model, serial))
+        return self.connection.execute('SELECT id FROM batteries WHERE key = ?', (key,)).fetchone()[0]
+
+    # add_run
+    #
+    # Adds the summary of a run and updates the fits and the discharge curve.
+    #
+    # @param    int     battery     Id of the battery.
+    # @param    dict    run         Summary (columns of the table runs).
+    # @param    dict    curve       Seconds per percent measured in the run.
+    #
+    # @return   None
+    def add_run(self, battery, run, curve):
+        with self.connection:
+            columns = sorted(run)
+            self.connection.execute('INSERT INTO runs (battery, ' + ', '.join(columns) + ') VALUES (?' + ', ?' * len(columns) + ')', [battery] + [run[c] for c in columns])
+
+            self.connection.execute('UPDATE batteries SET first_run = ? WHERE id = ? AND first_run IS NULL', (run['time_started'], battery))
+            first_run = self.connection.execute('SELECT first_run FROM batteries WHERE id = ?', (battery,)).fetchone()[0]
+            days = (run['time_started'] - first_run) / 86400
+
+            if run['consumption_sfb'] != None and run['consumption_sfb'] > 0:
+                self.add_point(battery, 'runtime', days, run['consumption_sfb'] / 3600)
+            if run['energy_full'] != None and run['energy_full_design']:
+                self.add_point(battery, 'health', days, run['energy_full'] / run['energy_full_design'] * 100)
+
+            for percent, seconds in curve.items():
+                self.connection.execute('INSERT OR IGNORE INTO curve VALUES (?, ?, 0, 0)', (battery, percent))
+                self.connection.execute('UPDATE curve SET n = n + 1, seconds = seconds + (? - seconds) / (n + 1) WHERE battery = ? AND percent = ?', (seconds, battery, percent))
+
+    # add_point
+    #
+    # @param    int     battery     Id of the battery.
+    # @param    string  name        Name of the fit.
+    # @param    float   x           Days since the first run.
+    # @param    float   y           Value.
+    #
+    # @return   None
+    def add_point(self, battery, name, x, y):
+        self.connection.execute('INSERT OR IGNORE INTO fits VALUES (?, ?, 0, 0, 0, 0, 0)', (battery, name))
+        self.connection.execute('UPDATE fits SET n = n + 1, sx = sx + ?, sy = sy + ?, sxx = sxx + ?, sxy = sxy + ? WHERE battery = ? AND name = ?', (x, y, x * x, x * y, battery, name))
+
+    # model
+    #
+    # @param    int     battery     Id of the battery.
+    # @param    float   now         Current time (unix timestamp).
+    #
+    # @return   Returns a dictionary with the number of runs, the mean and the
+    #               fitted current value and the change per year of each fit
+    #               (runtime in hours, health in %) and the discharge curve
+    #               (percent -> seconds).
+    def model(self, battery, now):
+        runs = self.connection.execute('SELECT COUNT(*) FROM runs WHERE battery = ?', (battery,)).fetchone()[0]
+        first_run = self.connection.execute('SELECT first_run FROM batteries WHERE id = ?', (battery,)).fetchone()[0]
+        model = {'runs': runs}
+
+        for name, n, sx, sy, sxx, sxy in self.connection.execute('SELECT name, n, sx, sy, sxx, sxy FROM fits WHERE battery = ?', (battery,)):
+            mean = sy / n
+            slope = 0
+            if n > 1 and sxx - sx * sx / n > 1e-9:
+                slope = (sxy - sx * sy / n) / (sxx - sx * sx / n)
+            days = (now - first_run) / 86400
+            model[name] = mean + slope * (days - sx / n)
+            model[name + '_mean'] = mean
+            model[name + '_per_year'] = slope * 365
+
+        model['curve'] = dict(self.connection.execute('SELECT percent, seconds FROM curve WHERE battery = ?', (battery,)))
+        return model
+
+    def close(self):
+        self.connection.close()
+
+
+# DischargeTracker
+#
+# Measures the seconds per percent of the state of charge while discharging
+#     and predicts the remaining time until a state of charge from the stored
+#     discharge curve (see HistoryStore). The curve is scaled by the fitted
+#     capacity fade and, as soon as a percent was measured in this run, by the
+#     ratio of the measured and the stored seconds of the measured percents.
+class DischargeTracker:
+    # __init__
+    #
+    # @param    dict    model   Model of the battery (see HistoryStore.model).
+    #
+    # @return   None
+    def __init__(self, model):
+        self.curve = model['curve']
+        self.seconds = {}
+        self.percent = None
+        self.time_entered = None
+
+        self.default = None
+        if len(self.curve) > 0:
+            self.default = sum(self.curve.values()) / len(self.curve)
+        elif model.get('runtime') != None:
+            self.default = model['runtime'] * 36
+
+        self.fade = 1
+        if model.get('runtime') != None and model.get('runtime_mean'):
+            self.fade = max(model['runtime'], 0) / model['runtime_mean']
+
+    # update
+    #
+    # @param    float   time_executed   Seconds since the start.
+    # @param    float   soc             State of charge.
+    # @param    bool    power_plugged   Whether the charger is connected.
+    #
+    # @return   None
+    def update(self, time_executed, soc, power_plugged):
+        percent = floor(soc)
+        if power_plugged:
+            self.percent = None
+            return
+        if self.percent == None or percent > self.percent:
+            self.percent = percent
+            self.time_entered = None
+            return
+        if percent == self.percent:
+            return
+
+        # percent(s) completed
+        if self.time_entered != None:
+            seconds = (time_executed - self.time_entered) / (self.percent - percent)
+            for p in range(percent + 1, self.percent + 1):
+                self.seconds[p] = seconds
+        self.percent = percent
+        self.time_entered = time_executed
+
+    # interrupt
+    #
+    # Forgets the current percent after a gap in the samples (see --resume), so
+    #     the time of the gap is not added to a percent.
+    #
+    # @return   None
+    def interrupt(self):
+        self.percent = None
+        self.time_entered = None
+
+    # predict
+    #
+    # @param    float   soc     Current state of charge.
+    # @param    float   target  State of charge.
+    #
+    # @return   Returns the predicted seconds until the state of charge reaches
+    #               target or -1 if unknown.
+    def predict(self, soc, target):
+        if self.default == None:
+            return -1
+
+        scale = self.fade
+        measured = [p for p in self.seconds if p in self.curve]
+        if len(measured) > 0:
+            scale = sum(self.seconds[p] for p in measured) / sum(self.curve[p] for p in measured)
+
+        seconds = 0
+        percent = floor(soc)
+        while percent >= target and percent >= 0:
+            share = 1
+            if percent == floor(soc):
+                share = soc - percent
+            seconds += share * self.curve.get(percent, self.default)
+            percent -= 1
+        return round(seconds * scale)
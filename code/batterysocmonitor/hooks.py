@@ -0,0 +1,213 @@
+#-------------------------------------------------------------------------------
+# BatterySoCMonitor - hooks
+#
+# Commands executed at the start, at the end and on events.
+#-------------------------------------------------------------------------------
+# @author: Andreas Menzel
+# @license: MIT License
+# @copyright: Copyright (c) 2021 Andreas Menzel
+#-------------------------------------------------------------------------------
+
+from concurrent.futures import ThreadPoolExecutor
+import os
+import subprocess
+from time import monotonic
+
+from .output import myPrint
+
+
+# run_hook
+#
+# Executes a command in a new session and captures its output. The whole
+#     session is killed if the command does not finish in time, so commands
+#     that started other processes do not keep the pipe open.
+#
+# @param    string  command     Command (executed by the shell).
+# @param    float   timeout     Timeout (in seconds).
+#
+# @return   Returns the exit code (None if killed), the output and the
+#               execution time (in seconds).
+def run_hook(command, timeout):
+    time_started = monotonic()
+    process = subprocess.Popen(command, shell=True, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, start_new_session=True)
+    try:
+        output, _ = process.communicate(timeout=timeout)
+        exit_code = process.returncode
+    except subprocess.TimeoutExpired:
+        if hasattr(os, 'killpg'):
+            try:
+                os.killpg(process.pid, 9)
+            except OSError:
+                pass
+        else:
+            process.kill()
+        output, _ = process.communicate()
+        exit_code = None
+
+    return exit_code, output.decode(errors='replace'), monotonic() - time_started
+
+
+# HookRunner
+#
+# Executes the commands (see --cmd_* and --event) in a bounded pool of threads,
+#     so the monitoring continues while they run. The results are printed by
+#     the main thread (see report), as the log-file is not thread-safe.
+class HookRunner:
+    # number of output lines of a command that are printed
+    output_lines = 20
+
+    # __init__
+    #
+    # @param    int     workers     Maximum number of commands running at the
+    #                                   same time.
+    # @param    float   timeout     Timeout of a command (in seconds).
+    #
+    # @return   None
+    def __init__(self, workers, timeout):
+        self.executor = ThreadPoolExecutor(max_workers=max(1, workers))
+        self.timeout = timeout
+        self.pending = []
+
+        self.executed = 0
+        self.failed = 0
+        self.timed_out = 0
+
+    # submit
+    #
+    # @param    string  name        Name of the hook (e.g. cmd_start).
+    # @param    string  command     Command.
+    #
+    # @return   None
+    def submit(self, name, command):
+        if command == None or command == '':
+            return
+        self.pending.append((name, self.executor.submit(run_hook, command, self.timeout)))
+
+    # report
+    #
+    # Prints the exit code and the output of the finished commands.
+    #
+    # @return   Returns True if anything was printed.
+    def report(self):
+        printed = False
+        pending = []
+        for name, future in self.pending:
+            if not future.done():
+                pending.append((name, future))
+                continue
+
+            try:
+                exit_code, output, seconds = future.result()
+            except OSError as e:
+                exit_code, output, seconds = -1, str(e), 0
+
+            self.executed += 1
+            if exit_code == None:
+                self.timed_out += 1
+                myPrint('# hook', name, 'timeout', str(round(seconds, 3)) + ' s', sep='\t')
+            else:
+                if exit_code != 0:
+                    self.failed += 1
+                myPrint('# hook', name, 'exit ' + str(exit_code), str(round(seconds, 3)) + ' s', sep='\t')
+            lines = output.splitlines()
+            if len(lines) > HookRunner.output_lines:
+                myPrint('# hook |', '(' + str(len(lines) - HookRunner.output_lines) + ' lines omitted)', sep='\t')
+                lines = lines[-HookRunner.output_lines:]
+            for line in lines:
+                myPrint('# hook |', line, sep='\t')
+            printed = True
+
+        self.pending = pending
+        return printed
+
+    # wait
+    #
+    # Waits for all commands to finish and prints their results.
+    #
+    # @return   None
+    def wait(self):
+        self.executor.shutdown(wait=True)
+        self.report()
+
+    # statistics
+    #
+    # @return   Returns a list of (name, value) tuples.
+    def statistics(self):
+        return [
+            ('hooks_executed', self.executed),
+            ('hooks_failed', self.failed),
+            ('hooks_timed_out', self.timed_out),
+        ]
+
+
+# Event
+#
+# Threshold of a metric (see --event). The event fires every time the
+#     condition becomes true. Unknown values (negative) are ignored.
+class Event:
+    metrics = ['soc', 'secsleft', 'consumption', 'spp', 'sfb', 'power', 'predicted']
+    operators = {
+        '<=': lambda a, b: a <= b,
+        '>=': lambda a, b: a >= b,
+        '<': lambda a, b: a < b,
+        '>': lambda a, b: a > b,
+    }
+
+    # __init__
+    #
+    # @param    string  condition   Condition: <metric><operator><value>.
+    # @param    string  command     Command executed when the event fires.
+    # @param    bool    terminate   Terminate the script when the event fires.
+    #
+    # @return   None
+    def __init__(self, condition, command, terminate):
+        self.condition = condition.replace(' ', '')
+        self.command = command
+        self.terminate = terminate
+        self.active = False
+
+        for operator in Event.operators:
+            if operator in self.condition:
+                metric, value = self.condition.split(operator, 1)
+                break
+        else:
+            raise ValueError(condition + ' (missing operator)')
+        if metric not in Event.metrics:
+            raise ValueError(condition + ' (unknown metric ' + metric + ')')
+
+        self.metric = metric
+        self.compare = Event.operators[operator]
+        try:
+            self.value = float(value)
+        except ValueError:
+            raise ValueError(condition + ' (invalid value ' + value + ')')
+
+    # check
+    #
+    # @param    dict    values  Current value of each metric.
+    #
+    # @return   Returns True if the condition became true.
+    def check(self, values):
+        value = values[self.metric]
+        if value == None or value < 0:
+            return False
+
+        active = self.compare(value, self.value)
+        fired = active and not self.active
+        self.active = active
+        return fired
+
+
+# parse_events
+#
+# @param    [tuple]     events          (condition, command) (see --event).
+# @param    [tuple]     stop_events     (condition, command) (see --stop_event).
+#
+# @return   Returns the events.
+def parse_events(events, stop_events):
+    parsed = []
+    for condition, command in events or []:
+        parsed.append(Event(condition, command, False))
+    for condition, command in stop_events or []:
+        parsed.append(Event(condition, command, True))
+    return parsed
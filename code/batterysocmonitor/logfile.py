@@ -0,0 +1,638 @@
+#-------------------------------------------------------------------------------
+# BatterySoCMonitor - log-files
+#
+# Writing and reading of the text and binary log-files.
+#-------------------------------------------------------------------------------
+# @author: Andreas Menzel
+# @license: MIT License
+# @copyright: Copyright (c) 2021 Andreas Menzel
+#-------------------------------------------------------------------------------
+
+from array import array
+from collections import namedtuple
+import json
+from math import floor
+import mmap
+import os
+import struct
+import sys
+from time import monotonic, perf_counter
+
+
+# LogSink
+#
+# Keeps the log-file open and collects the written text in memory. The buffer
+#     is written to disk when it exceeds flush_size bytes, when flush_interval
+#     seconds passed since the last flush or when the sink is closed.
+class LogSink:
+    # __init__
+    #
+    # @param    string  filename        Filename of the log-file.
+    # @param    int     flush_size      Buffered bytes that trigger a flush.
+    # @param    int     flush_interval  Seconds after which a flush is forced.
+    #
+    # @return   None
+    def __init__(self, filename, flush_size, flush_interval):
+        self.filename = filename
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+
+        self.file = None
+        self.buffer = []
+        self.buffer_size = 0
+        self.last_flush = monotonic()
+
+        self.writes = 0
+        self.flushes = 0
+        self.bytes_written = 0
+        self.flush_time_total = 0
+        self.flush_time_max = 0
+
+    # write
+    #
+    # Adds the text to the buffer and flushes the buffer if necessary.
+    #
+    # @param    string  text    Text to write.
+    #
+    # @return   None
+    def write(self, text):
+        self.buffer.append(text)
+        self.buffer_size += len(text)
+        self.writes += 1
+
+        if self.buffer_size >= self.flush_size or monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    # flush
+    #
+    # Writes the buffer to the log-file.
+    #
+    # @return   None
+    def flush(self):
+        self.last_flush = monotonic()
+        if len(self.buffer) == 0:
+            return
+
+        flush_start = perf_counter()
+        if self.file == None:
+            self.file = open(self.filename, 'a+')
+        text = ''.join(self.buffer)
+        self.file.write(text)
+        self.file.flush()
+        flush_time = perf_counter() - flush_start
+
+        self.buffer = []
+        self.buffer_size = 0
+        self.flushes += 1
+        self.bytes_written += len(text)
+        self.flush_time_total += flush_time
+        self.flush_time_max = max(self.flush_time_max, flush_time)
+
+    # sync
+    #
+    # Flushes the buffer and waits until the log-file is on the disk (e.g.
+    #     before a command shuts down the system).
+    #
+    # @return   None
+    def sync(self):
+        self.flush()
+        if self.file != None:
+            os.fsync(self.file.fileno())
+
+    # close
+    #
+    # Flushes the buffer and closes the log-file.
+    #
+    # @return   None
+    def close(self):
+        self.flush()
+        if self.file != None:
+            self.file.close()
+            self.file = None
+
+    # statistics
+    #
+    # @return   Returns a list of (name, value) tuples describing the sinks
+    #               write counts and flush latency (in milliseconds).
+    def statistics(self):
+        flush_time_avg = 0
+        if self.flushes > 0:
+            flush_time_avg = self.flush_time_total / self.flushes
+
+        return [
+            ('log_writes', self.writes),
+            ('log_flushes', self.flushes),
+            ('log_bytes', self.bytes_written),
+            ('log_flush_avg_ms', round(flush_time_avg * 1000, 3)),
+            ('log_flush_max_ms', round(self.flush_time_max * 1000, 3)),
+        ]
+
+
+# BinaryLog
+#
+# Log-file with one fixed-width record of float64 values (little-endian) per
+#     sample. The file starts with a versioned header:
+#
+#     magic (8 bytes) | version (uint16) | number of fields (uint16) |
+#     length of the JSON header (uint32) | JSON header | padding to 8 bytes
+#
+#     The JSON header contains the field names and the parameters of the run.
+#     Records are appended with a single write each, so after a crash at most
+#     the last record is incomplete. It is ignored by read_binary_log and
+#     removed when the file is opened for appending again.
+class BinaryLog:
+    description = 'binary log-file'
+    magic = b'BSCMLOG\0'
+    version = 1
+    fields = ['time', 'soc', 'secsleft', 'consumption', 'consumption_spp', 'consumption_sfb', 'power_now', 'energy_now', 'voltage_now', 'current_now']
+
+    # __init__
+    #
+    # @param    string  filename        Filename of the log-file.
+    # @param    dict    parameters      Parameters of the run (for the header).
+    # @param    int     flush_size      Buffered bytes that trigger a flush.
+    # @param    int     flush_interval  Seconds after which a flush is forced.
+    #
+    # @return   None
+    def __init__(self, filename, parameters, flush_size, flush_interval):
+        self.record = struct.Struct('<' + 'd' * len(self.fields))
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.buffer = bytearray()
+        self.last_flush = monotonic()
+
+        if os.path.isfile(filename) and os.path.getsize(filename) > 0:
+            header, offset, count = read_binary_header(filename, type(self))
+            if header['fields'] != self.fields:
+                raise RuntimeError(filename + ' has different fields')
+            self.file = open(filename, 'r+b')
+            # remove an incomplete record
+            self.file.truncate(offset + count * self.record.size)
+            self.file.seek(0, os.SEEK_END)
+        else:
+            self.file = open(filename, 'wb')
+            header = json.dumps({'fields': self.fields, 'parameters': parameters}).encode()
+            data = self.magic + struct.pack('<HHI', self.version, len(self.fields), len(header)) + header
+            data += b'\0' * (-len(data) % 8)
+            self.file.write(data)
+            self.file.flush()
+
+    # write
+    #
+    # @param    [float]     values  One value per field (None if unknown).
+    #
+    # @return   None
+    def write(self, values):
+        self.buffer += self.record.pack(*[float('nan') if v == None else v for v in values])
+        if len(self.buffer) >= self.flush_size or monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    # flush
+    #
+    # Writes the buffered (complete) records to the log-file.
+    #
+    # @return   None
+    def flush(self):
+        self.last_flush = monotonic()
+        if len(self.buffer) > 0:
+            self.file.write(self.buffer)
+            self.file.flush()
+            self.buffer = bytearray()
+
+    # sync
+    #
+    # Writes the buffered records and waits until they are on the disk.
+    #
+    # @return   None
+    def sync(self):
+        self.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+
+# read_binary_header
+#
+# @param    string  filename    Filename of the binary log-file.
+# @param    type    kind        BinaryLog or a subclass with another magic
+#                                   (e.g. Checkpoint).
+#
+# @return   Returns the JSON header, the offset of the first record and the
+#               number of complete records.
+def read_binary_header(filename, kind=BinaryLog):
+    with open(filename, 'rb') as f:
+        data = f.read(16)
+        if len(data) < 16 or data[:8] != kind.magic:
+            raise RuntimeError(filename + ' is not a ' + kind.description)
+        version, field_count, header_length = struct.unpack('<HHI', data[8:])
+        if version > kind.version:
+            raise RuntimeError(filename + ' has the unsupported version ' + str(version))
+        header = json.loads(f.read(header_length))
+
+    offset = 16 + header_length
+    offset += -offset % 8
+    count = (os.path.getsize(filename) - offset) // (field_count * 8)
+    return header, offset, max(count, 0)
+
+
+# is_binary_log
+#
+# @param    string  filename    Filename.
+#
+# @return   Returns True if the file is a binary log-file.
+def is_binary_log(filename):
+    with open(filename, 'rb') as f:
+        return f.read(8) == BinaryLog.magic
+
+
+# read_binary_log
+#
+# Maps the records of a binary log-file into memory without copying them.
+#
+# @param    string  filename    Filename of the binary log-file.
+# @param    type    kind        See read_binary_header.
+#
+# @return   Returns the JSON header and the records as 2-dimensional array
+#               (numpy.memmap, or BinaryRecords if numpy is not installed) with
+#               one row per sample and one column per field.
+def read_binary_log(filename, kind=BinaryLog):
+    header, offset, count = read_binary_header(filename, kind)
+    field_count = len(header['fields'])
+    if count == 0:
+        return header, []
+
+    from .estimators import load_numpy
+    numpy = load_numpy()
+    if numpy != None:
+        return header, numpy.memmap(filename, dtype='<f8', mode='r', offset=offset, shape=(count, field_count))
+
+    with open(filename, 'rb') as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    values = memoryview(data)[offset:offset + count * field_count * 8]
+    if sys.byteorder == 'little':
+        return header, BinaryRecords(values.cast('d'), field_count)
+
+    # the records are little-endian: copied and swapped on big-endian hosts
+    records = array('d', values)
+    records.byteswap()
+    return header, BinaryRecords(records, field_count)
+
+
+# BinaryRecords
+#
+# Rows of a memory-mapped binary log-file if numpy is not installed. The
+#     values of a row are only copied when the row is accessed.
+class BinaryRecords:
+    # __init__
+    #
+    # @param    memoryview  values          Values of all records (flat, or an
+    #                                       array).
+    # @param    int         field_count     Number of fields per record.
+    #
+    # @return   None
+    def __init__(self, values, field_count):
+        self.values = values
+        self.field_count = field_count
+
+    def __len__(self):
+        return len(self.values) // self.field_count
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if index < 0 or index >= len(self):
+            raise IndexError('record index out of range')
+        return self.values[index * self.field_count:(index + 1) * self.field_count].tolist()
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+
+# seconds_to_human_form
+#
+# Transforms the specified time to human readable form.
+#
+# @param    int     seconds     Seconds.
+#
+# @return   Returns the specified time in human readable form
+def seconds_to_human_form(seconds):
+    if seconds < 0:
+        return '00:00:00?'
+
+    hours_int = floor(seconds / 3600)
+    if hours_int < 10:
+        hours_str = '0'
+    else:
+        hours_str = ''
+    hours_str += str(hours_int)
+
+    minutes_int = floor((seconds % 3600) / 60)
+    if minutes_int < 10:
+        minutes_str = '0'
+    else:
+        minutes_str = ''
+    minutes_str += str(minutes_int)
+
+    seconds_int = (seconds % 3600) % 60
+    if seconds_int < 10:
+        seconds_str = '0'
+    else:
+        seconds_str = ''
+    seconds_str += str(seconds_int)
+
+    return hours_str  + ':' + minutes_str + ':' + seconds_str
+
+
+# percentage_to_human_form
+#
+# Transforms the specified percentage to fixed length string.
+#
+# @param    float   percent     Percent.
+#
+# @return   Returns the specified percentage as fixed length string.
+def percentage_to_human_form(percent):
+    # versions before 3.0.0 wrote e.g. 30.08 as 30.80% (see
+    #     resolve_percentage)
+    return '{:6.2f}%'.format(percent)
+
+
+# human_form_to_seconds
+#
+# Transforms a time in human readable form (see seconds_to_human_form) back to
+#     seconds.
+#
+# @param    string  text    Time in human readable form.
+#
+# @return   Returns the time in seconds or -1 if the time was negative.
+def human_form_to_seconds(text):
+    text = text.strip()
+    if text.endswith('?'):
+        return -1
+
+    hours, minutes, seconds = text.split(':')
+    return int(hours) * 3600 + int(minutes) * 60 + int(seconds)
+
+
+# human_form_to_percentage
+#
+# Transforms a percentage in human readable form (see
+#     percentage_to_human_form) back to a number.
+#
+# @param    string  text    Percentage in human readable form.
+#
+# @return   Returns the percentage.
+def human_form_to_percentage(text):
+    return float(text.replace('/ h', '').strip().rstrip('%'))
+
+
+# version_tuple
+#
+# @param    string  version     Version (e.g. 2.3.1).
+#
+# @return   Returns the version as tuple of numbers or None if unknown.
+def version_tuple(version):
+    try:
+        return tuple(int(v) for v in version.split('.'))
+    except (AttributeError, ValueError):
+        return None
+
+
+# ambiguous_percentages
+#
+# @param    string  version     Version of the log-file.
+#
+# @return   Returns True if the log-file was written by a version that wrote
+#               hundredths below 10 as tenths (e.g. 30.08 as 30.80%).
+def ambiguous_percentages(version):
+    version = version_tuple(version)
+    return version == None or version < (3, 0, 0)
+
+
+# resolve_percentage
+#
+# Transforms a percentage in human readable form of an affected version (see
+#     ambiguous_percentages) back to a number. x.d0% was written for x.d0 and
+#     for x.0d, the candidate nearer to the previous value is chosen.
+#
+# @param    string  text        Percentage in human readable form.
+# @param    float   previous    Previous value of the column (None if
+#                                   unknown).
+#
+# @return   Returns the percentage and whether it was corrected.
+def resolve_percentage(text, previous):
+    value = human_form_to_percentage(text)
+    number = text.replace('/ h', '').strip().rstrip('%')
+    whole, _, fraction = number.partition('.')
+    if previous == None or previous < 0 or value < 0 or len(fraction) != 2 or fraction[1] != '0' or fraction[0] == '0':
+        return value, False
+
+    candidate = float(whole + '.0' + fraction[0])
+    if abs(candidate - previous) < abs(value - previous):
+        return candidate, True
+    return value, False
+
+
+# LogSample
+#
+# One data row of a log-file. Columns that are missing in the log-file are -1
+#     (e.g. the power, see --battery).
+LogSample = namedtuple('LogSample', 'time soc secsleft consumption consumption_spp consumption_sfb power')
+
+
+# read_log
+#
+# Reads the data rows of a log-file written by any version of this script.
+#     The file is read line by line and the rows are yielded one at a time.
+#     The version, the parameters (dictionary) and whether the output was
+#     beautified are saved in info as soon as they are known. The rows of a
+#     resumed run (see --resume) that was appended after the summary are read
+#     as well, info['resumes'] counts the resumes read so far (the rows after a
+#     resume are not connected to the rows before). The last sample before a
+#     resume is read from the resume marker if it was not logged (see
+#     --output_rate). The numeric values of the
+#     telemetry (see --telemetry) are summed up in info['telemetry'] (name:
+#     [sum, count]). The ambiguous percentages
+#     of beautified log-files of older versions are resolved (see
+#     resolve_percentage), info['corrected_percentages'] counts the
+#     corrections.
+#
+# @param    string  filename    Filename of the log-file.
+# @param    dict    info        Dictionary for the information of the header.
+#
+# @return   Yields a LogSample for each data row.
+def read_log(filename, info):
+    info['version'] = None
+    info['beautify'] = None
+    info['parameters'] = {}
+    info['telemetry'] = {}
+    info['corrected_percentages'] = 0
+    info['resumes'] = 0
+
+    if is_binary_log(filename):
+        header, records = read_binary_log(filename)
+        info['version'] = header['parameters'].get('version')
+        info['beautify'] = False
+        info['parameters'] = header['parameters']
+        for record in records:
+            values = [-1 if v != v else v for v in record[:7]]
+            yield LogSample(*values)
+        return
+
+    summary = False
+    ambiguous = None
+    previous = [None] * 7
+    with open(filename, 'r') as f:
+        for line in f:
+            if summary:
+                if line.startswith('# Welcome back'):
+                    summary = False
+                elif 'BatterySoCMonitor version' in line:
+                    # another run
+                    return
+                continue
+
+            if line.startswith('#'):
+                if 'BatterySoCMonitor version' in line:
+                    info['version'] = line.split('version')[1].strip(' !\n')
+                elif line.startswith('# Script started at') or line.startswith('# script_startet_at'):
+                    # summary of the script
+                    summary = True
+                elif line.startswith('# resumed_at\t'):
+                    # <sec> <sample_rate> [<sec> <soc> <until> of the last sample]
+                    fields = line.rstrip('\n').split('\t')[1:]
+                    if len(fields) >= 2:
+                        info['parameters'].setdefault('sample_rate', fields[1])
+                    if len(fields) >= 5:
+                        try:
+                            values = [float(v) for v in fields[2:5]] + [-1] * 4
+                        except ValueError:
+                            values = None
+                        if values != None and (previous[0] == None or values[0] > previous[0]):
+                            previous = values
+                            yield LogSample(*values)
+                    info['resumes'] += 1
+                elif line.startswith('# telemetry\t') and not line.startswith('# telemetry\t:'):
+                    for value in line.rstrip('\n').split('\t')[2:]:
+                        name, _, value = value.partition('=')
+                        try:
+                            value = float(value)
+                        except ValueError:
+                            # e.g. the processes
+                            continue
+                        total = info['telemetry'].setdefault(name, [0, 0])
+                        total[0] += value
+                        total[1] += 1
+                elif line.startswith('# hook') or line.startswith('# event') or line.startswith('# phase'):
+                    continue
+                elif ':' in line and not line.startswith('# <'):
+                    key, value = line[1:].split(':', 1)
+                    info['parameters'][key.strip()] = value.strip()
+                continue
+
+            columns = line.rstrip('\n').split('\t')
+            if info['beautify'] == None:
+                if 'beautify' in info['parameters']:
+                    info['beautify'] = info['parameters']['beautify'] == 'True'
+                else:
+                    info['beautify'] = ':' in columns[0]
+
+            values = [-1] * 7
+            try:
+                if info['beautify']:
+                    if ambiguous == None:
+                        ambiguous = ambiguous_percentages(info['version'])
+                    for i, column in enumerate(columns[:6]):
+                        if i != 1 and i != 3:
+                            values[i] = human_form_to_seconds(column)
+                        elif ambiguous:
+                            values[i], corrected = resolve_percentage(column, previous[i])
+                            if corrected:
+                                info['corrected_percentages'] += 1
+                        else:
+                            values[i] = human_form_to_percentage(column)
+                else:
+                    for i, column in enumerate(columns[:6]):
+                        values[i] = float(column)
+            except ValueError:
+                # table header or message
+                continue
+
+            if len(columns) < 2:
+                continue
+
+            # the power (see --battery) is optional
+            if len(columns) > 6:
+                try:
+                    values[6] = float(columns[6].strip().rstrip('W'))
+                except ValueError:
+                    pass
+
+            previous = values
+            yield LogSample(*values)
+
+
+# binary_values
+#
+# @param    LogSample   sample  Data row of a text log-file.
+#
+# @return   Returns the values of the sample for BinaryLog.write (the power is
+#               None if unknown, the other fields are not in text log-files).
+def binary_values(sample):
+    values = list(sample)
+    if values[6] < 0:
+        values[6] = None
+    return values + [None] * 3
+
+
+# convert
+#
+# Converts a log-file from the text to the binary format or vice versa.
+#
+# @param    string  filename_in     Filename of the input log-file.
+# @param    string  filename_out    Filename of the output log-file.
+# @param    int     flush_size      See LogSink.
+# @param    int     flush_interval  See LogSink.
+# @param    bool    force           Overwrite the output log-file if it
+#                                       exists.
+#
+# @return   None
+def convert(filename_in, filename_out, flush_size, flush_interval, force=False):
+    if os.path.exists(filename_out):
+        if not force:
+            raise RuntimeError(filename_out + ' already exists (see --force)')
+        if os.path.samefile(filename_in, filename_out):
+            raise RuntimeError('the input and the output log-file are the same file')
+
+    if is_binary_log(filename_in):
+        header, records = read_binary_log(filename_in)
+        parameters = header['parameters']
+        with open(filename_out, 'w') as f:
+            f.write('# Welcome to BatterySoCMonitor version ' + str(parameters.get('version')) + '!\n')
+            for key, value in parameters.items():
+                if key != 'version':
+                    f.write('# ' + key + '\t:\t' + str(value) + '\n')
+            f.write('\n# <sec>\t<soc>\t<until>\t<cons>\t<sec/%>\t<sec/100%>\t<W>\n')
+            for record in records:
+                values = [-1 if v != v else v for v in record[:7]]
+                # like the monitor, sub-second times keep 3 decimals
+                time_executed = round(values[0], 3)
+                if time_executed == round(time_executed):
+                    time_executed = round(time_executed)
+                f.write('\t'.join([str(time_executed), str(round(values[1], 2)), str(round(values[2])), str(values[3]), str(round(values[4])), str(round(values[5])), str(round(values[6], 3))]) + '\n')
+    else:
+        info = {}
+        samples = read_log(filename_in, info)
+        first = next(samples, None)
+        parameters = dict(info['parameters'])
+        parameters['version'] = info['version']
+        if os.path.exists(filename_out):
+            os.remove(filename_out)
+        binary_log = BinaryLog(filename_out, parameters, flush_size, flush_interval)
+        if first != None:
+            binary_log.write(binary_values(first))
+        for sample in samples:
+            binary_log.write(binary_values(sample))
+        binary_log.close()
@@ -0,0 +1,151 @@
+#-------------------------------------------------------------------------------
+# BatterySoCMonitor - metrics
+#
+# Export of the current values in the OpenMetrics format.
+#-------------------------------------------------------------------------------
+# @author: Andreas Menzel
+# @license: MIT License
+# @copyright: Copyright (c) 2021 Andreas Menzel
+#-------------------------------------------------------------------------------
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import os
+from resource import getrusage, RUSAGE_SELF
+from threading import Thread
+
+
+# resident_memory
+#
+# @return   Returns the resident memory of the process (in bytes) from
+#               /proc/self/statm, or None if it is not available.
+def resident_memory():
+    try:
+        with open('/proc/self/statm') as file:
+            pages = int(file.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+# MetricsHandler
+#
+# Answers the scrapes of the MetricsExporter.
+class MetricsHandler(BaseHTTPRequestHandler):
+    # do_GET
+    #
+    # @return   None
+    def do_GET(self):
+        if self.path.split('?')[0] not in ['/', '/metrics']:
+            self.send_error(404)
+            return
+
+        body = self.server.exporter.render().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/openmetrics-text; version=1.0.0; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    # log_message
+    #
+    # Scrapes are not printed, the console belongs to the monitor.
+    #
+    # @return   None
+    def log_message(self, format, *arguments):
+        pass
+
+
+# MetricsExporter
+#
+# Serves the current values in the OpenMetrics format from a background
+#     thread (see --metrics). The main thread only replaces the reference to
+#     the latest snapshot (see publish), so a scrape never blocks or delays a
+#     sample. The snapshot is formatted by the thread answering the scrape.
+#     Only local connections are accepted unless another host is given.
+class MetricsExporter:
+    prefix = 'batterysocmonitor_'
+    # (name, type, help) of the values of a snapshot
+    metrics = [
+        ('elapsed_seconds', 'gauge', 'Seconds since the start of the monitoring.'),
+        ('soc_percent', 'gauge', 'State of charge of the battery.'),
+        ('secsleft_seconds', 'gauge', 'Remaining time reported by the battery.'),
+        ('consumption_percent_per_hour', 'gauge', 'Approximated consumption.'),
+        ('seconds_per_percent', 'gauge', 'Approximated seconds per percent of the state of charge.'),
+        ('seconds_per_full_charge', 'gauge', 'Approximated seconds from 100% to 0%.'),
+        ('power_watts', 'gauge', 'Power reported by the battery.'),
+        ('samples', 'counter', 'Number of samples.'),
+        ('tick_duration_seconds', 'gauge', 'Duration of the last sample (without sleeping).'),
+        ('missed_ticks', 'counter', 'Number of skipped samples.'),
+        ('overruns', 'counter', 'Number of samples that took longer than the sample rate.'),
+        ('jitter_max_seconds', 'gauge', 'Maximum delay of a wakeup.'),
+        ('predicted_seconds', 'gauge', 'Predicted seconds until the minimum state of charge (see --history).'),
+    ]
+    # values that are negative (-1) while unknown
+    unknown_if_negative = ['secsleft_seconds', 'consumption_percent_per_hour', 'seconds_per_percent', 'seconds_per_full_charge', 'predicted_seconds']
+
+    # __init__
+    #
+    # @param    string  address     [<host>:]<port> (port 0: any free port,
+    #                                   see port)
+    #
+    # @return   None
+    def __init__(self, address):
+        host = '127.0.0.1'
+        port = address
+        if ':' in address:
+            host, port = address.rsplit(':', 1)
+
+        self.snapshot = None
+        self.server = ThreadingHTTPServer((host, int(port)), MetricsHandler)
+        self.server.daemon_threads = True
+        self.server.exporter = self
+        self.port = self.server.server_address[1]
+        self.thread = Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    # publish
+    #
+    # @param    tuple   snapshot    Values in the order of metrics. Unknown
+    #                                   values are None (or negative, see
+    #                                   unknown_if_negative).
+    #
+    # @return   None
+    def publish(self, snapshot):
+        self.snapshot = snapshot
+
+    # render
+    #
+    # @return   Returns the latest snapshot and the resource usage of the
+    #               process in the OpenMetrics text format. Unknown values (and
+    #               the resident memory without /proc) are omitted.
+    def render(self):
+        snapshot = self.snapshot
+        lines = []
+        if snapshot != None:
+            for (name, kind, description), value in zip(MetricsExporter.metrics, snapshot):
+                if value == None or (name in MetricsExporter.unknown_if_negative and value < 0):
+                    continue
+                lines.append('# TYPE ' + MetricsExporter.prefix + name + ' ' + kind)
+                lines.append('# HELP ' + MetricsExporter.prefix + name + ' ' + description)
+                if kind == 'counter':
+                    name += '_total'
+                lines.append(MetricsExporter.prefix + name + ' ' + str(value))
+
+        usage = getrusage(RUSAGE_SELF)
+        lines.append('# TYPE process_cpu_seconds counter')
+        lines.append('# HELP process_cpu_seconds CPU time of the monitor.')
+        lines.append('process_cpu_seconds_total ' + str(round(usage.ru_utime + usage.ru_stime, 3)))
+        rss = resident_memory()
+        if rss != None:
+            lines.append('# TYPE process_resident_memory_bytes gauge')
+            lines.append('# HELP process_resident_memory_bytes Resident memory of the monitor.')
+            lines.append('process_resident_memory_bytes ' + str(rss))
+        lines.append('# EOF')
+        return '\n'.join(lines) + '\n'
+
+    # close
+    #
+    # @return   None
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,978 @@
+#-------------------------------------------------------------------------------
+# BatterySoCMonitor - monitor
+#
+# Monitoring of the battery (the monitor command).
+#-------------------------------------------------------------------------------
+# @author: Andreas Menzel
+# @license: MIT License
+# @copyright: Copyright (c) 2021 Andreas Menzel
+#-------------------------------------------------------------------------------
+
+from datetime import datetime
+from math import floor
+import os
+from platform import platform, system
+from signal import signal, SIGINT, SIGTERM
+from sys import exit, stdout
+from time import strftime, time, localtime, monotonic, perf_counter
+
+from . import script_version
+from .estimators import create_estimator
+from .logfile import LogSink, BinaryLog, percentage_to_human_form, seconds_to_human_form
+from . import output
+from .output import myPrint, close_log_sink, close_dashboard, end_error, clear_previous_line, keep_previous_line, sync_log_sink, terminal_escapes
+from .phases import DischargeTimeline, PhaseDetector, print_phase
+from .sensors import create_sensor
+from .timing import SystemClock, VirtualClock, Scheduler, Profiler
+
+args = None
+sensor = None
+clock = None
+scheduler = None
+worker_threads = []
+worker_utilization = []
+events = []
+hook_runner = None
+metrics_exporter = None
+history = None
+history_battery = None
+discharge_tracker = None
+checkpoint = None
+telemetry = None
+time_start = None
+time_offset = 0 # seconds between time_start and the start of this process (see --resume)
+time_end = None
+battery_soc_start = None
+battery_soc_end = None
+expected_remaining_time_start = None
+expected_remaining_time_end = None
+median_consumption_start = None
+median_consumption_end = None
+median_consumption_spp_start = None
+median_consumption_spp_end = None
+median_consumption_sfb_start = None
+median_consumption_sfb_end = None
+
+consumption_estimator = None
+phase_detector = None
+discharge_timeline = None
+output_lines = 1 # lines of the last output in the terminal (see clear_previous_line)
+last_row = None # row of the last sample if it was not printed (see print_row)
+
+
+# print_history
+#
+# Prints the model of the battery (see HistoryStore.model).
+#
+# @param    dict    model       Model of the battery.
+# @param    int     predicted   Predicted seconds until --minimum_soc or None.
+#
+# @return   None
+def print_history(model, predicted):
+    myPrint('# history_runs', ':', model['runs'], sep='\t')
+    for name, unit in [('runtime', 'h'), ('health', '%')]:
+        if name in model:
+            myPrint('# history_' + name + '_' + unit, ':', round(model[name], 2), sep='\t')
+            myPrint('# history_' + name + '_' + unit + '_per_year', ':', round(model[name + '_per_year'], 2), sep='\t')
+    if predicted != None:
+        if args.beautify and predicted >= 0:
+            predicted = seconds_to_human_form(predicted)
+        myPrint('# history_predicted', ':', predicted, sep='\t')
+
+
+# print_row
+#
+# Prints a data row.
+#
+# @param    tuple   row     Time, state of charge, remaining time, consumption
+#                               in (% / h), (sec / %) and (sec / 100%) and the
+#                               power (None if the battery does not report
+#                               it).
+#
+# @return   None
+def print_row(row):
+    time_executed, state_of_charge, seconds_left, consumption, consumption_spp, consumption_sfb, power = row
+    if args.beautify:
+        myPrint(seconds_to_human_form(round(time_executed)), end='\t')
+        myPrint(percentage_to_human_form(state_of_charge), end='\t')
+        myPrint(seconds_to_human_form(seconds_left), end='\t')
+        myPrint(percentage_to_human_form(consumption), '/ h', end='\t')
+        myPrint(seconds_to_human_form(consumption_spp), end='\t')
+        if power != None:
+            myPrint(seconds_to_human_form(consumption_sfb), end='\t')
+            myPrint('{:6.2f} W'.format(power))
+        else:
+            myPrint(seconds_to_human_form(consumption_sfb))
+    else:
+        myPrint(time_executed, end='\t')
+        myPrint(state_of_charge, end='\t')
+        myPrint(seconds_left, end='\t')
+        myPrint(consumption, end='\t')
+        myPrint(consumption_spp, end='\t')
+        if power != None:
+            myPrint(consumption_sfb, end='\t')
+            myPrint(power)
+        else:
+            myPrint(consumption_sfb)
+
+
+# replay
+#
+# Replays the samples of a checkpoint (see --resume), so the estimator, the
+#     phases, the events and the history continue where the previous process
+#     stopped.
+#
+# @param    [dict]  samples     Records of the checkpoint.
+#
+# @return   Returns the last consumption in (% / h), (sec / %) and
+#               (sec / 100%).
+def replay(samples):
+    global median_consumption_start
+    global median_consumption_spp_start
+    global median_consumption_sfb_start
+
+    estimate = (-1, -1, -1)
+    for sample in samples:
+        plugged = sample['power_plugged']
+        if plugged != None:
+            plugged = plugged == 1
+        phase_detector.update(sample['time'], sample['soc'], plugged)
+
+        # the estimator only got the discharging samples
+        if sample['estimator_time'] == None:
+            discharge_timeline.interrupt()
+            if discharge_tracker != None:
+                discharge_tracker.interrupt()
+        else:
+            discharge_timeline.restore(sample['estimator_time'], sample['estimator_soc'])
+            estimate = consumption_estimator.update(sample['estimator_time'], sample['estimator_soc'])
+            if discharge_tracker != None:
+                discharge_tracker.update(sample['estimator_time'], sample['soc'], plugged)
+        consumption, consumption_spp, consumption_sfb = estimate
+
+        if median_consumption_start == None and consumption != -1:
+            median_consumption_start = consumption
+        if median_consumption_spp_start == None and consumption_spp != -1:
+            median_consumption_spp_start = consumption_spp
+        if median_consumption_sfb_start == None and consumption_sfb != -1:
+            median_consumption_sfb_start = consumption_sfb
+
+        predicted = -1
+        if discharge_tracker != None:
+            predicted = discharge_tracker.predict(sample['soc'], args.minimum_soc or 0)
+
+        # events that already fired do not fire again
+        values = {
+            'soc': sample['soc'],
+            'secsleft': sample['secsleft'],
+            'consumption': consumption,
+            'spp': consumption_spp,
+            'sfb': consumption_sfb,
+            'power': sample['power_now'],
+            'predicted': predicted,
+        }
+        for event in events:
+            event.check(values)
+
+    discharge_timeline.interrupt()
+    if discharge_tracker != None:
+        discharge_tracker.interrupt()
+    return estimate
+
+
+# run_parameters
+#
+# @return   Returns the parameters of the run (see --verbose) as dictionary.
+def run_parameters():
+    return {
+        'version': script_version,
+        'sample_rate': args.sample_rate,
+        'output_rate': args.output_rate,
+        'verbose': args.verbose,
+        'beautify': args.beautify,
+        'log_file': args.log_file,
+        'minimum_soc': args.minimum_soc,
+        'maximum_soc': args.maximum_soc,
+        'cmd_start': args.cmd_start,
+        'cmd_end': args.cmd_end,
+        'event': args.event,
+        'stop_event': args.stop_event,
+        'workers': args.workers,
+        'sensor': sensor.name,
+        'simulate': args.simulate,
+        'metrics': args.metrics,
+        'history': args.history,
+        'dashboard': args.dashboard,
+        'checkpoint': args.checkpoint,
+        'telemetry': args.telemetry,
+        'OS': platform(),
+        'time_started': round(clock.time()),
+    }
+
+
+# main
+#
+# Main function.
+#
+# @return   None
+def main():
+    global scheduler
+    global sensor
+    global clock
+    global worker_threads
+    global time_start
+    global battery_soc_start
+    global expected_remaining_time_start
+    global median_consumption_start
+    global median_consumption_spp_start
+    global median_consumption_sfb_start
+    global consumption_estimator
+    global phase_detector
+    global discharge_timeline
+    global events
+    global hook_runner
+    global metrics_exporter
+    global history
+    global history_battery
+    global discharge_tracker
+    global checkpoint
+    global telemetry
+    global time_offset
+    global output_lines
+    global last_row
+
+    # Initialize sample_rate and output_rate
+    if args.sample_rate == None and args.output_rate == None:
+        args.sample_rate = 10
+        args.output_rate = 10
+    elif args.sample_rate == None and args.output_rate != None:
+        args.sample_rate = args.output_rate
+    elif args.sample_rate != None and args.output_rate == None:
+        args.output_rate = args.sample_rate
+    else:
+        if abs(args.output_rate / args.sample_rate - round(args.output_rate / args.sample_rate)) > 1e-9:
+            myPrint('ERROR: --output_rate must be a multiple of --sample_rate')
+            end_error()
+    if not args.sample_rate > 0 or not args.output_rate > 0:
+        myPrint('ERROR: --sample_rate and --output_rate must be positive')
+        end_error()
+    output_every = round(args.output_rate / args.sample_rate)
+    if args.dashboard != None:
+        if not args.dashboard > 0:
+            myPrint('ERROR: --dashboard must be positive')
+            end_error()
+        if not stdout.isatty():
+            myPrint('ERROR: --dashboard requires a terminal')
+            end_error()
+    if args.sample_rate == round(args.sample_rate):
+        args.sample_rate = round(args.sample_rate)
+    if args.output_rate == round(args.output_rate):
+        args.output_rate = round(args.output_rate)
+
+    workloads = []
+    chunk = None
+    if args.workers != None:
+        from .workers import calibrate_workload, parse_workload
+        try:
+            workloads = [parse_workload(w) for w in args.workers]
+        except ValueError as e:
+            myPrint('ERROR: invalid worker job:', e)
+            end_error()
+        chunk = calibrate_workload()
+
+    from .hooks import HookRunner, parse_events
+    try:
+        events = parse_events(args.event, args.stop_event)
+    except ValueError as e:
+        myPrint('ERROR: invalid event:', e)
+        end_error()
+    hook_runner = HookRunner(args.hook_workers, args.hook_timeout)
+
+    if args.simulate != None:
+        clock = VirtualClock(time())
+    else:
+        clock = SystemClock()
+
+    if args.log_file == '#NOT_SET#':
+        args.log_file = 'BatterySoCMonitor_' + str(datetime.fromtimestamp(clock.time()).strftime('%Y-%m-%d_%H-%M-%S')) + '_' + system() + '.log'
+
+    if args.log_file != None:
+        output.log_sink = LogSink(args.log_file, args.log_flush_size, args.log_flush_interval)
+
+    consumption_estimator = create_estimator(args.estimator, args.window)
+    phase_detector = PhaseDetector()
+    discharge_timeline = DischargeTimeline()
+    estimate = (-1, -1, -1)
+
+    try:
+        sensor = create_sensor(args, clock)
+    except RuntimeError as e:
+        myPrint('ERROR:', e)
+        end_error()
+
+    telemetry_names = None
+    telemetry_skipped = []
+    if args.telemetry != None:
+        from .telemetry import create_telemetry
+        if not args.telemetry_budget > 0 or args.telemetry_processes < 1:
+            myPrint('ERROR: --telemetry_budget and --telemetry_processes must be positive')
+            end_error()
+        try:
+            telemetry, telemetry_skipped = create_telemetry(args.telemetry, args.telemetry_processes, args.sample_rate * args.telemetry_budget / 100)
+        except (RuntimeError, ValueError) as e:
+            myPrint('ERROR: invalid telemetry:', e)
+            end_error()
+        telemetry_names = ', '.join(telemetry.collector_names())
+
+    if args.history != None:
+        import sqlite3
+        from .history import HistoryStore, DischargeTracker
+        from .sensors import battery_identity
+        try:
+            history = HistoryStore(args.history)
+            history_battery = history.battery(*battery_identity(sensor))
+            history_model = history.model(history_battery, clock.time())
+        except sqlite3.Error as e:
+            myPrint('ERROR: could not open the history:', e)
+            end_error()
+        discharge_tracker = DischargeTracker(history_model)
+
+    # continue the run of the checkpoint
+    session = None
+    samples = []
+    if args.resume and args.checkpoint == None:
+        myPrint('ERROR: --resume requires --checkpoint')
+        end_error()
+    if args.checkpoint != None and os.path.isfile(args.checkpoint) and os.path.getsize(args.checkpoint) > 0:
+        if not args.resume:
+            myPrint('ERROR: the checkpoint', args.checkpoint, 'already exists (see --resume)')
+            end_error()
+        from .checkpoint import read_checkpoint
+        try:
+            session, samples = read_checkpoint(args.checkpoint)
+        except (OSError, RuntimeError, ValueError) as e:
+            myPrint('ERROR: could not read the checkpoint:', e)
+            end_error()
+        estimate = replay(samples)
+
+    if session == None:
+        time_start = clock.time()
+    battery = sensor.read()
+    if session == None:
+        battery_soc_start = round(battery.percent)
+        expected_remaining_time_start = round(battery.secsleft)
+    else:
+        time_start = session['time_start']
+        battery_soc_start = session['soc_start']
+        expected_remaining_time_start = session['secsleft_start']
+    show_power = battery.power_now != None
+
+    # execute start command
+    hook_runner.submit('cmd_start', args.cmd_start)
+
+    if session == None:
+        myPrint('# Welcome to BatterySoCMonitor version ', script_version, '!', sep='')
+    else:
+        myPrint('# Welcome back to BatterySoCMonitor version ', script_version, '!', sep='')
+
+    # print parameter values
+    if args.verbose:
+        if args.beautify:
+            myPrint('# sample_rate', '\t', ':\t', args.sample_rate, sep='')
+            myPrint('# output_rate', '\t', ':\t', args.output_rate, sep='')
+            myPrint('# verbose', '\t', ':\t', args.verbose, sep='')
+            myPrint('# beautify', '\t', ':\t', args.beautify, sep='')
+            myPrint('# log_file', '\t', ':\t', args.log_file, sep='')
+            myPrint('# log_flush_size', '\t', ':\t', args.log_flush_size, sep='')
+            myPrint('# log_flush_interval', '\t', ':\t', args.log_flush_interval, sep='')
+            myPrint('# minimum_soc', '\t', ':\t', args.minimum_soc, sep='')
+            myPrint('# maximum_soc', '\t', ':\t', args.maximum_soc, sep='')
+            myPrint('# cmd_start', '\t', ':\t', args.cmd_start, sep='')
+            myPrint('# cmd_end', '\t', ':\t', args.cmd_end, sep='')
+            myPrint('# event', '\t', ':\t', args.event, sep='')
+            myPrint('# stop_event', '\t', ':\t', args.stop_event, sep='')
+            myPrint('# hook_timeout', '\t', ':\t', args.hook_timeout, sep='')
+            myPrint('# workers', '\t', ':\t', args.workers, sep='')
+            myPrint('# worker_speed', '\t', ':\t', chunk, ' iterations / ms', sep='')
+            myPrint('# sensor', '\t', ':\t', sensor.name, sep='')
+            myPrint('# simulate', '\t', ':\t', args.simulate, sep='')
+            myPrint('# metrics', '\t', ':\t', args.metrics, sep='')
+            myPrint('# history', '\t', ':\t', args.history, sep='')
+            myPrint('# dashboard', '\t', ':\t', args.dashboard, sep='')
+            myPrint('# checkpoint', '\t', ':\t', args.checkpoint, sep='')
+            myPrint('# resume', '\t', ':\t', args.resume, sep='')
+            myPrint('# profile_self', '\t', ':\t', args.profile_self, sep='')
+            myPrint('# telemetry', '\t', ':\t', telemetry_names, sep='')
+            myPrint('# telemetry_budget', '\t', ':\t', args.telemetry_budget, '%', sep='')
+            if len(telemetry_skipped) > 0:
+                myPrint('# telemetry_skipped', '\t', ':\t', ', '.join(telemetry_skipped), sep='')
+            myPrint('#')
+            myPrint('# OS', '\t\t' ':\t', platform(), sep='')
+            myPrint('# time_started', '\t', ':\t', str(datetime.fromtimestamp(clock.time()).strftime('%Y-%m-%d %H:%M:%S')), sep='')
+        else:
+            myPrint('# sample_rate', '\t', ':\t', args.sample_rate, sep='')
+            myPrint('# output_rate', '\t', ':\t', args.output_rate, sep='')
+            myPrint('# verbose', ':', args.verbose, sep='\t')
+            myPrint('# beautify', ':', args.beautify, sep='\t')
+            myPrint('# log_file', ':', args.log_file, sep='\t')
+            myPrint('# log_flush_size', ':', args.log_flush_size, sep='\t')
+            myPrint('# log_flush_interval', ':', args.log_flush_interval, sep='\t')
+            myPrint('# minimum_soc', ':', args.minimum_soc, sep='\t')
+            myPrint('# maximum_soc', ':', args.maximum_soc, sep='\t')
+            myPrint('# cmd_start', ':', args.cmd_start, sep='\t')
+            myPrint('# cmd_end', ':', args.cmd_end, sep='\t')
+            myPrint('# event', ':', args.event, sep='\t')
+            myPrint('# stop_event', ':', args.stop_event, sep='\t')
+            myPrint('# hook_timeout', ':', args.hook_timeout, sep='\t')
+            myPrint('# workers', ':', args.workers, sep='\t')
+            myPrint('# worker_speed', ':', chunk, sep='\t')
+            myPrint('# sensor', ':', sensor.name, sep='\t')
+            myPrint('# simulate', ':', args.simulate, sep='\t')
+            myPrint('# metrics', ':', args.metrics, sep='\t')
+            myPrint('# history', ':', args.history, sep='\t')
+            myPrint('# dashboard', ':', args.dashboard, sep='\t')
+            myPrint('# checkpoint', ':', args.checkpoint, sep='\t')
+            myPrint('# resume', ':', args.resume, sep='\t')
+            myPrint('# profile_self', ':', args.profile_self, sep='\t')
+            myPrint('# telemetry', ':', telemetry_names, sep='\t')
+            myPrint('# telemetry_budget', ':', args.telemetry_budget, sep='\t')
+            if len(telemetry_skipped) > 0:
+                myPrint('# telemetry_skipped', ':', ', '.join(telemetry_skipped), sep='\t')
+            myPrint('#')
+            myPrint('# OS', ':', platform(), sep='\t')
+            myPrint('# time_started', '\t', ':\t', round(clock.time()), sep='')
+
+    if session != None:
+        myPrint()
+        if args.beautify:
+            myPrint('# Resuming the run started at', strftime("%d.%m.%Y %H:%M:%S", localtime(time_start)), '(' + str(len(samples)), 'samples).')
+        else:
+            myPrint('# run_started_at', floor(time_start), sep='\t')
+            myPrint('# resumed_samples', ':', len(samples), sep='\t')
+
+    if history != None:
+        myPrint()
+        print_history(history_model, discharge_tracker.predict(battery.percent, args.minimum_soc or 0))
+
+    if args.beautify:
+        myPrint()
+        if show_power:
+            myPrint('timeExecuted\tbat %\ttimeRemaining\tconsumption\ttime / %\ttime / 100%\tpower')
+            myPrint('hh:mm:ss\t\thh:mm:ss\t(median)\t(median)')
+            myPrint('---------\t-------\t---------\t-----------\t---------\t---------\t-----')
+        else:
+            myPrint('timeExecuted\tbat %\ttimeRemaining\tconsumption\ttime / %\ttime / 100%')
+            myPrint('hh:mm:ss\t\thh:mm:ss\t(median)\t(median)')
+            myPrint('---------\t-------\t---------\t-----------\t---------\t---------')
+    else:
+        myPrint()
+        if show_power:
+            myPrint('# <sec>\t<soc>\t<until>\t<cons>\t<sec/%>\t<sec/100%>\t<W>')
+        else:
+            myPrint('# <sec>\t<soc>\t<until>\t<cons>\t<sec/%>\t<sec/100%>')
+
+    if args.binary_log != None:
+        try:
+            output.binary_log = BinaryLog(args.binary_log, run_parameters(), args.log_flush_size, args.log_flush_interval)
+        except (OSError, RuntimeError, ValueError) as e:
+            myPrint('ERROR:', e)
+            end_error()
+
+    if args.metrics != None:
+        from .metrics import MetricsExporter
+        try:
+            metrics_exporter = MetricsExporter(args.metrics)
+        except (OSError, ValueError) as e:
+            myPrint('ERROR: could not export the metrics:', e)
+            end_error()
+
+    if session == None:
+        time_start = clock.time()
+    else:
+        # the time continues after the last sample (also if the clock was set
+        #     back while the script was not running)
+        time_offset = clock.time() - time_start
+        if len(samples) > 0:
+            time_offset = max(time_offset, samples[-1]['time'] + args.sample_rate)
+        # the rows before and after are not connected, the last sample of the
+        #     checkpoint may not be in the log-file (see read_log)
+        if len(samples) > 0:
+            myPrint('# resumed_at', floor(time_offset), args.sample_rate, samples[-1]['time'], samples[-1]['soc'], samples[-1]['secsleft'], sep='\t')
+        else:
+            myPrint('# resumed_at', floor(time_offset), args.sample_rate, sep='\t')
+
+    if args.checkpoint != None:
+        from .checkpoint import Checkpoint
+        parameters = run_parameters()
+        parameters['time_start'] = time_start
+        parameters['soc_start'] = battery_soc_start
+        parameters['secsleft_start'] = expected_remaining_time_start
+        try:
+            checkpoint = Checkpoint(args.checkpoint, parameters, args.checkpoint_interval)
+        except (OSError, RuntimeError, ValueError) as e:
+            myPrint('ERROR: could not write the checkpoint:', e)
+            end_error()
+
+    # create and start worker thread(s)
+    if args.workers != None:
+        from multiprocessing import Process
+        from .workers import worker_cpuLoad, worker_workload
+        for w, phases in zip(args.workers, workloads):
+            if w == 'cpuLoad':
+                worker_threads.append(Process(target=worker_cpuLoad))
+            else:
+                worker_threads.append(Process(target=worker_workload, args=(phases, chunk)))
+
+        for w, wt in zip(args.workers, worker_threads):
+            wt.start()
+            worker_utilization.append((w, monotonic()))
+
+    myPrint()
+    if args.dashboard != None:
+        from .dashboard import Dashboard
+        output.dashboard = Dashboard(args.dashboard, show_power, discharge_tracker != None, args.history_size)
+    scheduler = Scheduler(clock, args.sample_rate)
+    if args.profile_self:
+        output.profiler = Profiler()
+    sample_counter = 0
+    # samples of the run (sample_counter also counts the missed ticks)
+    samples_taken = len(samples)
+    while True:
+        tick_started = perf_counter()
+        battery = sensor.read()
+        if output.profiler != None:
+            output.profiler.lap('sensor')
+        if telemetry != None:
+            telemetry.collect()
+            if output.profiler != None:
+                output.profiler.lap('telemetry')
+        state_of_charge = round(battery.percent, 2)
+
+        seconds_left = round(battery.secsleft)
+
+        power = -1
+        if battery.power_now != None:
+            power = round(battery.power_now, 3)
+
+        time_executed = round(time_offset + scheduler.elapsed(), 3)
+        if args.sample_rate == round(args.sample_rate):
+            time_executed = round(time_executed)
+
+        # only the discharging samples are passed to the estimator, without
+        #     the gaps (charging, idle or the script was not running)
+        finished_phase = phase_detector.update(time_executed, state_of_charge, battery.power_plugged)
+        estimator_time = None
+        estimator_soc = None
+        if phase_detector.current.kind == 'discharge':
+            estimator_time, estimator_soc = discharge_timeline.update(sample_counter * args.sample_rate, state_of_charge)
+            estimate = consumption_estimator.update(estimator_time, estimator_soc)
+        else:
+            discharge_timeline.interrupt()
+        consumption, consumption_spp, consumption_sfb = estimate
+
+        # set first median_consumption
+        if median_consumption_start == None and consumption != -1:
+            median_consumption_start = consumption
+        if median_consumption_spp_start == None and consumption_spp != -1:
+            median_consumption_spp_start = consumption_spp
+        if median_consumption_sfb_start == None and consumption_sfb != -1:
+            median_consumption_sfb_start = consumption_sfb
+
+
+        predicted = -1
+        if discharge_tracker != None:
+            if estimator_time == None:
+                discharge_tracker.interrupt()
+            else:
+                discharge_tracker.update(estimator_time, state_of_charge, battery.power_plugged)
+            predicted = discharge_tracker.predict(state_of_charge, args.minimum_soc or 0)
+        if output.profiler != None:
+            output.profiler.lap('statistics')
+
+        if output.binary_log != None:
+            output.binary_log.write((time_executed, state_of_charge, seconds_left, consumption, consumption_spp, consumption_sfb, battery.power_now, battery.energy_now, battery.voltage_now, battery.current_now))
+        if checkpoint != None:
+            checkpoint.write((time_executed, estimator_time, state_of_charge, estimator_soc, seconds_left, battery.power_now, battery.power_plugged))
+
+        # print data (to console [and file]); the last sample is printed by
+        #     end if it was not printed here
+        last_row = (time_executed, state_of_charge, seconds_left, consumption, consumption_spp, consumption_sfb, power if show_power else None)
+        if sample_counter % output_every == 0:
+            clear_previous_line(output_lines)
+            output_lines = 1
+            if telemetry != None:
+                telemetry_values = telemetry.line()
+                if len(telemetry_values) > 0:
+                    myPrint('# telemetry', time_executed, *telemetry_values, sep='\t')
+                    output_lines = 2
+            print_row(last_row)
+            last_row = None
+
+            if output.dashboard != None:
+                output.dashboard.update({
+                    'time_executed': time_executed,
+                    'soc': state_of_charge,
+                    'secsleft': seconds_left,
+                    'consumption': consumption,
+                    'spp': consumption_spp,
+                    'sfb': consumption_sfb,
+                    'power': power,
+                    'predicted': predicted,
+                    'phase': phase_detector.current.summary(),
+                })
+
+        if output.profiler != None:
+            output.profiler.lap('format')
+
+        # check if minimum_soc or maximum_soc is reached
+        if args.minimum_soc != None and state_of_charge <= args.minimum_soc:
+            if args.verbose:
+                myPrint('# Batteries state of charge reached the minimum level. Terminating script.')
+            end(None, None)
+        if args.maximum_soc != None and state_of_charge >= args.maximum_soc:
+            if args.verbose:
+                myPrint('# Batteries state of charge reached the maximum level. Terminating script.')
+            end(None, None)
+
+        # check the events and print the results of finished commands
+        values = {
+            'soc': state_of_charge,
+            'secsleft': seconds_left,
+            'consumption': consumption,
+            'spp': consumption_spp,
+            'sfb': consumption_sfb,
+            'power': battery.power_now,
+            'predicted': predicted,
+        }
+        printed = False
+        terminate = False
+        if finished_phase != None:
+            print_phase(finished_phase.summary(), args.beautify)
+            printed = True
+        for event in events:
+            if event.check(values):
+                myPrint('# event', event.condition, event.command, sep='\t')
+                hook_runner.submit('event ' + event.condition, event.command)
+                printed = True
+                terminate = terminate or event.terminate
+        if hook_runner.report():
+            printed = True
+        if printed:
+            keep_previous_line()
+            output_lines = 1
+        if terminate:
+            if args.verbose:
+                myPrint('# Event reached. Terminating script.')
+            end(None, None)
+
+        if sensor.finished:
+            if args.verbose:
+                myPrint('# Simulation finished. Terminating script.')
+            end(None, None)
+        samples_taken += 1
+
+        if metrics_exporter != None:
+            metrics_exporter.publish((time_executed, state_of_charge, seconds_left, consumption, consumption_spp, consumption_sfb,
+                battery.power_now, samples_taken, perf_counter() - tick_started,
+                scheduler.missed_ticks, scheduler.overruns, scheduler.jitter_max, predicted))
+        if output.profiler != None:
+            output.profiler.lap('events')
+
+        sample_counter = scheduler.wait()
+        if output.profiler != None:
+            output.profiler.lap('sleep')
+
+
+# end
+#
+# Prints summary and terminates script.
+#
+# @param    int         signal_received     Signal.
+# @param    FrameType   frame               Frame.
+#
+# @return   None
+def end(signal_received, frame):
+    global time_start
+    global time_end
+    global battery_soc_start
+    global battery_soc_end
+    global expected_remaining_time_start
+    global expected_remaining_time_end
+    global median_consumption_start
+    global median_consumption_end
+    global median_consumption_spp_start
+    global median_consumption_spp_end
+    global median_consumption_sfb_start
+    global median_consumption_sfb_end
+
+    global sensor
+    global clock
+    global hook_runner
+    global metrics_exporter
+    global history
+    global output_lines
+
+    # restore the terminal first, the summary is printed below the header
+    dashboard = close_dashboard()
+
+    # the log-file ends with the last sample (see --output_rate)
+    if last_row != None:
+        clear_previous_line(output_lines)
+        output_lines = 1
+        print_row(last_row)
+
+    if sensor == None:
+        sensor = create_sensor(args, clock)
+    battery = sensor.read()
+    sensor.close()
+    battery_soc_end = round(battery.percent)
+    expected_remaining_time_end = round(battery.secsleft)
+    if clock == None:
+        clock = SystemClock()
+    time_end = clock.time()
+    time_executed_end = round(time_end - time_start)
+    if scheduler != None:
+        time_executed_end = round(time_offset + scheduler.elapsed())
+
+    median_consumption_end = -1
+    median_consumption_spp_end = -1
+    median_consumption_sfb_end = -1
+    if consumption_estimator != None:
+        median_consumption_end, median_consumption_spp_end, median_consumption_sfb_end = consumption_estimator.final()
+
+    if median_consumption_start == None:
+        median_consumption_start = -1
+    if median_consumption_end == None:
+        median_consumption_end = -1
+
+    if median_consumption_spp_start == None:
+        median_consumption_spp_start = -1
+    if median_consumption_spp_end == None:
+        median_consumption_spp_end = -1
+
+    if median_consumption_sfb_start == None:
+        median_consumption_sfb_start = -1
+    if median_consumption_sfb_end == None:
+        median_consumption_sfb_end = -1
+
+    # the checkpoint is complete before a command (e.g. shutdown) is executed
+    if checkpoint != None:
+        checkpoint.close()
+    if telemetry != None:
+        telemetry.close()
+
+    # save the run in the history
+    history_model = None
+    if history != None:
+        import sqlite3
+        summary = {
+            'time_started': time_start,
+            'seconds': time_executed_end,
+            'soc_start': battery_soc_start,
+            'soc_end': battery_soc_end,
+            'consumption': median_consumption_end,
+            'consumption_sfb': median_consumption_sfb_end,
+            'energy_full': battery.energy_full,
+            'energy_full_design': battery.energy_full_design,
+            'sensor': sensor.name,
+            'version': script_version,
+        }
+        try:
+            history.add_run(history_battery, summary, discharge_tracker.seconds)
+            history_model = history.model(history_battery, time_end)
+        except sqlite3.Error as e:
+            myPrint('ERROR: could not save the run in the history:', e)
+        history.close()
+        history = None
+
+    if metrics_exporter != None:
+        metrics_exporter.close()
+        metrics_exporter = None
+
+    # stop all worker threads
+    utilization = []
+    try:
+        if len(worker_threads) > 0:
+            from .workers import measure_worker_utilization
+            utilization = measure_worker_utilization(worker_utilization, worker_threads)
+    finally:
+        for wt in worker_threads:
+            wt.terminate()
+        for wt in worker_threads:
+            wt.join(1)
+
+    if args.beautify:
+        # Remove old output
+        if terminal_escapes():
+            if dashboard == None:
+                # the table header and the last output
+                clear_previous_line(3 + output_lines)
+        else:
+            myPrint()
+            myPrint()
+            myPrint()
+
+        myPrint('# Script started at', strftime("%d.%m.%Y %H:%M:%S", localtime(time_start)), 'with the following values:')
+        myPrint()
+        myPrint('timeExecuted\tbat %\ttimeRemaining\tconsumption\ttime / %\ttime / 100%')
+        myPrint('hh:mm:ss\t\thh:mm:ss\t(median)\t(median)')
+        myPrint('---------\t-------\t---------\t-----------\t---------\t---------')
+        myPrint(seconds_to_human_form(0), end='\t')
+        myPrint(percentage_to_human_form(battery_soc_start), end='\t')
+        myPrint(seconds_to_human_form(expected_remaining_time_start), end='\t')
+        myPrint(percentage_to_human_form(median_consumption_start), '/ h', end='\t')
+        myPrint(seconds_to_human_form(median_consumption_spp_start), end='\t')
+        myPrint(seconds_to_human_form(median_consumption_sfb_start))
+
+        myPrint()
+
+        myPrint('# Script terminated at', strftime("%d.%m.%Y %H:%M:%S", localtime(time_end)), 'with the following values:')
+        myPrint()
+        myPrint('timeExecuted\tbat %\ttimeRemaining\tconsumption\ttime / %\ttime / 100%')
+        myPrint('hh:mm:ss\t\thh:mm:ss\t(median)\t(median)')
+        myPrint('---------\t-------\t---------\t-----------\t---------\t---------')
+        myPrint(seconds_to_human_form(time_executed_end), end='\t')
+        myPrint(percentage_to_human_form(battery_soc_end), end='\t')
+        myPrint(seconds_to_human_form(expected_remaining_time_end), end='\t')
+        myPrint(percentage_to_human_form(median_consumption_end), '/ h', end='\t')
+        myPrint(seconds_to_human_form(median_consumption_spp_end), end='\t')
+        myPrint(seconds_to_human_form(median_consumption_sfb_end))
+    else:
+        # Remove old output
+        if terminal_escapes():
+            if dashboard == None:
+                # the table header and the last output
+                clear_previous_line(1 + output_lines)
+        else:
+            myPrint()
+            myPrint()
+            myPrint()
+
+        myPrint('# script_startet_at', floor(time_start), sep='\t')
+        myPrint('# <sec>\t<soc>\t<until>\t<cons>\t<sec/%>\t<sec/100%>')
+        myPrint(0, end='\t')
+        myPrint(battery_soc_start, end='\t')
+        myPrint(expected_remaining_time_start, end='\t')
+        myPrint(median_consumption_start, end='\t')
+        myPrint(median_consumption_spp_start, end='\t')
+        myPrint(median_consumption_sfb_start)
+
+        myPrint()
+
+        myPrint('# script_terminated_at', floor(time_end), sep='\t')
+        myPrint('# <sec>\t<soc>\t<until>\t<cons>\t<sec/%>\t<sec/100%>')
+        myPrint(time_executed_end, end='\t')
+        myPrint(battery_soc_end, end='\t')
+        myPrint(expected_remaining_time_end, end='\t')
+        myPrint(median_consumption_end, end='\t')
+        myPrint(median_consumption_spp_end, end='\t')
+        myPrint(median_consumption_sfb_end)
+
+    if phase_detector != None and phase_detector.current != None:
+        myPrint()
+        for phase in phase_detector.all_phases():
+            print_phase(phase.summary(), args.beautify)
+
+    if history_model != None:
+        myPrint()
+        print_history(history_model, None)
+
+    if output.profiler != None:
+        phases, usage = output.profiler.statistics(scheduler.tick + 1)
+        output.profiler = None
+        if scheduler.jitter_count > 0:
+            usage.append(('sleep_late_avg_ms', round(scheduler.jitter_total / scheduler.jitter_count * 1000, 3)))
+        myPrint()
+        myPrint('# profile', 'phase', 'calls', 'avg_us', 'max_us', 'total_us', 'share_%', sep='\t')
+        for phase in phases:
+            myPrint('# profile', *phase, sep='\t')
+        for name, value in usage:
+            myPrint('# profile_' + name, ':', value, sep='\t')
+
+    # the summary is on the disk before a command (e.g. shutdown) is executed
+    try:
+        sync_log_sink()
+    except OSError as e:
+        myPrint('ERROR: could not write the log-file:', e)
+
+    if hook_runner == None:
+        from .hooks import HookRunner
+        hook_runner = HookRunner(args.hook_workers, args.hook_timeout)
+    # execute min_soc command
+    if args.minimum_soc != None and battery_soc_end <= args.minimum_soc:
+        hook_runner.submit('cmd_min_soc', args.cmd_min_soc)
+    # execute max_soc command
+    if args.maximum_soc != None and battery_soc_end >= args.maximum_soc:
+        hook_runner.submit('cmd_max_soc', args.cmd_max_soc)
+    # execute end command
+    hook_runner.submit('cmd_end', args.cmd_end)
+
+    # wait for the commands
+    if len(hook_runner.pending) > 0:
+        myPrint()
+        hook_runner.wait()
+
+    if args.verbose:
+        if consumption_estimator != None and len(consumption_estimator.statistics()) > 0:
+            myPrint()
+            for name, value in consumption_estimator.statistics():
+                myPrint('# ' + name, ':', value, sep='\t')
+        if scheduler != None:
+            myPrint()
+            for name, value in scheduler.statistics():
+                myPrint('# ' + name, ':', value, sep='\t')
+        if len(utilization) > 0:
+            myPrint()
+            for job, value in utilization:
+                myPrint('# worker', ':', job, str(value) + '%', sep='\t')
+        if hook_runner.executed > 0:
+            myPrint()
+            for name, value in hook_runner.statistics():
+                myPrint('# ' + name, ':', value, sep='\t')
+        if checkpoint != None:
+            myPrint()
+            for name, value in checkpoint.statistics():
+                myPrint('# ' + name, ':', value, sep='\t')
+        if telemetry != None:
+            myPrint()
+            for name, value in telemetry.statistics():
+                myPrint('# ' + name, ':', value, sep='\t')
+        if dashboard != None:
+            myPrint()
+            for name, value in dashboard.statistics():
+                myPrint('# ' + name, ':', value, sep='\t')
+        if output.log_sink != None:
+            output.log_sink.flush()
+            myPrint()
+            for name, value in output.log_sink.statistics():
+                myPrint('# ' + name, ':', value, sep='\t')
+        myPrint('# Goodbye!')
+
+    myPrint('', end='')
+    close_log_sink()
+    exit(0)
+
+
+# run
+#
+# Monitors the battery until the script is interrupted or terminated by an
+#     event.
+#
+# @param    Namespace   arguments   Arguments of the monitor command.
+#
+# @return   None
+def run(arguments):
+    global args
+
+    args = arguments
+    # e.g. kill or systemctl stop: the buffered output is written as well
+    signal(SIGINT, end)
+    signal(SIGTERM, end)
+    try:
+        main()
+        end(None, None)
+    finally:
+        # restore the terminal and write the buffered output after an
+        #     unexpected error
+        close_dashboard()
+        close_log_sink()
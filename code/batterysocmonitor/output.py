@@ -0,0 +1,147 @@
+#-------------------------------------------------------------------------------
+# BatterySoCMonitor - output
+#
+# Output to the console and to the log-file(s).
+#-------------------------------------------------------------------------------
+# @author: Andreas Menzel
+# @license: MIT License
+# @copyright: Copyright (c) 2021 Andreas Menzel
+#-------------------------------------------------------------------------------
+
+from sys import exit
+from time import perf_counter_ns
+
+# log-files, profiler and dashboard of the running command (see monitor)
+log_sink = None
+binary_log = None
+profiler = None
+dashboard = None
+
+# True if the terminal understands the escape sequences (see
+#     terminal_escapes)
+escapes = None
+
+
+# my_print
+#
+# Prints text to the console and to a log-file if supplied.
+#
+# @param    [string]    strings     Strings to print and save.
+# @param    string      sep         Separator to be added between the strings.
+# @param    string      end         End.
+#
+# @return   None
+def myPrint(*strings, sep=' ', end='\n'):
+    combined_string = ''
+
+    if len(strings) > 1:
+        for i in range(0, len(strings) - 1):
+            combined_string += str(strings[i]) + sep
+
+
+    if len(strings) > 0:
+        combined_string += str(strings[-1]) + end
+    else:
+        combined_string += end
+
+    if profiler != None:
+        write_start = perf_counter_ns()
+
+    if dashboard != None:
+        dashboard.write(combined_string)
+    else:
+        print(combined_string, end='')
+
+    if log_sink != None:
+        log_sink.write(combined_string)
+
+    if profiler != None:
+        profiler.written += perf_counter_ns() - write_start
+
+
+# close_log_sink
+#
+# Writes all buffered output to the log-file(s) and closes them.
+#
+# @return   None
+def close_log_sink():
+    global log_sink
+    global binary_log
+
+    if log_sink != None:
+        log_sink.close()
+        log_sink = None
+    if binary_log != None:
+        binary_log.close()
+        binary_log = None
+
+
+# sync_log_sink
+#
+# Writes all buffered output to the log-file(s) and waits until it is on the
+#     disk.
+#
+# @return   None
+def sync_log_sink():
+    if log_sink != None:
+        log_sink.sync()
+    if binary_log != None:
+        binary_log.sync()
+
+
+# close_dashboard
+#
+# Closes the dashboard (if shown) and restores the terminal.
+#
+# @return   Returns the closed dashboard or None.
+def close_dashboard():
+    global dashboard
+
+    closed = dashboard
+    if dashboard != None:
+        dashboard.close()
+        dashboard = None
+    return closed
+
+
+def end_error():
+    close_dashboard()
+    close_log_sink()
+    exit(1)
+
+
+# terminal_escapes
+#
+# @return   Returns True if the terminal understands the escape sequences
+#               (Linux only, checked once).
+def terminal_escapes():
+    global escapes
+
+    if escapes == None:
+        from platform import system
+        escapes = system() == 'Linux'
+    return escapes
+
+
+# clear_previous_line
+#
+# Clears the previous line(s) in the terminal if on Linux (not if the
+#     dashboard is shown).
+#
+# @param    int     lines   Number of lines.
+#
+# @return   None
+def clear_previous_line(lines=1):
+    if terminal_escapes() and dashboard == None:
+        print("\033[F\033[K" * lines, end='') # Cursor up one line, clear to the end of line
+
+
+# keep_previous_line
+#
+# Moves to a new line, so the previous line is not removed by
+#     clear_previous_line.
+#
+# @return   None
+def keep_previous_line():
+    if terminal_escapes() and dashboard == None:
+        print()
@@ -0,0 +1,309 @@
+#-------------------------------------------------------------------------------
+# BatterySoCMonitor - phases
+#
+# Segmentation of a run into charge, discharge and idle phases.
+#-------------------------------------------------------------------------------
+# @author: Andreas Menzel
+# @license: MIT License
+# @copyright: Copyright (c) 2021 Andreas Menzel
+#-------------------------------------------------------------------------------
+
+from .logfile import percentage_to_human_form, seconds_to_human_form
+from .output import myPrint
+
+
+# plugged_from_secsleft
+#
+# Derives whether the charger was connected from the secsleft column of a
+#     log-file.
+#
+# @param    float   secsleft    Remaining time (in seconds).
+#
+# @return   Returns True if the charger was connected, False if the battery
+#               was discharging and None if unknown.
+def plugged_from_secsleft(secsleft):
+    # POWER_TIME_UNLIMITED (see sensors) is only written while plugged
+    if secsleft == -2:
+        return True
+    if secsleft >= 0:
+        return False
+    return None
+
+
+# Phase
+#
+# Segment of a run in which the battery was charging, discharging or idle (the
+#     charger is connected, but the state of charge does not rise).
+class Phase:
+    # __init__
+    #
+    # @param    string  kind    charge, discharge or idle.
+    # @param    float   time    Time of the first sample (in seconds).
+    # @param    float   soc     State of charge of the first sample.
+    #
+    # @return   None
+    def __init__(self, kind, time, soc):
+        self.kind = kind
+        self.time_start = time
+        self.soc_start = soc
+        self.time_end = time
+        self.soc_end = soc
+
+    # rate
+    #
+    # @return   Returns the change of the state of charge in (% / h) (negative
+    #               while discharging) or None if the phase has no duration.
+    def rate(self):
+        if not self.time_end > self.time_start:
+            return None
+        return (self.soc_end - self.soc_start) / (self.time_end - self.time_start) * 3600
+
+    # until
+    #
+    # @return   Returns the seconds until the battery is full (charge) or empty
+    #               (discharge) at the rate of the phase or -1 if unknown.
+    def until(self):
+        rate = self.rate()
+        if self.kind == 'charge' and rate != None and rate > 0:
+            return round((100 - self.soc_end) / rate * 3600)
+        if self.kind == 'discharge' and rate != None and rate < 0:
+            return round(self.soc_end / -rate * 3600)
+        return -1
+
+    # summary
+    #
+    # @return   Returns a dictionary with the statistics of the phase.
+    def summary(self):
+        rate = self.rate()
+        if rate != None:
+            rate = round(rate, 2)
+        return {
+            'kind': self.kind,
+            'time_start': self.time_start,
+            'time_end': self.time_end,
+            'soc_start': self.soc_start,
+            'soc_end': self.soc_end,
+            'rate': rate,
+            'until': self.until(),
+        }
+
+
+# PhaseDetector
+#
+# Splits a run into phases in a single pass (only the phases are kept). If known,
+#     the state of the charger decides between discharging and charging.
+#     Otherwise (old log-files) the trend of the state of charge decides: the
+#     trend changes when the state of charge moved hysteresis percent away
+#     from its last extreme, and the phases change at that extreme. While the
+#     charger is connected, the battery is idle if it is full or the state of
+#     charge did not rise for idle_seconds.
+class PhaseDetector:
+    hysteresis = 1
+    idle_seconds = 600
+
+    def __init__(self):
+        self.phases = []
+        self.current = None
+
+        self.trend = None
+        self.pivot = None # (time, soc) of the last extreme
+        self.previous_soc = None
+        self.last_rise = None # (time, soc) of the last rise
+        self.plugged_since = None
+
+    # update
+    #
+    # @param    float   time        Time of the sample (in seconds).
+    # @param    float   soc         State of charge of the sample.
+    # @param    bool    plugged     Whether the charger is connected (None if
+    #                                   unknown).
+    #
+    # @return   Returns the phase that ended with this sample or None.
+    def update(self, time, soc, plugged):
+        # trend of the state of charge
+        turn = None
+        if self.pivot == None:
+            self.pivot = (time, soc)
+        elif self.trend != 'charge' and soc >= self.pivot[1] + PhaseDetector.hysteresis:
+            turn = self.pivot
+            self.trend = 'charge'
+            self.pivot = (time, soc)
+        elif self.trend != 'discharge' and soc <= self.pivot[1] - PhaseDetector.hysteresis:
+            turn = self.pivot
+            self.trend = 'discharge'
+            self.pivot = (time, soc)
+        elif (self.trend == 'charge' and soc >= self.pivot[1]) or (self.trend == 'discharge' and soc <= self.pivot[1]):
+            self.pivot = (time, soc)
+
+        if self.previous_soc != None and soc > self.previous_soc:
+            self.last_rise = (time, soc)
+        self.previous_soc = soc
+
+        # the phase starts at the extreme if only the trend is known
+        boundary = (time, soc)
+        if plugged == None:
+            plugged = self.trend == 'charge'
+            if turn != None:
+                boundary = turn
+
+        if not plugged:
+            self.plugged_since = None
+            kind = 'discharge'
+        else:
+            if self.plugged_since == None:
+                self.plugged_since = boundary
+            rising = self.plugged_since
+            if self.last_rise != None and self.last_rise[0] > rising[0]:
+                rising = self.last_rise
+            kind = 'charge'
+            if soc >= 100 or time - rising[0] >= PhaseDetector.idle_seconds:
+                kind = 'idle'
+                if self.current != None and self.current.kind == 'charge':
+                    boundary = rising
+
+        if self.current == None:
+            self.current = Phase(kind, time, soc)
+            return None
+        if kind == self.current.kind:
+            self.current.time_end = time
+            self.current.soc_end = soc
+            return None
+
+        # the boundary is not after the start of the phase: only the kind changed
+        if boundary[0] <= self.current.time_start:
+            self.current.kind = kind
+            self.current.time_end = time
+            self.current.soc_end = soc
+            return None
+
+        finished = self.current
+        finished.time_end, finished.soc_end = boundary
+        self.phases.append(finished)
+        self.current = Phase(kind, boundary[0], boundary[1])
+        self.current.time_end = time
+        self.current.soc_end = soc
+        return finished
+
+    # all_phases
+    #
+    # @return   Returns the finished phases and the current phase. A current
+    #               phase without duration (only the last sample, e.g. the
+    #               battery became full) is omitted after another phase.
+    def all_phases(self):
+        if self.current == None:
+            return list(self.phases)
+        if len(self.phases) > 0 and not self.current.time_end > self.current.time_start:
+            return list(self.phases)
+        return self.phases + [self.current]
+
+    # statistics
+    #
+    # @return   Returns a dictionary with the total seconds of each kind of
+    #               phase and the rate (in % / h) of all charge and all
+    #               discharge phases (-1 if unknown).
+    def statistics(self):
+        seconds = {'charge': 0, 'discharge': 0, 'idle': 0}
+        change = {'charge': 0, 'discharge': 0, 'idle': 0}
+        for phase in self.all_phases():
+            seconds[phase.kind] += phase.time_end - phase.time_start
+            change[phase.kind] += phase.soc_end - phase.soc_start
+
+        statistics = {}
+        for kind in ['charge', 'discharge', 'idle']:
+            statistics[kind + '_seconds'] = round(seconds[kind])
+        for kind in ['charge', 'discharge']:
+            statistics[kind + '_rate'] = -1
+            if seconds[kind] > 0:
+                statistics[kind + '_rate'] = round(abs(change[kind]) / seconds[kind] * 3600, 2)
+        return statistics
+
+
+# print_phase
+#
+# Prints a phase (see Phase.summary).
+#
+# @param    dict    phase       Phase.
+# @param    bool    beautify    Print in human readable form.
+# @param    string  source      Source of the phase (see --sources) or None.
+#
+# @return   None
+def print_phase(phase, beautify, source=None):
+    prefix = ['# phase']
+    if source != None:
+        prefix.append(source)
+
+    rate = phase['rate']
+    if rate == None:
+        rate = -1
+    if beautify:
+        myPrint(*prefix, phase['kind'], seconds_to_human_form(round(phase['time_start'])), seconds_to_human_form(round(phase['time_end'])),
+            percentage_to_human_form(phase['soc_start']), percentage_to_human_form(phase['soc_end']), '{:+.2f}% / h'.format(rate), seconds_to_human_form(phase['until']), sep='\t')
+    else:
+        times = [round(phase['time_start'], 3), round(phase['time_end'], 3)]
+        times = [round(t) if t == round(t) else t for t in times]
+        myPrint(*prefix, phase['kind'], times[0], times[1], phase['soc_start'], phase['soc_end'], round(rate, 2), phase['until'], sep='\t')
+
+
+# DischargeTimeline
+#
+# Time and state of charge passed to a consumption estimator. Gaps (the
+#     battery was not discharging, see PhaseDetector, or the script was not
+#     running, see --resume) are removed: after a gap the time continues one
+#     sample interval after the last sample and the state of charge is shifted
+#     by its change during the gap.
+class DischargeTimeline:
+    def __init__(self):
+        self.previous = None
+        self.last = None
+        self.interrupted = False
+        self.interval = None
+        self.time_shift = 0
+        self.soc_shift = 0
+
+    # update
+    #
+    # @param    float   time    Time of the sample (in seconds).
+    # @param    float   soc     State of charge of the sample.
+    #
+    # @return   Returns the time and the state of charge for the estimator.
+    def update(self, time, soc):
+        if self.interrupted and self.last != None:
+            interval = 0
+            if self.interval != None:
+                interval = self.interval
+            elif self.previous != None:
+                interval = self.last[0] - self.previous[0]
+            self.time_shift = self.last[0] + interval - time
+            self.soc_shift = self.last[1] - soc
+        self.interrupted = False
+
+        self.previous = self.last
+        self.last = (time + self.time_shift, round(soc + self.soc_shift, 2))
+        return self.last
+
+    # restore
+    #
+    # Sets the last sample (see --resume) without passing it to update.
+    #
+    # @param    float   time    Time for the estimator.
+    # @param    float   soc     State of charge for the estimator.
+    #
+    # @return   None
+    def restore(self, time, soc):
+        self.previous = self.last
+        self.last = (time, soc)
+
+    # interrupt
+    #
+    # Starts a gap.
+    #
+    # @param    float   interval    Sample interval (in seconds) between the
+    #                                   last sample and the first sample after
+    #                                   the gap or None for the interval of the
+    #                                   last two samples (not known if only
+    #                                   every --output_rate sample is logged).
+    #
+    # @return   None
+    def interrupt(self, interval=None):
+        self.interrupted = True
+        self.interval = interval
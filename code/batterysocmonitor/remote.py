@@ -0,0 +1,278 @@
+#-------------------------------------------------------------------------------
+# BatterySoCMonitor - remote
+#
+# Monitoring of several local and remote batteries with asyncio.
+#-------------------------------------------------------------------------------
+# @author: Andreas Menzel
+# @license: MIT License
+# @copyright: Copyright (c) 2021 Andreas Menzel
+#-------------------------------------------------------------------------------
+
+import asyncio
+from datetime import datetime
+import json
+from platform import system
+
+from . import script_version
+from .estimators import create_estimator
+from .logfile import LogSink, percentage_to_human_form, seconds_to_human_form
+from . import output
+from .output import myPrint, close_log_sink, end_error
+from .phases import DischargeTimeline, PhaseDetector, print_phase
+from .sensors import BatteryReading, SysfsSensor, create_sensor
+from .timing import SystemClock
+
+
+# RemoteSensor
+#
+# Reads the battery of another instance started with --serve. The connection
+#     is opened on the first read and reopened after an error. A read that is
+#     not answered within the timeout is counted as a miss.
+class RemoteSensor:
+    # __init__
+    #
+    # @param    string  host        Host of the remote instance.
+    # @param    int     port        Port of the remote instance.
+    # @param    float   timeout     Timeout (in seconds) of a read.
+    #
+    # @return   None
+    def __init__(self, host, port, timeout):
+        self.name = host + ':' + str(port)
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.reader = None
+        self.writer = None
+        self.misses = 0
+
+    # request
+    #
+    # @return   Returns the answer of the remote instance (coroutine).
+    async def request(self):
+        if self.writer == None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        self.writer.write(b'read\n')
+        await self.writer.drain()
+        return await self.reader.readline()
+
+    # read
+    #
+    # @return   Returns a BatteryReading (coroutine).
+    async def read(self):
+        try:
+            try:
+                line = await asyncio.wait_for(self.request(), self.timeout)
+            except asyncio.TimeoutError:
+                # the connection is reopened, a late answer would be read as
+                #     the answer of the next request
+                self.misses += 1
+                raise TimeoutError('no answer from ' + self.name + ' within ' + str(self.timeout) + ' s')
+            if line == b'':
+                raise ConnectionError('connection closed by ' + self.name)
+            reading = json.loads(line)
+            if 'error' in reading:
+                raise RuntimeError(reading['error'])
+            return BatteryReading(**reading)
+        except (OSError, ConnectionError, ValueError):
+            self.close()
+            raise
+
+    def close(self):
+        if self.writer != None:
+            self.writer.close()
+        self.reader = None
+        self.writer = None
+
+
+# parse_source
+#
+# @param    string      source  Source as specified with --sources.
+# @param    Namespace   args    Arguments of the monitor command.
+# @param    object      clock   Clock (see SystemClock).
+#
+# @return   Returns the sensor and the sample rate of the source.
+def parse_source(source, args, clock):
+    sample_rate = args.sample_rate
+    if '@' in source:
+        source, sample_rate = source.rsplit('@', 1)
+        sample_rate = float(sample_rate)
+
+    if source == 'local':
+        return create_sensor(args, clock), sample_rate
+    if source.startswith('local:'):
+        return SysfsSensor(source[len('local:'):]), sample_rate
+
+    # a reading is useless once the next sample is due
+    host, port = source.rsplit(':', 1)
+    return RemoteSensor(host, int(port), sample_rate), sample_rate
+
+
+# collect_source
+#
+# Samples one source at its own sample rate and prints one row per sample.
+#     Local sensors are read in a worker thread, so a slow source does not
+#     delay the others. As in the monitor command, only the discharging
+#     samples are passed to the estimator.
+#
+# @param    object          sensor          Sensor.
+# @param    float           sample_rate     Delay (in seconds) between each
+#                                           measurement.
+# @param    PhaseDetector   detector        Phases of the source.
+# @param    Namespace       args            Arguments of the monitor command.
+#
+# @return   None (coroutine)
+async def collect_source(sensor, sample_rate, detector, args):
+    loop = asyncio.get_running_loop()
+    estimator = create_estimator(args.estimator, args.window)
+    timeline = DischargeTimeline()
+    estimate = (-1, -1, -1)
+    time_start = loop.time()
+    sample_counter = 0
+    while True:
+        try:
+            if isinstance(sensor, RemoteSensor):
+                battery = await sensor.read()
+            else:
+                battery = await loop.run_in_executor(None, sensor.read)
+        except (OSError, RuntimeError, ValueError) as e:
+            myPrint('# ' + sensor.name, 'ERROR: ' + str(e), sep='\t')
+        else:
+            # the time the reading arrived (a slow source or a suspend delays
+            #     it)
+            time_executed = round(loop.time() - time_start, 3)
+            if sample_rate == round(sample_rate):
+                time_executed = round(time_executed)
+            state_of_charge = round(battery.percent, 2)
+            seconds_left = round(battery.secsleft)
+
+            finished_phase = detector.update(time_executed, state_of_charge, battery.power_plugged)
+            if detector.current.kind == 'discharge':
+                estimate = estimator.update(*timeline.update(time_executed, state_of_charge))
+            else:
+                timeline.interrupt()
+            consumption, consumption_spp, consumption_sfb = estimate
+
+            if args.beautify:
+                myPrint(sensor.name, seconds_to_human_form(time_executed), percentage_to_human_form(state_of_charge),
+                    seconds_to_human_form(seconds_left), percentage_to_human_form(consumption) + ' / h',
+                    seconds_to_human_form(consumption_spp), seconds_to_human_form(consumption_sfb), sep='\t')
+            else:
+                myPrint(sensor.name, time_executed, state_of_charge, seconds_left, consumption, consumption_spp, consumption_sfb, sep='\t')
+            if finished_phase != None:
+                print_phase(finished_phase.summary(), args.beautify, sensor.name)
+
+        # sleep until the next sample is due (absolute schedule, no drift)
+        sample_counter += 1
+        await asyncio.sleep(max(0, time_start + sample_counter * sample_rate - loop.time()))
+
+
+# collect
+#
+# Monitors several sources concurrently until interrupted (see --sources).
+#
+# @param    Namespace   args    Arguments of the monitor command.
+#
+# @return   None
+def collect(args):
+    clock = SystemClock()
+    if args.sample_rate == None:
+        args.sample_rate = 10
+
+    if args.log_file == '#NOT_SET#':
+        args.log_file = 'BatterySoCMonitor_' + str(datetime.now().strftime('%Y-%m-%d_%H-%M-%S')) + '_' + system() + '.log'
+    if args.log_file != None:
+        output.log_sink = LogSink(args.log_file, args.log_flush_size, args.log_flush_interval)
+
+    try:
+        sensors = [parse_source(source, args, clock) for source in args.sources]
+    except (RuntimeError, ValueError) as e:
+        myPrint('ERROR: invalid source:', e)
+        end_error()
+
+    myPrint('# Welcome to BatterySoCMonitor version ', script_version, '!', sep='')
+    if args.verbose:
+        for sensor, sample_rate in sensors:
+            myPrint('# source', ':', sensor.name, sample_rate, sep='\t')
+    myPrint()
+    if args.beautify:
+        myPrint('source\ttimeExecuted\tbat %\ttimeRemaining\tconsumption\ttime / %\ttime / 100%')
+    else:
+        myPrint('# <source>\t<sec>\t<soc>\t<until>\t<cons>\t<sec/%>\t<sec/100%>')
+
+    detectors = [PhaseDetector() for _ in sensors]
+
+    async def run():
+        try:
+            await asyncio.gather(*[collect_source(sensor, sample_rate, detector, args) for (sensor, sample_rate), detector in zip(sensors, detectors)])
+        finally:
+            for sensor, sample_rate in sensors:
+                sensor.close()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        myPrint()
+        for (sensor, sample_rate), detector in zip(sensors, detectors):
+            for phase in detector.all_phases():
+                print_phase(phase.summary(), args.beautify, sensor.name)
+            if isinstance(sensor, RemoteSensor):
+                myPrint('# misses', sensor.name, sensor.misses, sep='\t')
+        if args.verbose:
+            myPrint('# Goodbye!')
+        close_log_sink()
+
+
+# serve
+#
+# Serves the local battery to other instances (see --sources). Each request
+#     line is answered with one JSON encoded BatteryReading. The connections
+#     are neither authenticated nor encrypted, so only local connections are
+#     accepted unless another host is given.
+#
+# @param    Namespace   args    Arguments of the monitor command (--serve:
+#                                   [<host>:]<port>).
+#
+# @return   None
+def serve(args):
+    host = '127.0.0.1'
+    port = args.serve
+    if ':' in port:
+        host, port = port.rsplit(':', 1)
+
+    try:
+        sensor = create_sensor(args, SystemClock())
+        port = int(port)
+    except (RuntimeError, ValueError) as e:
+        myPrint('ERROR:', e)
+        end_error()
+
+    async def handle(reader, writer):
+        loop = asyncio.get_running_loop()
+        try:
+            while await reader.readline() != b'':
+                try:
+                    reading = (await loop.run_in_executor(None, sensor.read))._asdict()
+                except (OSError, RuntimeError) as e:
+                    reading = {'error': str(e)}
+                writer.write(json.dumps(reading).encode() + b'\n')
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def run():
+        server = await asyncio.start_server(handle, host, port)
+        if args.verbose:
+            myPrint('# Serving', sensor.name, 'on', host + ':' + str(port))
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sensor.close()
@@ -0,0 +1,361 @@
+#-------------------------------------------------------------------------------
+# BatterySoCMonitor - sensors
+#
+# Sources of battery readings.
+#-------------------------------------------------------------------------------
+# @author: Andreas Menzel
+# @license: MIT License
+# @copyright: Copyright (c) 2021 Andreas Menzel
+#-------------------------------------------------------------------------------
+
+from collections import namedtuple
+import os
+from platform import node, system
+
+from .logfile import read_log
+from .phases import plugged_from_secsleft
+
+# secsleft while charging or if unknown (same values as psutil)
+POWER_TIME_UNKNOWN = -1
+POWER_TIME_UNLIMITED = -2
+
+
+# BatteryReading
+#
+# One reading of the battery. percent, secsleft and power_plugged have the same
+#     meaning as in psutil.sensors_battery(). The other values are in Wh, W, V,
+#     A and % and are None if the sensor does not provide them.
+BatteryReading = namedtuple('BatteryReading', 'percent secsleft power_plugged energy_now power_now voltage_now current_now capacity energy_full energy_full_design')
+
+
+# PsutilSensor
+#
+# Reads the battery with psutil.sensors_battery().
+class PsutilSensor:
+    name = 'psutil'
+    finished = False
+
+    # read
+    #
+    # @return   Returns a BatteryReading.
+    def read(self):
+        import psutil
+
+        battery = psutil.sensors_battery()
+        if battery == None:
+            raise RuntimeError('no battery found')
+        return BatteryReading(battery.percent, battery.secsleft, battery.power_plugged, None, None, None, None, None, None, None)
+
+    def close(self):
+        pass
+
+
+# SysfsSensor
+#
+# Reads the battery directly from /sys/class/power_supply (Linux). The
+#     attribute files are opened once and read with os.pread on every sample.
+class SysfsSensor:
+    finished = False
+    root = '/sys/class/power_supply'
+    attributes = ['status', 'capacity', 'energy_now', 'energy_full', 'energy_full_design', 'charge_now', 'charge_full', 'charge_full_design', 'power_now', 'voltage_now', 'current_now']
+
+    # __init__
+    #
+    # @param    string  battery     Name of the battery (e.g. BAT0) or None for
+    #                               the first battery found.
+    #
+    # @return   None
+    def __init__(self, battery=None):
+        if battery == None:
+            batteries = SysfsSensor.find_batteries()
+            if len(batteries) == 0:
+                raise RuntimeError('no battery found in ' + SysfsSensor.root)
+            battery = batteries[0]
+
+        self.name = battery
+        self.path = os.path.join(SysfsSensor.root, battery)
+        self.fds = {}
+        self.fd_online = None
+        for attribute in SysfsSensor.attributes:
+            try:
+                self.fds[attribute] = os.open(os.path.join(self.path, attribute), os.O_RDONLY)
+            except OSError:
+                pass
+        if 'status' not in self.fds:
+            self.close()
+            raise RuntimeError('battery ' + battery + ' not found in ' + SysfsSensor.root)
+
+        # the charger is optional
+        for supply in sorted(os.listdir(SysfsSensor.root)):
+            if SysfsSensor.read_file(os.path.join(SysfsSensor.root, supply, 'type')) == 'Mains':
+                try:
+                    self.fd_online = os.open(os.path.join(SysfsSensor.root, supply, 'online'), os.O_RDONLY)
+                    break
+                except OSError:
+                    pass
+
+    # find_batteries
+    #
+    # @return   Returns the names of all batteries in /sys/class/power_supply.
+    @staticmethod
+    def find_batteries():
+        try:
+            supplies = sorted(os.listdir(SysfsSensor.root))
+        except OSError:
+            return []
+        return [s for s in supplies if SysfsSensor.read_file(os.path.join(SysfsSensor.root, s, 'type')) == 'Battery']
+
+    # read_file
+    #
+    # @param    string  filename    Filename.
+    #
+    # @return   Returns the stripped content of the file or None on error.
+    @staticmethod
+    def read_file(filename):
+        try:
+            with open(filename, 'r') as f:
+                return f.read().strip()
+        except OSError:
+            return None
+
+    # read_raw
+    #
+    # @param    string  attribute   Name of the attribute.
+    #
+    # @return   Returns the stripped value of the attribute or None.
+    def read_raw(self, attribute):
+        fd = self.fds.get(attribute)
+        if fd == None:
+            return None
+        try:
+            return os.pread(fd, 64, 0).decode().strip()
+        except OSError:
+            # e.g. ENODEV while the battery is removed
+            return None
+
+    # read_number
+    #
+    # @param    string  attribute   Name of the attribute.
+    # @param    float   scale       Factor applied to the value.
+    #
+    # @return   Returns the scaled value of the attribute or None.
+    def read_number(self, attribute, scale):
+        value = self.read_raw(attribute)
+        if value == None or value == '':
+            return None
+        return int(value) * scale
+
+    # identity
+    #
+    # @return   Returns the key (serial or model and battery name), the model
+    #               and the serial number of the battery.
+    def identity(self):
+        model = SysfsSensor.read_file(os.path.join(self.path, 'model_name'))
+        serial = SysfsSensor.read_file(os.path.join(self.path, 'serial_number'))
+        manufacturer = SysfsSensor.read_file(os.path.join(self.path, 'manufacturer'))
+        if manufacturer and model:
+            model = manufacturer + ' ' + model
+
+        if serial:
+            return str(model) + ':' + serial, model, serial
+        if model:
+            return model + '@' + node() + ':' + self.name, model, None
+        return self.name + '@' + node(), None, None
+
+    # read
+    #
+    # @return   Returns a BatteryReading.
+    def read(self):
+        status = self.read_raw('status')
+        capacity = self.read_number('capacity', 1)
+        energy_now = self.read_number('energy_now', 1e-6)
+        energy_full = self.read_number('energy_full', 1e-6)
+        energy_full_design = self.read_number('energy_full_design', 1e-6)
+        power_now = self.read_number('power_now', 1e-6)
+        voltage_now = self.read_number('voltage_now', 1e-6)
+        current_now = self.read_number('current_now', 1e-6)
+
+        # batteries reporting charge (Ah) instead of energy (Wh)
+        charge_now = self.read_number('charge_now', 1e-6)
+        charge_full = self.read_number('charge_full', 1e-6)
+        charge_full_design = self.read_number('charge_full_design', 1e-6)
+        if voltage_now != None:
+            if energy_now == None and charge_now != None:
+                energy_now = charge_now * voltage_now
+            if energy_full == None and charge_full != None:
+                energy_full = charge_full * voltage_now
+            if energy_full_design == None and charge_full_design != None:
+                energy_full_design = charge_full_design * voltage_now
+            if power_now == None and current_now != None:
+                power_now = current_now * voltage_now
+
+        if energy_now != None and energy_full:
+            percent = min(energy_now / energy_full * 100, 100)
+        elif charge_now != None and charge_full:
+            percent = min(charge_now / charge_full * 100, 100)
+        else:
+            percent = capacity
+
+        power_plugged = None
+        if self.fd_online != None:
+            try:
+                power_plugged = os.pread(self.fd_online, 8, 0).strip() == b'1'
+            except OSError:
+                # e.g. ENODEV while the charger is removed, see read_raw
+                pass
+        if power_plugged == None:
+            power_plugged = status != 'Discharging'
+
+        if power_plugged:
+            secsleft = POWER_TIME_UNLIMITED
+        elif energy_now != None and power_now:
+            secsleft = energy_now / power_now * 3600
+        else:
+            secsleft = POWER_TIME_UNKNOWN
+
+        return BatteryReading(percent, secsleft, power_plugged, energy_now, power_now, voltage_now, current_now, capacity, energy_full, energy_full_design)
+
+    def close(self):
+        for fd in self.fds.values():
+            os.close(fd)
+        self.fds = {}
+        if self.fd_online != None:
+            os.close(self.fd_online)
+            self.fd_online = None
+
+
+# ReplaySensor
+#
+# Replays the data rows of a log-file (see read_log) according to the time of
+#     a (virtual) clock. finished is set when the last row was returned.
+class ReplaySensor:
+    finished = False
+
+    # __init__
+    #
+    # @param    string  filename    Filename of the log-file.
+    # @param    object  clock       Clock (see VirtualClock).
+    #
+    # @return   None
+    def __init__(self, filename, clock):
+        self.name = 'replay:' + filename
+        self.clock = clock
+        self.start = None
+        self.samples = read_log(filename, {})
+        self.current = next(self.samples, None)
+        if self.current == None:
+            raise RuntimeError('no data rows found in ' + filename)
+        self.upcoming = next(self.samples, None)
+
+    # read
+    #
+    # @return   Returns a BatteryReading of the last row that is not in the
+    #               future. Whether the charger was connected is derived
+    #               from the remaining time (None if unknown), the power is
+    #               None if the log-file does not contain it.
+    def read(self):
+        if self.start == None:
+            self.start = self.clock.time() - self.current.time
+        elapsed = self.clock.time() - self.start
+
+        while self.upcoming != None and self.upcoming.time <= elapsed:
+            self.current = self.upcoming
+            self.upcoming = next(self.samples, None)
+        if self.upcoming == None:
+            self.finished = True
+
+        power_plugged = plugged_from_secsleft(self.current.secsleft)
+        secsleft = self.current.secsleft
+        if power_plugged:
+            secsleft = POWER_TIME_UNLIMITED
+        power_now = None
+        if self.current.power >= 0:
+            power_now = self.current.power
+        return BatteryReading(self.current.soc, secsleft, power_plugged, None, power_now, None, None, None, None, None)
+
+    def close(self):
+        self.samples.close()
+
+
+# SyntheticSensor
+#
+# Simulates a linear discharge according to the time of a (virtual) clock.
+#     finished is set when the battery is empty.
+class SyntheticSensor:
+    finished = False
+
+    # __init__
+    #
+    # @param    float   consumption     Consumption in (% / h).
+    # @param    float   soc_start       State of charge at the start.
+    # @param    object  clock           Clock (see VirtualClock).
+    #
+    # @return   None
+    def __init__(self, consumption, soc_start, clock):
+        if not consumption > 0:
+            raise RuntimeError('the consumption of the synthetic battery must be positive')
+
+        self.name = 'synthetic:' + str(consumption) + ':' + str(soc_start)
+        self.consumption = consumption
+        self.soc_start = soc_start
+        self.clock = clock
+        self.start = None
+
+    # read
+    #
+    # @return   Returns a BatteryReading.
+    def read(self):
+        if self.start == None:
+            self.start = self.clock.time()
+
+        percent = max(self.soc_start - self.consumption * (self.clock.time() - self.start) / 3600, 0)
+        if percent == 0:
+            self.finished = True
+        return BatteryReading(percent, percent / self.consumption * 3600, False, None, None, None, None, None, None, None)
+
+    def close(self):
+        pass
+
+
+# create_sensor
+#
+# @param    Namespace   args    Arguments (--simulate, --sensor and --battery).
+# @param    object      clock   Clock (see SystemClock) of simulated sensors.
+#
+# @return   Returns the sensor selected with --simulate, --sensor and
+#               --battery.
+def create_sensor(args, clock):
+    if args.simulate != None:
+        if args.simulate.startswith('synthetic:'):
+            try:
+                values = [float(v) for v in args.simulate.split(':')[1:]]
+            except ValueError:
+                raise RuntimeError('invalid synthetic battery: ' + args.simulate)
+            if len(values) == 1:
+                values.append(100)
+            if len(values) != 2:
+                raise RuntimeError('invalid synthetic battery: ' + args.simulate)
+            return SyntheticSensor(values[0], values[1], clock)
+        if not os.path.isfile(args.simulate):
+            raise RuntimeError('log-file ' + args.simulate + ' not found')
+        return ReplaySensor(args.simulate, clock)
+    if args.sensor == 'psutil':
+        return PsutilSensor()
+    if args.sensor == 'sysfs' or args.battery != None:
+        return SysfsSensor(args.battery)
+    if system() == 'Linux' and len(SysfsSensor.find_batteries()) > 0:
+        return SysfsSensor()
+    return PsutilSensor()
+
+
+# battery_identity
+#
+# @param    object  sensor  Sensor (see create_sensor).
+#
+# @return   Returns the key, the model and the serial number of the battery of
+#               the sensor (see SysfsSensor.identity). Other sensors are
+#               identified by their name and the host.
+def battery_identity(sensor):
+    if isinstance(sensor, SysfsSensor):
+        return sensor.identity()
+    return sensor.name + '@' + node(), None, None
@@ -0,0 +1,533 @@
+#-------------------------------------------------------------------------------
+# BatterySoCMonitor - telemetry
+#
+# System telemetry captured with the samples (see --telemetry).
+#-------------------------------------------------------------------------------
+# @author: Andreas Menzel
+# @license: MIT License
+# @copyright: Copyright (c) 2021 Andreas Menzel
+#-------------------------------------------------------------------------------
+
+import os
+from time import monotonic, perf_counter
+
+
+# open_file
+#
+# @param    string  filename    Filename.
+#
+# @return   Returns a file descriptor of the file or None on error.
+def open_file(filename):
+    try:
+        return os.open(filename, os.O_RDONLY)
+    except OSError:
+        return None
+
+
+# read_fd
+#
+# Reads a file of /proc or /sys again (see SysfsSensor).
+#
+# @param    int     fd      File descriptor.
+# @param    int     size    Maximum number of bytes.
+#
+# @return   Returns the content of the file or None on error.
+def read_fd(fd, size=4096):
+    try:
+        return os.pread(fd, size, 0).decode()
+    except OSError:
+        return None
+
+
+# Rates
+#
+# Converts counters (e.g. bytes since boot) to rates (per second).
+class Rates:
+    def __init__(self):
+        self.last = None
+        self.last_time = None
+
+    # update
+    #
+    # @param    [float]     counters    Counters.
+    #
+    # @return   Returns the rates since the last update or None on the first
+    #               update.
+    def update(self, counters):
+        now = monotonic()
+        rates = None
+        if self.last != None and now > self.last_time:
+            rates = [max(c - l, 0) / (now - self.last_time) for c, l in zip(counters, self.last)]
+        self.last = counters
+        self.last_time = now
+        return rates
+
+
+# CpuCollector
+#
+# Utilization (in %) and average frequency (in MHz) of the CPUs. On Linux
+#     /proc/stat and the cpufreq files are opened once and read with pread,
+#     otherwise psutil is used.
+class CpuCollector:
+    name = 'cpu'
+    divisor = 1
+
+    def __init__(self):
+        self.fd_stat = open_file('/proc/stat')
+        self.fds_frequency = []
+        self.last = None
+        if self.fd_stat != None:
+            root = '/sys/devices/system/cpu'
+            try:
+                cpus = sorted(os.listdir(root))
+            except OSError:
+                cpus = []
+            for cpu in cpus:
+                if cpu.startswith('cpu') and cpu[3:].isdigit():
+                    fd = open_file(os.path.join(root, cpu, 'cpufreq', 'scaling_cur_freq'))
+                    if fd != None:
+                        self.fds_frequency.append(fd)
+        else:
+            try:
+                import psutil
+            except ImportError:
+                raise RuntimeError('cpu requires /proc/stat or psutil')
+            psutil.cpu_percent(None)
+
+    # collect
+    #
+    # @return   Returns a list of (name, value) tuples.
+    def collect(self):
+        values = []
+        if self.fd_stat == None:
+            import psutil
+
+            values.append(('cpu_percent', psutil.cpu_percent(None)))
+            frequency = psutil.cpu_freq()
+            if frequency != None:
+                values.append(('cpu_mhz', round(frequency.current)))
+            return values
+
+        content = read_fd(self.fd_stat, 256)
+        if content != None:
+            times = [int(t) for t in content.split('\n', 1)[0].split()[1:]]
+            # idle and iowait
+            current = (sum(times), times[3] + times[4])
+            if self.last != None and current[0] > self.last[0]:
+                busy = (current[0] - self.last[0]) - (current[1] - self.last[1])
+                values.append(('cpu_percent', round(busy / (current[0] - self.last[0]) * 100, 1)))
+            self.last = current
+
+        frequencies = [read_fd(fd, 32) for fd in self.fds_frequency]
+        frequencies = [int(f) for f in frequencies if f]
+        if len(frequencies) > 0:
+            # kHz
+            values.append(('cpu_mhz', round(sum(frequencies) / len(frequencies) / 1000)))
+        return values
+
+    def close(self):
+        for fd in [self.fd_stat] + self.fds_frequency:
+            if fd != None:
+                os.close(fd)
+        self.fd_stat = None
+        self.fds_frequency = []
+
+
+# LoadCollector
+#
+# Load average of the last minute.
+class LoadCollector:
+    name = 'load'
+    divisor = 1
+
+    def __init__(self):
+        if not hasattr(os, 'getloadavg'):
+            raise RuntimeError('load is not available on this platform')
+
+    # collect
+    #
+    # @return   Returns a list of (name, value) tuples.
+    def collect(self):
+        return [('load_1', round(os.getloadavg()[0], 2))]
+
+    def close(self):
+        pass
+
+
+# BacklightCollector
+#
+# Brightness (in %) of the first backlight in /sys/class/backlight (Linux).
+class BacklightCollector:
+    name = 'backlight'
+    divisor = 1
+    root = '/sys/class/backlight'
+
+    def __init__(self):
+        try:
+            backlights = sorted(os.listdir(BacklightCollector.root))
+        except OSError:
+            backlights = []
+        if len(backlights) == 0:
+            raise RuntimeError('no backlight found in ' + BacklightCollector.root)
+
+        path = os.path.join(BacklightCollector.root, backlights[0])
+        self.fd = open_file(os.path.join(path, 'actual_brightness'))
+        if self.fd == None:
+            self.fd = open_file(os.path.join(path, 'brightness'))
+        fd = open_file(os.path.join(path, 'max_brightness'))
+        if self.fd == None or fd == None:
+            for f in [self.fd, fd]:
+                if f != None:
+                    os.close(f)
+            raise RuntimeError('backlight ' + backlights[0] + ' can not be read')
+        self.maximum = int(read_fd(fd, 32) or 0)
+        os.close(fd)
+
+    # collect
+    #
+    # @return   Returns a list of (name, value) tuples.
+    def collect(self):
+        brightness = read_fd(self.fd, 32)
+        if not brightness or not self.maximum > 0:
+            return []
+        return [('backlight_percent', round(int(brightness) / self.maximum * 100, 1))]
+
+    def close(self):
+        if self.fd != None:
+            os.close(self.fd)
+            self.fd = None
+
+
+# NetworkCollector
+#
+# Received and sent kB / s of all network interfaces except the loopback.
+class NetworkCollector:
+    name = 'network'
+    divisor = 5
+
+    def __init__(self):
+        self.fd = open_file('/proc/net/dev')
+        self.rates = Rates()
+        if self.fd == None:
+            try:
+                import psutil
+            except ImportError:
+                raise RuntimeError('network requires /proc/net/dev or psutil')
+            psutil.net_io_counters()
+
+    # collect
+    #
+    # @return   Returns a list of (name, value) tuples.
+    def collect(self):
+        if self.fd == None:
+            import psutil
+
+            counters = psutil.net_io_counters()
+            received, sent = counters.bytes_recv, counters.bytes_sent
+        else:
+            content = read_fd(self.fd, 65536)
+            if content == None:
+                return []
+            received = 0
+            sent = 0
+            for line in content.split('\n')[2:]:
+                interface, _, columns = line.partition(':')
+                columns = columns.split()
+                if interface.strip() == 'lo' or len(columns) < 9:
+                    continue
+                received += int(columns[0])
+                sent += int(columns[8])
+
+        rates = self.rates.update((received, sent))
+        if rates == None:
+            return []
+        return [('network_rx_kbps', round(rates[0] / 1000, 1)), ('network_tx_kbps', round(rates[1] / 1000, 1))]
+
+    def close(self):
+        if self.fd != None:
+            os.close(self.fd)
+            self.fd = None
+
+
+# DiskCollector
+#
+# Read and written kB / s of all disks (without partitions, loop, RAM and
+#     device-mapper devices).
+class DiskCollector:
+    name = 'disk'
+    divisor = 5
+
+    def __init__(self):
+        self.fd = open_file('/proc/diskstats')
+        self.rates = Rates()
+        self.disks = set()
+        if self.fd != None:
+            try:
+                self.disks = set(d for d in os.listdir('/sys/block') if not d.startswith(('loop', 'ram', 'zram', 'dm-', 'md')))
+            except OSError:
+                pass
+        else:
+            try:
+                import psutil
+            except ImportError:
+                raise RuntimeError('disk requires /proc/diskstats or psutil')
+            if psutil.disk_io_counters() == None:
+                raise RuntimeError('no disk found')
+
+    # collect
+    #
+    # @return   Returns a list of (name, value) tuples.
+    def collect(self):
+        if self.fd == None:
+            import psutil
+
+            counters = psutil.disk_io_counters()
+            read, written = counters.read_bytes, counters.write_bytes
+        else:
+            content = read_fd(self.fd, 65536)
+            if content == None:
+                return []
+            read = 0
+            written = 0
+            for line in content.split('\n'):
+                columns = line.split()
+                if len(columns) < 10 or columns[2] not in self.disks:
+                    continue
+                # sectors of 512 bytes
+                read += int(columns[5]) * 512
+                written += int(columns[9]) * 512
+
+        rates = self.rates.update((read, written))
+        if rates == None:
+            return []
+        return [('disk_read_kbps', round(rates[0] / 1000, 1)), ('disk_write_kbps', round(rates[1] / 1000, 1))]
+
+    def close(self):
+        if self.fd != None:
+            os.close(self.fd)
+            self.fd = None
+
+
+# ProcessCollector
+#
+# The processes that used the most CPU time since the last collection (CPU
+#     time as the estimate of the energy), with their share of one CPU (in
+#     %). Requires psutil.
+class ProcessCollector:
+    name = 'processes'
+    divisor = 30
+
+    # __init__
+    #
+    # @param    int     top     Number of processes.
+    #
+    # @return   None
+    def __init__(self, top=3):
+        try:
+            import psutil
+        except ImportError:
+            raise RuntimeError('processes requires psutil')
+        self.psutil = psutil
+        self.top = top
+        self.last = {}
+        self.last_time = None
+
+    # collect
+    #
+    # @return   Returns a list of (name, value) tuples.
+    def collect(self):
+        now = monotonic()
+        current = {}
+        usage = []
+        for process in self.psutil.process_iter(['name', 'cpu_times']):
+            cpu_times = process.info['cpu_times']
+            if cpu_times == None:
+                continue
+            # the pid can be reused by a process with another name
+            key = (process.pid, process.info['name'])
+            current[key] = cpu_times.user + cpu_times.system
+            if key in self.last:
+                usage.append((current[key] - self.last[key], key[1]))
+        elapsed = None
+        if self.last_time != None:
+            elapsed = now - self.last_time
+        self.last = current
+        self.last_time = now
+        if elapsed == None or not elapsed > 0:
+            return []
+
+        values = []
+        usage = sorted([u for u in usage if u[0] > 0], reverse=True)
+        for rank, (seconds, name) in enumerate(usage[:self.top]):
+            name = '_'.join(str(name).replace('=', '_').split()) or '?'
+            values.append(('process_' + str(rank + 1), name + ':' + str(round(seconds / elapsed * 100, 1))))
+        return values
+
+    def close(self):
+        self.last = {}
+
+
+collector_classes = [CpuCollector, LoadCollector, BacklightCollector, NetworkCollector, DiskCollector, ProcessCollector]
+
+
+# parse_collectors
+#
+# Parses the collectors (see --telemetry).
+#
+# @param    [string]    specifications  <collector>[/<divisor>] (all collectors
+#                                           if empty).
+#
+# @return   Returns a list of (class, divisor, required) tuples. required is
+#               False if the collector was not specified.
+def parse_collectors(specifications):
+    if len(specifications) == 0:
+        return [(c, c.divisor, False) for c in collector_classes]
+
+    classes = dict((c.name, c) for c in collector_classes)
+    collectors = []
+    for specification in specifications:
+        name, _, divisor = specification.partition('/')
+        if name not in classes:
+            raise ValueError('unknown collector: ' + specification)
+        if divisor == '':
+            divisor = classes[name].divisor
+        else:
+            try:
+                divisor = int(divisor)
+            except ValueError:
+                raise ValueError('invalid divisor: ' + specification)
+            if divisor < 1:
+                raise ValueError('the divisor must be at least 1: ' + specification)
+        collectors.append((classes[name], divisor, True))
+    return collectors
+
+
+# Telemetry
+#
+# Runs each collector every divisor-th sample and keeps the latest values.
+#     The duration of each collector is measured (moving average). If the
+#     average duration per sample exceeds the budget, the divisor of the
+#     collector with the largest share is doubled until it fits.
+class Telemetry:
+    # __init__
+    #
+    # @param    [tuple]     collectors  (collector, divisor) tuples.
+    # @param    float       budget      Maximum average duration (in seconds)
+    #                                       per sample.
+    #
+    # @return   None
+    def __init__(self, collectors, budget):
+        self.collectors = [[collector, divisor, None] for collector, divisor in collectors]
+        self.budget = budget
+        self.samples = 0
+        self.values = {} # latest values of each collector
+        self.changed = False
+        self.duration = 0
+        self.divisor_changes = 0
+
+    # collect
+    #
+    # Runs the collectors due at this sample.
+    #
+    # @return   None
+    def collect(self):
+        for entry in self.collectors:
+            collector, divisor, cost = entry
+            if self.samples % divisor != 0:
+                continue
+
+            started = perf_counter()
+            values = collector.collect()
+            duration = perf_counter() - started
+            self.values[collector.name] = values
+            if len(values) > 0:
+                self.changed = True
+            self.duration += duration
+
+            if cost == None:
+                entry[2] = duration
+            else:
+                entry[2] = cost * 0.8 + duration * 0.2
+            self.enforce_budget()
+        self.samples += 1
+
+    # overhead
+    #
+    # @return   Returns the average duration (in seconds) of the collectors per
+    #               sample.
+    def overhead(self):
+        return sum(cost / divisor for _, divisor, cost in self.collectors if cost != None)
+
+    # enforce_budget
+    #
+    # @return   None
+    def enforce_budget(self):
+        while self.overhead() > self.budget:
+            entry = max((e for e in self.collectors if e[2] != None), key=lambda e: e[2] / e[1])
+            entry[1] *= 2
+            self.divisor_changes += 1
+
+    # collector_names
+    #
+    # @return   Returns the names of the collectors with their divisors
+    #               (<collector>/<divisor>).
+    def collector_names(self):
+        return [collector.name + '/' + str(divisor) for collector, divisor, _ in self.collectors]
+
+    # line
+    #
+    # @return   Returns the latest values (name=value) if a collector returned
+    #               values since the last call, otherwise an empty list.
+    def line(self):
+        if not self.changed:
+            return []
+        self.changed = False
+        return [name + '=' + str(value) for values in self.values.values() for name, value in values]
+
+    def close(self):
+        for collector, _, _ in self.collectors:
+            collector.close()
+
+    # statistics
+    #
+    # @return   Returns a list of (name, value) tuples.
+    def statistics(self):
+        statistics = [
+            ('telemetry_ms', round(self.duration * 1000, 3)),
+            ('telemetry_per_sample_ms', round(self.duration / max(self.samples, 1) * 1000, 3)),
+            ('telemetry_budget_ms', round(self.budget * 1000, 3)),
+            ('telemetry_divisor_changes', self.divisor_changes),
+        ]
+        for collector, divisor, _ in self.collectors:
+            statistics.append(('telemetry_' + collector.name + '_divisor', divisor))
+        return statistics
+
+
+# create_telemetry
+#
+# @param    [string]    specifications  Collectors (see --telemetry).
+# @param    int         top             Number of processes (see
+#                                           ProcessCollector).
+# @param    float       budget          Maximum average duration (in seconds)
+#                                           per sample.
+#
+# @return   Returns the Telemetry and the names of the collectors that are not
+#               available (only if not specified explicitly).
+def create_telemetry(specifications, top, budget):
+    collectors = []
+    skipped = []
+    for collector_class, divisor, required in parse_collectors(specifications):
+        try:
+            if collector_class == ProcessCollector:
+                collector = collector_class(top)
+            else:
+                collector = collector_class()
+        except RuntimeError as e:
+            if required:
+                for c, _ in collectors:
+                    c.close()
+                raise
+            skipped.append(collector_class.name + ' (' + str(e) + ')')
+            continue
+        collectors.append((collector, divisor))
+    return Telemetry(collectors, budget), skipped
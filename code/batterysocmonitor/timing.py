@@ -0,0 +1,244 @@
+#-------------------------------------------------------------------------------
+# BatterySoCMonitor - timing
+#
+# Clocks, the sample scheduler and the profiler of the sampling loop.
+#-------------------------------------------------------------------------------
+# @author: Andreas Menzel
+# @license: MIT License
+# @copyright: Copyright (c) 2021 Andreas Menzel
+#-------------------------------------------------------------------------------
+
+from math import floor
+from resource import getrusage, RUSAGE_SELF
+from time import sleep, time, monotonic, perf_counter, perf_counter_ns
+import time as time_module
+
+
+# SystemClock
+#
+# Clocks used while monitoring the battery. time() is the wall clock,
+#     monotonic() does not jump (NTP) and does not advance while the system is
+#     suspended, boottime() does not jump but includes suspended time.
+class SystemClock:
+    def time(self):
+        return time()
+
+    def monotonic(self):
+        return monotonic()
+
+    def boottime(self):
+        if hasattr(time_module, 'CLOCK_BOOTTIME'):
+            return time_module.clock_gettime(time_module.CLOCK_BOOTTIME)
+        return monotonic()
+
+    def sleep(self, seconds):
+        sleep(seconds)
+
+
+# VirtualClock
+#
+# Simulated clock for --simulate. sleep() returns immediately and advances the
+#     time of the clock.
+class VirtualClock:
+    # __init__
+    #
+    # @param    float   start   Start time of the clock (timestamp).
+    #
+    # @return   None
+    def __init__(self, start):
+        self.now = start
+
+    def time(self):
+        return self.now
+
+    def monotonic(self):
+        return self.now
+
+    def boottime(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+# Scheduler
+#
+# Schedules the samples at absolute deadlines (start + tick * period) of the
+#     boot time clock, so wall clock jumps do not shift the samples and the
+#     execution time of a tick is compensated. Deadlines that already passed
+#     (slow tick, suspend) are skipped and counted as missed ticks. Suspends are
+#     detected by the boot time clock advancing faster than the monotonic
+#     clock.
+class Scheduler:
+    # suspends shorter than this (in seconds) are ignored
+    suspend_threshold = 0.5
+
+    # __init__
+    #
+    # @param    object  clock   Clock (see SystemClock).
+    # @param    float   period  Delay (in seconds) between two ticks.
+    #
+    # @return   None
+    def __init__(self, clock, period):
+        self.clock = clock
+        self.period = period
+        self.start = clock.boottime()
+        self.offset = self.start - clock.monotonic()
+        self.tick = 0
+        self.tick_time = self.start
+
+        self.missed_ticks = 0
+        self.overruns = 0
+        self.jitter_count = 0
+        self.jitter_total = 0
+        self.jitter_max = 0
+        self.suspends = 0
+        self.suspended = 0
+
+    # elapsed
+    #
+    # @return   Returns the seconds since the start (including suspends).
+    def elapsed(self):
+        return self.clock.boottime() - self.start
+
+    # wait
+    #
+    # Sleeps until the next deadline.
+    #
+    # @return   Returns the index of the new tick.
+    def wait(self):
+        now = self.clock.boottime()
+        if now - self.tick_time > self.period:
+            self.overruns += 1
+
+        tick = self.tick + 1
+        passed = floor((now - self.start) / self.period)
+        if passed >= tick:
+            self.missed_ticks += passed - tick
+            tick = passed
+        else:
+            self.clock.sleep(self.start + tick * self.period - now)
+
+        woke = self.clock.boottime()
+        passed = floor((woke - self.start) / self.period)
+        if passed > tick:
+            # suspended or delayed while sleeping
+            self.missed_ticks += passed - tick
+            tick = passed
+
+        offset = woke - self.clock.monotonic()
+        if offset - self.offset > Scheduler.suspend_threshold:
+            self.suspends += 1
+            self.suspended += offset - self.offset
+        self.offset = offset
+
+        jitter = woke - (self.start + tick * self.period)
+        self.jitter_count += 1
+        self.jitter_total += jitter
+        self.jitter_max = max(self.jitter_max, jitter)
+
+        self.tick = tick
+        self.tick_time = woke
+        return tick
+
+    # statistics
+    #
+    # @return   Returns a list of (name, value) tuples with the timing of the
+    #               ticks (jitter in milliseconds).
+    def statistics(self):
+        jitter_avg = 0
+        if self.jitter_count > 0:
+            jitter_avg = self.jitter_total / self.jitter_count
+
+        return [
+            ('ticks', self.tick + 1),
+            ('missed_ticks', self.missed_ticks),
+            ('overruns', self.overruns),
+            ('jitter_avg_ms', round(jitter_avg * 1000, 3)),
+            ('jitter_max_ms', round(self.jitter_max * 1000, 3)),
+            ('suspends', self.suspends),
+            ('suspended_s', round(self.suspended, 1)),
+        ]
+
+
+# Profiler
+#
+# Measures the duration of the phases of a sample (see --profile_self) with
+#     perf_counter_ns, and the CPU time and context switches of the process
+#     (getrusage).
+#     The time spent writing output (see myPrint) is counted separately from
+#     the phase in which it happened.
+class Profiler:
+    # __init__
+    #
+    # @return   None
+    def __init__(self):
+        self.phases = {}
+        self.written = 0
+        self.last = perf_counter_ns()
+        self.usage_start = getrusage(RUSAGE_SELF)
+        self.time_start = perf_counter()
+
+    # lap
+    #
+    # Ends the current phase.
+    #
+    # @param    string  phase   Name of the phase.
+    #
+    # @return   None
+    def lap(self, phase):
+        now = perf_counter_ns()
+        self.add(phase, now - self.last - self.written)
+        if self.written > 0:
+            self.add('write', self.written)
+            self.written = 0
+        self.last = now
+
+    # add
+    #
+    # @param    string  phase       Name of the phase.
+    # @param    int     duration    Duration (in nanoseconds).
+    #
+    # @return   None
+    def add(self, phase, duration):
+        if phase not in self.phases:
+            self.phases[phase] = [0, 0, 0]
+        values = self.phases[phase]
+        values[0] += 1
+        values[1] += duration
+        values[2] = max(values[2], duration)
+
+    # statistics
+    #
+    # @param    int     samples     Number of samples.
+    #
+    # @return   Returns a list of (phase, calls, average, maximum, total,
+    #               share of the active time) tuples (times in microseconds)
+    #               and a list of (name, value) tuples with the resource usage
+    #               of the process since the first sample.
+    def statistics(self, samples):
+        active = sum(values[1] for phase, values in self.phases.items() if phase != 'sleep')
+        phases = []
+        for phase, (calls, total, maximum) in self.phases.items():
+            share = '-'
+            if phase != 'sleep' and active > 0:
+                share = round(total / active * 100, 1)
+            phases.append((phase, calls, round(total / calls / 1000, 1), round(maximum / 1000, 1), round(total / 1000), share))
+
+        usage = getrusage(RUSAGE_SELF)
+        start = self.usage_start
+        cpu_seconds = usage.ru_utime - start.ru_utime + usage.ru_stime - start.ru_stime
+        voluntary = usage.ru_nvcsw - start.ru_nvcsw
+        involuntary = usage.ru_nivcsw - start.ru_nivcsw
+        elapsed = perf_counter() - self.time_start
+        samples = max(1, samples)
+
+        usage = [
+            ('cpu_s', round(cpu_seconds, 3)),
+            ('cpu_share_%', round(cpu_seconds / max(elapsed, 1e-9) * 100, 3)),
+            ('cpu_per_sample_ms', round(cpu_seconds / samples * 1000, 3)),
+            ('wakeups', voluntary),
+            ('wakeups_per_sample', round(voluntary / samples, 2)),
+            ('preemptions', involuntary),
+        ]
+        return phases, usage
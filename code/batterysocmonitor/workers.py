@@ -0,0 +1,191 @@
+#-------------------------------------------------------------------------------
+# BatterySoCMonitor - workers
+#
+# Worker processes that put a reproducible load on the system.
+#-------------------------------------------------------------------------------
+# @author: Andreas Menzel
+# @license: MIT License
+# @copyright: Copyright (c) 2021 Andreas Menzel
+#-------------------------------------------------------------------------------
+
+import os
+from signal import signal, SIGINT, SIG_IGN
+from time import sleep, monotonic, perf_counter
+
+
+# worker_cpuLoad
+#
+# Performs a calculation to occupy the CPU.
+#
+# @return   None
+def worker_cpuLoad():
+    x = 123
+    while True:
+        x*x
+
+
+# parse_workload
+#
+# Parses a worker job (see --workers).
+#
+# @param    string  job     Worker job.
+#
+# @return   Returns a list of phases (kind, parameter, core, duration).
+#               duration is None for a phase without end.
+def parse_workload(job):
+    if job == 'cpuLoad':
+        return [('cpu', 100, None, None)]
+
+    phases = []
+    for phase in job.split('+'):
+        # the phases after a phase without end would never run
+        if len(phases) > 0 and phases[-1][3] == None:
+            raise ValueError('only the last phase can be without duration: ' + job)
+
+        duration = None
+        if '/' in phase:
+            phase, duration = phase.split('/', 1)
+            duration = float(duration)
+            if not duration > 0:
+                raise ValueError('the duration of a phase must be positive: ' + job)
+        core = None
+        if '@' in phase:
+            phase, core = phase.split('@', 1)
+            core = int(core)
+            if hasattr(os, 'sched_getaffinity') and core not in os.sched_getaffinity(0):
+                raise ValueError('core ' + str(core) + ' is not available: ' + job)
+        kind, _, parameter = phase.partition(':')
+
+        if kind == 'cpu':
+            parameter = float(parameter or 100)
+            if not 0 < parameter <= 100:
+                raise ValueError('cpu utilization must be between 0 and 100: ' + job)
+        elif kind == 'memory':
+            parameter = int(parameter or 64)
+        elif kind == 'disk':
+            parameter = int(parameter or 16)
+        elif kind != 'idle' or parameter != '':
+            raise ValueError('unknown worker job: ' + job)
+        phases.append((kind, parameter, core, duration))
+
+    return phases
+
+
+# calibrate_workload
+#
+# Measures how many busy-loop iterations take one millisecond, so the duty
+#     cycle of the cpu workload only has to read the clock once per
+#     millisecond.
+#
+# @return   Returns the number of iterations per millisecond.
+def calibrate_workload():
+    iterations = 1000
+    while True:
+        x = 123
+        calibration_start = perf_counter()
+        for _ in range(iterations):
+            x*x
+        duration = perf_counter() - calibration_start
+        if duration > 0.05:
+            return max(1, round(iterations / (duration * 1000)))
+        iterations *= 2
+
+
+# worker_workload
+#
+# Runs the phases of a worker job (see parse_workload). The phases are
+#     repeated if all of them have a duration.
+#
+# @param    [tuple]     phases      Phases of the job.
+# @param    int         chunk       Busy-loop iterations per millisecond.
+#
+# @return   None
+def worker_workload(phases, chunk):
+    # the main process terminates the worker
+    signal(SIGINT, SIG_IGN)
+
+    # phases without a core run on all cores again
+    cores = None
+    if hasattr(os, 'sched_getaffinity'):
+        cores = os.sched_getaffinity(0)
+
+    while True:
+        for kind, parameter, core, duration in phases:
+            if cores != None:
+                if core != None:
+                    os.sched_setaffinity(0, {core})
+                elif os.sched_getaffinity(0) != cores:
+                    os.sched_setaffinity(0, cores)
+
+            phase_end = None
+            if duration != None:
+                phase_end = monotonic() + duration
+
+            if kind == 'cpu':
+                # busy for parameter % of each 100 ms period
+                period = 0.1
+                x = 123
+                while phase_end == None or monotonic() < phase_end:
+                    period_start = monotonic()
+                    while monotonic() - period_start < period * parameter / 100:
+                        for _ in range(chunk):
+                            x*x
+                    remaining = period - (monotonic() - period_start)
+                    if remaining > 0:
+                        sleep(remaining)
+            elif kind == 'memory':
+                source = bytearray(os.urandom(1024)) * (parameter * 1024)
+                destination = bytearray(len(source))
+                while phase_end == None or monotonic() < phase_end:
+                    destination[:] = source
+            elif kind == 'disk':
+                data = os.urandom(1024 * 1024)
+                with open('BatterySoCMonitor_disk_' + str(os.getpid()) + '.tmp', 'w+b') as f:
+                    # the file disappears even if the worker is terminated
+                    os.unlink(f.name)
+                    while phase_end == None or monotonic() < phase_end:
+                        f.seek(0)
+                        for _ in range(parameter):
+                            f.write(data)
+                        f.flush()
+                        os.fsync(f.fileno())
+                        f.seek(0)
+                        while f.read(1024 * 1024):
+                            pass
+            else:
+                sleep(duration if duration != None else 2**31)
+
+        if phases[-1][3] == None:
+            return
+
+
+# process_cpu_seconds
+#
+# @param    int     pid     Process id.
+#
+# @return   Returns the CPU time (user and system, in seconds) of a process
+#               from /proc (Linux only).
+def process_cpu_seconds(pid):
+    with open('/proc/' + str(pid) + '/stat', 'r') as f:
+        stat = f.read()
+    # the name of the process may contain spaces and parentheses
+    fields = stat[stat.rindex(')') + 2:].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+
+
+# measure_worker_utilization
+#
+# @param    [tuple]     worker_utilization  (job, start time) of each worker.
+# @param    [Process]   worker_threads      Worker processes.
+#
+# @return   Returns a list of (job, CPU utilization in %) tuples, one for each
+#               worker process (-1 if unknown).
+def measure_worker_utilization(worker_utilization, worker_threads):
+    utilization = []
+    for (job, started), wt in zip(worker_utilization, worker_threads):
+        try:
+            elapsed = monotonic() - started
+            utilization.append((job, round(process_cpu_seconds(wt.pid) / elapsed * 100, 1)))
+        except (OSError, ValueError, IndexError, ZeroDivisionError):
+            utilization.append((job, -1))
+    return utilization
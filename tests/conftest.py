@@ -0,0 +1,47 @@
+#-------------------------------------------------------------------------------
+# BatterySoCMonitor - tests
+#
+# The package is imported from code/ (it is not installed).
+#-------------------------------------------------------------------------------
+# @author: Andreas Menzel
+# @license: MIT License
+# @copyright: Copyright (c) 2021 Andreas Menzel
+#-------------------------------------------------------------------------------
+
+import os
+import subprocess
+import sys
+
+code_directory = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'code')
+sys.path.insert(0, code_directory)
+
+
+# run_command
+#
+# Runs a command of the script in a new process.
+#
+# @param    [string]    arguments   Arguments of the script.
+# @param    float       timeout     Timeout (in seconds).
+# @param    string      cwd         Working directory.
+#
+# @return   Returns the CompletedProcess (stdout and stderr as text).
+def run_command(arguments, timeout=60, cwd=None):
+    env = dict(os.environ)
+    env['PYTHONPATH'] = code_directory + os.pathsep + env.get('PYTHONPATH', '')
+    return subprocess.run([sys.executable, '-m', 'batterysocmonitor'] + arguments, env=env, cwd=cwd,
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, timeout=timeout)
+
+
+# start_command
+#
+# Starts a command of the script in a new process (see run_command).
+#
+# @param    [string]    arguments   Arguments of the script.
+# @param    string      cwd         Working directory.
+#
+# @return   Returns the Popen (stdout and stderr as text).
+def start_command(arguments, cwd=None):
+    env = dict(os.environ)
+    env['PYTHONPATH'] = code_directory + os.pathsep + env.get('PYTHONPATH', '')
+    return subprocess.Popen([sys.executable, '-m', 'batterysocmonitor'] + arguments, env=env, cwd=cwd,
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
@@ -0,0 +1,141 @@
+#-------------------------------------------------------------------------------
+# BatterySoCMonitor - tests of the analysis of log-files
+#-------------------------------------------------------------------------------
+# @author: Andreas Menzel
+# @license: MIT License
+# @copyright: Copyright (c) 2021 Andreas Menzel
+#-------------------------------------------------------------------------------
+
+import os
+
+import pytest
+
+from conftest import code_directory, run_command
+from batterysocmonitor.analysis import analyze_log, report_log
+from batterysocmonitor.logfile import read_log
+
+
+# write_log
+#
+# @param    path        filename    Filename of the log-file.
+# @param    [tuple]     rows        (time, soc, secsleft) of each data row or
+#                                   a line that is written as it is.
+#
+# @return   Returns the filename as string.
+def write_log(filename, rows):
+    with open(filename, 'w') as f:
+        f.write('# Welcome to BatterySoCMonitor version 3.0.0!\n')
+        f.write('# sample_rate\t:\t60\n\n')
+        f.write('# <sec>\t<soc>\t<until>\t<cons>\t<sec/%>\t<sec/100%>\n')
+        for row in rows:
+            if isinstance(row, str):
+                f.write(row + '\n')
+                continue
+            time, soc, secsleft = row
+            f.write(str(time) + '\t' + str(soc) + '\t' + str(secsleft) + '\t-1\t-1\t-1\n')
+    return str(filename)
+
+
+def test_report_skips_files_that_are_not_log_files(tmp_path):
+    readme = tmp_path / 'README.md'
+    readme.write_text('# notes\n\nnot a log-file\n')
+    assert report_log(str(readme)) == (None, 'no BatterySoCMonitor header')
+
+    binary = tmp_path / 'garbage.bin'
+    binary.write_bytes(b'\xff\xfe\x00\x81' * 100)
+    summary, reason = report_log(str(binary))
+    assert summary == None and 'decode' in reason
+
+    summary, reason = report_log(str(tmp_path / 'missing.log'))
+    assert summary == None and reason != None
+
+    log = write_log(tmp_path / 'run.log', [(t * 60, 100 - t, 3600) for t in range(10)])
+    summary, reason = report_log(log)
+    assert reason == None and summary['samples'] == 10
+
+
+def test_analyze_removes_the_gap_of_a_resume(tmp_path):
+    # 12 %/h, the battery lost 20 % while the script was not running
+    before = [(t * 60, round(100 - t * 0.2, 2), 3600) for t in range(31)]
+    after = [(7200 + t * 60, round(74 - t * 0.2, 2), 3600) for t in range(31)]
+    resumed = write_log(tmp_path / 'resumed.log', before + ['# Welcome back to BatterySoCMonitor version 3.0.0!', '# resumed_at\t7200'] + after)
+    # the first sample after the gap continues one sample interval after the
+    #     last one with the same state of charge (see DischargeTimeline)
+    assert analyze_log(resumed)['consumption'] == round(0.2 * 59 / 60 * 60, 2)
+
+    # the marker of the current version contains the last sample
+    info = {}
+    marker = write_log(tmp_path / 'marker.log', before[:-1] + ['# resumed_at\t7200\t60\t1800\t94.0\t3600'] + after)
+    times = [sample.time for sample in read_log(marker, info)]
+    assert times[29:32] == [1740, 1800, 7200]
+    assert info['resumes'] == 1
+    assert info['parameters']['sample_rate'] == '60'
+    assert analyze_log(marker)['consumption'] == analyze_log(resumed)['consumption']
+
+    # without the marker the gap is part of the discharge
+    blended = write_log(tmp_path / 'blended.log', before + after)
+    assert analyze_log(blended)['consumption'] > 12.5
+
+
+def test_analyze_an_empty_log(tmp_path):
+    empty = write_log(tmp_path / 'empty.log', [])
+    for method in ['anchor', 'streaming']:
+        summary = analyze_log(empty, method)
+        assert summary['samples'] == 0
+        assert summary['consumption'] == -1
+        assert summary['phases'] == []
+
+
+def test_analyze_a_charge(tmp_path):
+    # plugged (secsleft -2): no discharging samples for the estimator
+    charge = write_log(tmp_path / 'charge.log', [(t * 60, 50 + t * 0.5, -2) for t in range(60)])
+    for method in ['anchor', 'streaming']:
+        summary = analyze_log(charge, method)
+        assert summary['samples'] == 60
+        assert summary['consumption'] == -1
+        assert summary['discharge_seconds'] == 0
+        assert summary['charge_rate'] == 30
+
+
+
+def test_analyze_a_charge_until_full(tmp_path):
+    # the last sample starts an idle phase, it has no duration
+    charge = write_log(tmp_path / 'charge.log', [(t * 60, 90 + t, -2) for t in range(11)])
+    phases = analyze_log(charge, 'anchor')['phases']
+    assert [(phase['kind'], phase['time_start'], phase['time_end']) for phase in phases] == [('charge', 0, 600)]
+
+    demo = os.path.join(os.path.dirname(code_directory), 'demo-log-files', 'Lenovo-Yoga-530-newBatt_charge_-_1.txt')
+    summary = analyze_log(demo, 'anchor')
+    assert [(phase['kind'], phase['time_start'], phase['time_end']) for phase in summary['phases']] == [('charge', 0, 7950)]
+    assert summary['idle_seconds'] == 0
+    assert summary['charge_seconds'] == 7950
+
+
+def test_analyze_with_regression(tmp_path):
+    pytest.importorskip('numpy')
+    discharge = write_log(tmp_path / 'discharge.log', [(t * 60, round(100 - t * 0.2, 2), 3600) for t in range(60)])
+    summary = analyze_log(discharge, 'regression', 10)
+    assert summary['consumption'] == 12
+    assert summary['consumption_low'] <= 12 <= summary['consumption_high']
+
+    charge = write_log(tmp_path / 'charge.log', [(t * 60, 50 + t * 0.5, -2) for t in range(60)])
+    summary = analyze_log(charge, 'regression', 10)
+    assert summary['consumption'] == -1
+    assert summary['consumption_low'] == -1
+
+
+def test_analyze_of_a_resumed_run_matches_the_monitor(tmp_path):
+    # only every 6th sample is logged, both runs stop between two outputs
+    monitor = ['--sample_rate', '10', '--output_rate', '60', '--checkpoint', 'run.ckpt', '--resume', '--log_file', 'run.log']
+    process = run_command(['--simulate', 'synthetic:360:100', '--stop_event', 'soc<=67', 'true'] + monitor, cwd=str(tmp_path))
+    assert process.returncode == 0, process.stderr
+    process = run_command(['--simulate', 'synthetic:360:60', '--stop_event', 'soc<=41', 'true'] + monitor, cwd=str(tmp_path))
+    assert process.returncode == 0, process.stderr
+
+    # <sec> <soc> <until> <cons> of the summary
+    consumption = float(process.stdout.split('# script_terminated_at')[1].splitlines()[2].split('\t')[3])
+    summary = analyze_log(str(tmp_path / 'run.log'))
+    assert summary['time_executed'] == 530
+    assert summary['soc_end'] == 41
+    # the first change of the state of charge (anchor) is not logged
+    assert summary['consumption'] == pytest.approx(consumption, rel=0.01)
@@ -0,0 +1,81 @@
+#-------------------------------------------------------------------------------
+# BatterySoCMonitor - tests of the benchmark command
+#-------------------------------------------------------------------------------
+# @author: Andreas Menzel
+# @license: MIT License
+# @copyright: Copyright (c) 2021 Andreas Menzel
+#-------------------------------------------------------------------------------
+
+import json
+
+import pytest
+
+from conftest import run_command
+from batterysocmonitor import benchmark as benchmark_module
+from batterysocmonitor.benchmark import benchmark, read_baseline
+from batterysocmonitor.cli import create_parser, translate_arguments
+
+
+def parse(argv):
+    return create_parser().parse_args(translate_arguments(['benchmark'] + argv))
+
+
+# results
+#
+# @param    dict    medians     Median (us) of each benchmark.
+#
+# @return   Returns the results of run_benchmarks with one run per benchmark.
+def results(medians):
+    return dict((name, {'unit': 'us', 'runs': [median], 'min': median, 'median': median}) for name, median in medians.items())
+
+
+def test_read_baseline(tmp_path):
+    baseline = tmp_path / 'baseline.json'
+    baseline.write_text(json.dumps({'version': '3.0.0', 'benchmarks': results({'tick': 10})}))
+    assert read_baseline(str(baseline))['tick']['median'] == 10
+
+    for content in ['not json', '[]', '{"benchmarks": []}']:
+        baseline.write_text(content)
+        with pytest.raises(ValueError):
+            read_baseline(str(baseline))
+
+
+def test_exit_status_of_a_regression(tmp_path, monkeypatch, capsys):
+    baseline = str(tmp_path / 'baseline.json')
+    monkeypatch.setattr(benchmark_module, 'run_benchmarks', lambda args: results({'tick': 10, 'format': 2}))
+    benchmark(parse(['--benchmark_file', baseline]))
+    assert read_baseline(baseline)['tick']['median'] == 10
+
+    # 25% slower, a new benchmark is not compared
+    monkeypatch.setattr(benchmark_module, 'run_benchmarks', lambda args: results({'tick': 12.5, 'format': 1, 'parse': 3}))
+    capsys.readouterr()
+    with pytest.raises(SystemExit) as e:
+        benchmark(parse(['--baseline', baseline]))
+    assert e.value.code == 1
+    output = capsys.readouterr().out
+    assert 'tick\t12.5\t12.5\tus\t10\t+25.0\n' in output
+    assert 'format\t1\t1\tus\t2\t-50.0\n' in output
+    assert 'parse\t3\t3\tus\t-\t-\n' in output
+    assert '# regressions\t:\ttick\n' in output
+    assert 'ERROR: 1 benchmark(s) more than 20% slower than the baseline' in output
+
+    # within the threshold
+    benchmark(parse(['--baseline', baseline, '--threshold', '30']))
+    assert 'regressions' not in capsys.readouterr().out
+
+
+def test_benchmark_command(tmp_path):
+    process = run_command(['benchmark', '--select', 'estimator', 'format', '--repeat', '1', '--samples', '200', '--benchmark_file', 'run.json'],
+        cwd=str(tmp_path))
+    assert process.returncode == 0, process.stderr
+    benchmarks = json.loads((tmp_path / 'run.json').read_text())['benchmarks']
+    assert benchmarks['estimator_anchor_ratio']['unit'] == 'x'
+    assert benchmarks['format_seconds_to_human_form']['unit'] == 'us'
+
+    process = run_command(['benchmark', '--select', 'format', '--repeat', '1', '--baseline', 'missing.json'], cwd=str(tmp_path))
+    assert process.returncode == 1
+    assert 'ERROR: could not read the baseline missing.json' in process.stdout
+
+    process = run_command(['benchmark', '--repeat', '0'], cwd=str(tmp_path))
+    assert process.returncode == 1
+    assert process.stdout.startswith('ERROR: ')
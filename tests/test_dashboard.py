@@ -0,0 +1,152 @@
+#-------------------------------------------------------------------------------
+# BatterySoCMonitor - tests of the dashboard
+#-------------------------------------------------------------------------------
+# @author: Andreas Menzel
+# @license: MIT License
+# @copyright: Copyright (c) 2021 Andreas Menzel
+#-------------------------------------------------------------------------------
+
+import io
+import os
+import re
+
+import pytest
+
+from batterysocmonitor import dashboard as dashboard_module
+from batterysocmonitor.dashboard import Dashboard, sparkline
+
+
+# Terminal
+#
+# Applies the escape sequences written by the dashboard (cursor position,
+#     clear screen, clear line) to a screen of lines.
+class Terminal(io.StringIO):
+    def __init__(self, width, height):
+        super().__init__()
+        self.width = width
+        self.height = height
+        self.screen = [' ' * width for _ in range(height)]
+        self.row = 0
+        self.column = 0
+
+    def put(self, text):
+        line = self.screen[self.row]
+        self.screen[self.row] = (line[:self.column] + text + line[self.column + len(text):])[:self.width]
+        self.column += len(text)
+
+    def write(self, text):
+        for sequence, row, column, command, plain in re.findall(r'(\033\[(?:(\d+);(\d+))?([HJKhl]|\?\d+[hl]))|([^\033]+)', text):
+            if plain:
+                self.put(plain)
+            elif command == 'H':
+                self.row, self.column = int(row or 1) - 1, int(column or 1) - 1
+            elif command == 'J':
+                self.screen = [' ' * self.width for _ in range(self.height)]
+            elif command == 'K':
+                self.put(' ' * (self.width - self.column))
+        return super().write(text)
+
+    # lines
+    #
+    # @return   Returns the lines on the screen without trailing spaces.
+    def lines(self):
+        return [line.rstrip() for line in self.screen]
+
+
+@pytest.fixture
+def terminal(monkeypatch):
+    terminal = Terminal(60, 20)
+    monkeypatch.setattr(dashboard_module, 'get_terminal_size', lambda: os.terminal_size((terminal.width, terminal.height)))
+    return terminal
+
+
+# values
+#
+# @param    float   time    Seconds since the start.
+# @param    float   soc     State of charge.
+#
+# @return   Returns the values of an output (see Dashboard.update).
+def values(time, soc):
+    return {'time_executed': time, 'soc': soc, 'secsleft': 3600, 'consumption': 10, 'spp': 360, 'sfb': 36000, 'power': 5.5,
+        'predicted': -1, 'phase': {'kind': 'discharge', 'time_start': 0, 'rate': -10.0, 'until': 3600}}
+
+
+# assert_frame
+#
+# Checks that the terminal shows the current frame of the dashboard.
+#
+# @param    Dashboard   dashboard   Dashboard.
+# @param    Terminal    terminal    Terminal of the dashboard.
+#
+# @return   None
+def assert_frame(dashboard, terminal):
+    lines = [line.rstrip() for line in dashboard.compose(terminal.width, terminal.height)]
+    assert terminal.lines() == lines + [''] * (terminal.height - len(lines))
+
+
+# draw
+#
+# @param    Dashboard   dashboard   Dashboard.
+# @param    Terminal    terminal    Terminal of the dashboard.
+#
+# @return   Returns the characters written by the draw.
+def draw(dashboard, terminal):
+    written = len(terminal.getvalue())
+    dashboard.draw()
+    return terminal.getvalue()[written:]
+
+
+def test_sparkline():
+    assert sparkline([0, 50, 100, None], 0, 100, '_.-=+*#@') == '_+@ '
+    assert sparkline([-5, 105], 0, 100, '_.-=+*#@') == '_@'
+    assert sparkline([3, 3], 3, 3, '_.-=+*#@') == '__'
+
+
+def test_only_the_changed_cells_are_written(terminal):
+    # the thread does not draw during the test
+    dashboard = Dashboard(0.001, True, False, 500, terminal)
+    try:
+        dashboard.update(values(0, 80))
+        dashboard.write('first line\nsecond ')
+        frame = draw(dashboard, terminal)
+        assert frame.startswith('\033[H\033[2J')
+        assert_frame(dashboard, terminal)
+        assert 'first line' in terminal.lines()
+        assert 'second' not in frame
+
+        # nothing changed: nothing is written
+        assert draw(dashboard, terminal) == ''
+
+        dashboard.update(values(10, 79.99))
+        dashboard.write('line\n')
+        frame = draw(dashboard, terminal)
+        assert '\033[2J' not in frame
+        assert len(frame) < 100
+        assert_frame(dashboard, terminal)
+        assert 'second line' in terminal.lines()
+        assert dict(dashboard.statistics())['dashboard_frames'] == 2
+    finally:
+        dashboard.close()
+
+
+def test_shorter_lines_are_cleared(terminal):
+    dashboard = Dashboard(0.001, False, False, 500, terminal)
+    try:
+        dashboard.update(values(0, 80))
+        dashboard.write('a long line of output\n')
+        draw(dashboard, terminal)
+        dashboard.messages.clear()
+        dashboard.write('short\n')
+        draw(dashboard, terminal)
+        assert_frame(dashboard, terminal)
+        assert 'a long line of output' not in terminal.lines()
+        assert 'short' in terminal.lines()
+
+        # a new size redraws the whole screen
+        terminal.width = 40
+        terminal.screen = [line[:40] for line in terminal.screen]
+        frame = draw(dashboard, terminal)
+        assert frame.startswith('\033[H\033[2J')
+        assert_frame(dashboard, terminal)
+    finally:
+        dashboard.close()
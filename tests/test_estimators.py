@@ -0,0 +1,110 @@
+#-------------------------------------------------------------------------------
+# BatterySoCMonitor - tests of the consumption estimators
+#-------------------------------------------------------------------------------
+# @author: Andreas Menzel
+# @license: MIT License
+# @copyright: Copyright (c) 2021 Andreas Menzel
+#-------------------------------------------------------------------------------
+
+import pytest
+
+from batterysocmonitor.benchmark import estimator_benchmarks
+from batterysocmonitor.cli import check_arguments, create_parser, translate_arguments
+from batterysocmonitor.estimators import create_estimator
+
+
+# discharge
+#
+# @param    int     samples     Number of samples.
+#
+# @return   Returns (seconds, state of charge) samples of a discharge with
+#               10 %/h (one sample every 36 seconds, 0.1 % per sample).
+def discharge(samples):
+    return [(sample * 36, round(100 - sample / 10, 2)) for sample in range(samples)]
+
+
+def parse(argv):
+    return create_parser().parse_args(translate_arguments(argv))
+
+
+def test_window_must_be_positive():
+    for estimator in ['anchor', 'streaming', 'regression']:
+        with pytest.raises(ValueError):
+            create_estimator(estimator, 0)
+    with pytest.raises(ValueError):
+        create_estimator('regression', 2)
+
+
+def test_window_is_checked_by_the_cli():
+    assert check_arguments(parse(['monitor', '--window', '0'])) == '--window must be at least 1'
+    assert check_arguments(parse(['analyze', '--window', '-1', 'x.log'])) == '--window must be at least 1'
+    assert check_arguments(parse(['monitor', '--estimator', 'regression', '--window', '2'])) == '--window must be at least 3 for --estimator regression'
+    assert check_arguments(parse(['monitor', '--estimator', 'streaming', '--window', '1'])) == None
+    assert check_arguments(parse(['monitor', '--estimator', 'regression', '--window', '3'])) == None
+
+
+def test_anchor_estimator():
+    estimator = create_estimator('anchor', 360)
+    assert estimator.final() == (-1, -1, -1)
+    assert estimator.update(0, 100) == (-1, -1, -1)
+    assert estimator.update(30, 100) == (-1, -1, -1)
+    # one change: consumption since the first sample
+    assert estimator.update(36, 99.9) == (10, 360, 36000)
+    assert estimator.final() == (-1, -1, -1)
+    for seconds, soc in discharge(100)[2:]:
+        result = estimator.update(seconds, soc)
+    assert result == (10, 360, 36000)
+    assert estimator.final() == result
+
+
+def test_streaming_estimator():
+    estimator = create_estimator('streaming', 360)
+    assert estimator.update(0, 100) == (-1, -1, -1)
+    for seconds, soc in discharge(1000)[1:]:
+        result = estimator.update(seconds, soc)
+    assert result == (10, 360, 36000)
+    statistics = dict(estimator.statistics())
+    assert statistics['consumption_ewma'] == 10
+    assert statistics['consumption_p50'] == 10
+    assert statistics['soc_min'] == 0.1
+    assert statistics['soc_max'] == 100
+
+
+def test_streaming_estimator_with_a_window_of_one_sample():
+    # the moving average follows the last consumption
+    estimator = create_estimator('streaming', 1)
+    assert estimator.alpha == 1
+    for seconds, soc in discharge(10):
+        estimator.update(seconds, soc)
+    estimator.update(360, 98.9) # 20 %/h
+    assert dict(estimator.statistics())['consumption_ewma'] == 20
+
+
+def test_streaming_estimator_without_time():
+    # samples at the same time do not divide by zero
+    estimator = create_estimator('streaming', 360)
+    assert estimator.update(0, 100) == (-1, -1, -1)
+    assert estimator.update(0, 99) == (-1, -1, -1)
+    assert dict(estimator.statistics())['consumption_ewma'] == -1
+
+
+def test_regression_estimator():
+    pytest.importorskip('numpy')
+    estimator = create_estimator('regression', 3)
+    assert estimator.update(0, 100) == (-1, -1, -1)
+    assert estimator.update(36, 99.9) == (-1, -1, -1)
+    for seconds, soc in discharge(100)[2:]:
+        result = estimator.update(seconds, soc)
+    assert result == (10, 360, 36000)
+    assert estimator.final() == result
+    # the ring buffers do not grow with the samples
+    assert len(estimator.times.ring) == 3
+
+
+def test_estimator_update_does_not_grow_with_the_samples():
+    durations, ratios = estimator_benchmarks(3, 500)
+    assert [name for name, runs in durations][:4] == ['anchor_short', 'anchor_long', 'streaming_short', 'streaming_long']
+    for name, runs in ratios:
+        # 10 if an update was proportional to the samples (loose bound for
+        #     noisy machines)
+        assert sorted(runs)[1] < 3, name
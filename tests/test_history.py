@@ -0,0 +1,114 @@
+#-------------------------------------------------------------------------------
+# BatterySoCMonitor - tests of the history
+#-------------------------------------------------------------------------------
+# @author: Andreas Menzel
+# @license: MIT License
+# @copyright: Copyright (c) 2021 Andreas Menzel
+#-------------------------------------------------------------------------------
+
+import pytest
+
+from conftest import run_command
+from batterysocmonitor.history import DischargeTracker, HistoryStore
+
+day = 86400
+
+
+# run
+#
+# @param    float   time_started    Start of the run (unix timestamp).
+# @param    float   hours           Runtime of a full charge.
+# @param    float   energy_full     Energy of a full charge (Wh) or None.
+#
+# @return   Returns the summary of a run (see HistoryStore.add_run).
+def run(time_started, hours, energy_full):
+    return {'time_started': time_started, 'seconds': 3600, 'soc_start': 100, 'soc_end': 80, 'consumption': 100 / hours,
+        'consumption_sfb': hours * 3600, 'energy_full': energy_full, 'energy_full_design': 50, 'sensor': 'sysfs', 'version': '3.0.0'}
+
+
+def test_history_store(tmp_path):
+    filename = str(tmp_path / 'history.db')
+    store = HistoryStore(filename)
+    battery = store.battery('Model:42', 'Model', '42')
+    assert store.battery('Model:42', 'Model', '42') == battery
+    assert store.battery('other', None, None) != battery
+    assert store.model(battery, 0) == {'runs': 0, 'curve': {}}
+
+    store.add_run(battery, run(1000, 10, 50), {99: 30, 98: 40})
+    store.add_run(battery, run(1000 + 365 * day, 9, 45), {99: 50})
+    store.close()
+
+    # the fits and the curve are stored
+    store = HistoryStore(filename)
+    model = store.model(battery, 1000 + 365 * day)
+    store.close()
+    assert model['runs'] == 2
+    assert model['runtime'] == pytest.approx(9)
+    assert model['runtime_mean'] == pytest.approx(9.5)
+    assert model['runtime_per_year'] == pytest.approx(-1)
+    assert model['health'] == pytest.approx(90)
+    assert model['health_per_year'] == pytest.approx(-10)
+    assert model['curve'] == {99: 40, 98: 40}
+
+
+def test_run_without_consumption(tmp_path):
+    store = HistoryStore(str(tmp_path / 'history.db'))
+    battery = store.battery('BAT0@host', None, None)
+    summary = run(1000, 10, None)
+    summary['consumption_sfb'] = -1
+    store.add_run(battery, summary, {})
+    model = store.model(battery, 2000)
+    store.close()
+    assert model == {'runs': 1, 'curve': {}}
+
+
+def test_discharge_tracker_without_history():
+    tracker = DischargeTracker({'runs': 0, 'curve': {}})
+    assert tracker.predict(50, 10) == -1
+
+    # runtime of a full charge only: the same seconds for every percent
+    tracker = DischargeTracker({'runs': 1, 'runtime': 10, 'runtime_mean': 10, 'curve': {}})
+    assert tracker.predict(50.5, 10) == 40.5 * 360
+
+
+def test_discharge_tracker_scales_the_curve():
+    curve = dict((percent, 36) for percent in range(101))
+    tracker = DischargeTracker({'runs': 1, 'curve': curve})
+    assert tracker.predict(50, 40) == 10 * 36
+
+    # the run takes twice as long per percent as the stored curve (the first
+    #     percent is incomplete)
+    for time, soc in [(0, 60.5), (72, 59.9), (108, 59.4), (144, 58.9), (216, 57.9)]:
+        tracker.update(time, soc, False)
+    assert tracker.seconds == {59: 72, 58: 72}
+    assert tracker.predict(58, 48) == 2 * 10 * 36
+
+
+def test_discharge_tracker_ignores_gaps():
+    tracker = DischargeTracker({'runs': 1, 'curve': {}})
+    tracker.update(0, 60, False)
+    tracker.update(36, 59, False)
+    # charging or a gap of the samples: the next percent is incomplete
+    tracker.update(72, 59.5, True)
+    tracker.update(7200, 58, False)
+    tracker.interrupt()
+    tracker.update(9000, 57, False)
+    tracker.update(9036, 56, False)
+    assert tracker.seconds == {}
+    tracker.update(9072, 55, False)
+    assert tracker.seconds == {56: 36}
+
+
+def test_monitor_with_history(tmp_path):
+    arguments = ['--simulate', 'synthetic:360:60', '--sample_rate', '10', '--output_rate', '10', '--minimum_soc', '50', '--history', 'history.db']
+    first = run_command(arguments, cwd=str(tmp_path))
+    assert first.returncode == 0, first.stderr
+    assert '# history_runs\t:\t0' in first.stdout
+    assert '# history_predicted\t:\t-1' in first.stdout
+
+    second = run_command(arguments, cwd=str(tmp_path))
+    assert second.returncode == 0, second.stderr
+    assert '# history_runs\t:\t1' in second.stdout
+    # 10% at 360 %/h
+    assert '# history_predicted\t:\t100' in second.stdout
+    assert '# history_runs\t:\t2' in second.stdout
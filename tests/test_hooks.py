@@ -0,0 +1,95 @@
+#-------------------------------------------------------------------------------
+# BatterySoCMonitor - tests of the commands and events
+#-------------------------------------------------------------------------------
+# @author: Andreas Menzel
+# @license: MIT License
+# @copyright: Copyright (c) 2021 Andreas Menzel
+#-------------------------------------------------------------------------------
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conftest import code_directory
+from batterysocmonitor.hooks import Event, HookRunner, parse_events
+
+
+def test_hook_runner(capsys):
+    runner = HookRunner(2, 5)
+    runner.submit('ok', 'echo hello')
+    runner.submit('failed', 'exit 3')
+    runner.submit('empty', '')
+    runner.submit('none', None)
+    runner.wait()
+
+    output = capsys.readouterr().out
+    assert '# hook\tok\texit 0\t' in output
+    assert '# hook |\thello' in output
+    assert '# hook\tfailed\texit 3\t' in output
+    assert dict(runner.statistics()) == {'hooks_executed': 2, 'hooks_failed': 1, 'hooks_timed_out': 0}
+
+
+def test_hook_timeout(capsys):
+    runner = HookRunner(1, 0.2)
+    # the child of the shell is killed as well
+    runner.submit('slow', 'sleep 10 & sleep 10')
+    runner.wait()
+
+    assert '# hook\tslow\ttimeout\t' in capsys.readouterr().out
+    assert runner.timed_out == 1
+
+
+def test_event_fires_when_the_condition_becomes_true():
+    event = Event('soc <= 50', 'true', False)
+    fired = [event.check({'soc': soc}) for soc in [60, 50, 40, 55, 45]]
+    assert fired == [False, True, False, False, True]
+
+
+def test_event_ignores_unknown_values():
+    event = Event('consumption>10', 'true', False)
+    assert event.check({'consumption': -1}) == False
+    assert event.check({'consumption': None}) == False
+    assert event.check({'consumption': 12}) == True
+
+
+def test_invalid_events():
+    for condition in ['soc', 'temperature<10', 'soc<low']:
+        with pytest.raises(ValueError):
+            parse_events([(condition, 'true')], None)
+    events = parse_events([('soc<10', 'a')], [('soc<5', 'b')])
+    assert [event.terminate for event in events] == [False, True]
+
+
+# copies the log-file when a command is submitted (output that is still
+#     buffered would be missing in the copy)
+script = '''
+import shutil
+import sys
+from batterysocmonitor import hooks
+from batterysocmonitor.cli import main
+
+submit = hooks.HookRunner.submit
+def copy_and_submit(self, name, command):
+    if name == 'cmd_min_soc':
+        shutil.copy('run.log', 'copy.log')
+    submit(self, name, command)
+hooks.HookRunner.submit = copy_and_submit
+main(sys.argv[1:])
+'''
+
+
+def test_log_file_is_complete_before_the_end_commands(tmp_path):
+    env = dict(os.environ)
+    env['PYTHONPATH'] = code_directory + os.pathsep + env.get('PYTHONPATH', '')
+    process = subprocess.run([sys.executable, '-c', script, '--simulate', 'synthetic:360:60', '--sample_rate', '10', '--output_rate', '10',
+        '--minimum_soc', '50', '--log_file', 'run.log', '--log_flush_size', '1000000', '--log_flush_interval', '3600', '--cmd_min_soc', 'true'],
+        env=env, cwd=str(tmp_path), stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, timeout=60)
+    assert process.returncode == 0, process.stderr
+
+    copy = (tmp_path / 'copy.log').read_text()
+    assert '# script_terminated_at' in copy
+    assert '\n100\t50.0\t' in copy
+    assert '# phase\tdischarge' in copy
+    assert '# hook\tcmd_min_soc\texit 0' in (tmp_path / 'run.log').read_text()
@@ -0,0 +1,114 @@
+#-------------------------------------------------------------------------------
+# BatterySoCMonitor - tests of the log-files
+#-------------------------------------------------------------------------------
+# @author: Andreas Menzel
+# @license: MIT License
+# @copyright: Copyright (c) 2021 Andreas Menzel
+#-------------------------------------------------------------------------------
+
+import pytest
+
+from batterysocmonitor.logfile import BinaryRecords, convert, human_form_to_percentage, is_binary_log, percentage_to_human_form, read_binary_log, read_log, resolve_percentage
+
+
+def test_percentage_round_trip():
+    for percent in [0, 0.01, 9.5, 30.08, 30.8, 99.99, 100]:
+        text = percentage_to_human_form(percent)
+        assert len(text) == 7
+        assert human_form_to_percentage(text) == percent
+
+
+def test_ambiguous_percentage_is_resolved_by_the_previous_value():
+    # 99.09 was written as 99.90% before version 3.0.0
+    assert resolve_percentage(' 99.90%', 99.2) == (99.09, True)
+    assert resolve_percentage(' 99.90%', 99.95) == (99.9, False)
+    assert resolve_percentage(' 99.90%', None) == (99.9, False)
+    assert resolve_percentage(' 99.95%', 99.2) == (99.95, False)
+
+
+def test_read_log_corrects_old_beautified_logs(tmp_path):
+    filename = tmp_path / 'old.log'
+    filename.write_text('### BatterySoCMonitor version 2.3.1\n'
+        '# beautify\t:\tTrue\n\n'
+        '00:00:00\t 99.20%\t10:00:00\n'
+        '00:00:10\t 99.10%\t10:00:00\n'
+        '00:00:20\t 99.90%\t10:00:00\n')
+    info = {}
+    socs = [sample.soc for sample in read_log(str(filename), info)]
+    assert socs == [99.2, 99.1, 99.09]
+    assert info['corrected_percentages'] == 1
+
+
+def test_convert_round_trip(tmp_path):
+    text = tmp_path / 'run.log'
+    text.write_text('# Welcome to BatterySoCMonitor version 3.0.0!\n'
+        '# sample_rate\t:\t10\n\n'
+        '# <sec>\t<soc>\t<until>\t<cons>\t<sec/%>\t<sec/100%>\t<W>\n'
+        '0\t100.0\t36000\t-1\t-1\t-1\t7.5\n'
+        '10\t99.97\t35990\t10.8\t333\t33333\t-1\n'
+        '20\t99.94\t35980\t10.8\t333\t33333\t8.125\n')
+    binary = tmp_path / 'run.bin'
+    back = tmp_path / 'back.log'
+
+    convert(str(text), str(binary), 4096, 60)
+    assert is_binary_log(str(binary))
+    header, records = read_binary_log(str(binary))
+    assert header['parameters']['sample_rate'] == '10'
+    assert [record[6] for record in records][::2] == [7.5, 8.125]
+    # unknown power
+    assert records[1][6] != records[1][6]
+
+    convert(str(binary), str(back), 4096, 60)
+    info = {}
+    assert list(read_log(str(back), info)) == list(read_log(str(text), {}))
+    assert info['version'] == '3.0.0'
+    assert info['parameters']['sample_rate'] == '10'
+
+
+def test_convert_round_trip_of_sub_second_times(tmp_path):
+    text = tmp_path / 'run.log'
+    text.write_text('# Welcome to BatterySoCMonitor version 3.0.0!\n'
+        '# sample_rate\t:\t0.5\n\n'
+        '# <sec>\t<soc>\t<until>\t<cons>\t<sec/%>\t<sec/100%>\n'
+        '0\t100.0\t36000\t-1\t-1\t-1\n'
+        '0.5\t99.99\t35990\t72.0\t50\t5000\n'
+        '1.001\t99.98\t35980\t71.93\t50\t5005\n')
+    binary = tmp_path / 'run.bin'
+    back = tmp_path / 'back.log'
+
+    convert(str(text), str(binary), 4096, 60)
+    convert(str(binary), str(back), 4096, 60)
+    assert [sample.time for sample in read_log(str(back), {})] == [0, 0.5, 1.001]
+    assert '\n0\t100.0\t' in back.read_text()
+
+
+def test_convert_does_not_overwrite(tmp_path):
+    text = tmp_path / 'run.log'
+    text.write_text('# Welcome to BatterySoCMonitor version 3.0.0!\n\n0\t100.0\t36000\t-1\t-1\t-1\n')
+    output = tmp_path / 'run.bin'
+    output.write_text('keep')
+
+    with pytest.raises(RuntimeError):
+        convert(str(text), str(output), 4096, 60)
+    assert output.read_text() == 'keep'
+    with pytest.raises(RuntimeError):
+        convert(str(text), str(text), 4096, 60, force=True)
+
+    convert(str(text), str(output), 4096, 60, force=True)
+    assert is_binary_log(str(output))
+
+
+def test_binary_records_without_numpy(tmp_path, monkeypatch):
+    # the fallback of read_binary_log
+    import batterysocmonitor.estimators as estimators
+    monkeypatch.setattr(estimators, 'load_numpy', lambda: None)
+
+    text = tmp_path / 'run.log'
+    text.write_text('# Welcome to BatterySoCMonitor version 3.0.0!\n\n0\t100.0\t36000\t-1\t-1\t-1\n10\t99.5\t35000\t-1\t-1\t-1\n')
+    binary = tmp_path / 'run.bin'
+    convert(str(text), str(binary), 4096, 60)
+
+    header, records = read_binary_log(str(binary))
+    assert isinstance(records, BinaryRecords)
+    assert len(records) == 2
+    assert records[-1][:3] == [10, 99.5, 35000]
@@ -0,0 +1,50 @@
+#-------------------------------------------------------------------------------
+# BatterySoCMonitor - memory of long runs
+#
+# Runs the monitor command with a synthetic battery (see --simulate) and
+#     compares the maximum resident set size of a short and a long run.
+#-------------------------------------------------------------------------------
+# @author: Andreas Menzel
+# @license: MIT License
+# @copyright: Copyright (c) 2021 Andreas Menzel
+#-------------------------------------------------------------------------------
+
+import os
+import subprocess
+import sys
+
+from conftest import code_directory
+
+# prints the maximum resident set size (in kB) after the monitor terminated
+script = '''
+import resource
+import sys
+from batterysocmonitor.cli import main
+try:
+    main(sys.argv[1:])
+finally:
+    sys.stderr.write('maxrss ' + str(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss) + '\\n')
+'''
+
+
+# max_rss
+#
+# @param    int     samples     Number of samples (one per second until the
+#                                   synthetic battery is empty).
+#
+# @return   Returns the maximum resident set size (in kB) of the run.
+def max_rss(samples):
+    env = dict(os.environ)
+    env['PYTHONPATH'] = code_directory + os.pathsep + env.get('PYTHONPATH', '')
+    process = subprocess.run([sys.executable, '-c', script, 'monitor', '--sample_rate', '1', '--output_rate', '100000',
+        '--simulate', 'synthetic:' + str(100 * 3600 / samples)], env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True)
+    return int(process.stderr.split('maxrss ')[-1])
+
+
+def test_memory_is_bounded_over_a_million_samples():
+    short = max_rss(10000)
+    long = max_rss(1000000)
+    # the estimator, the phases and the buffer of the log-file do not grow
+    #     with the run
+    assert long - short < 4 * 1024
+    assert long < 100 * 1024
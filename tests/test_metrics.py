@@ -0,0 +1,84 @@
+#-------------------------------------------------------------------------------
+# BatterySoCMonitor - tests of the metrics export
+#-------------------------------------------------------------------------------
+# @author: Andreas Menzel
+# @license: MIT License
+# @copyright: Copyright (c) 2021 Andreas Menzel
+#-------------------------------------------------------------------------------
+
+from urllib.request import urlopen
+
+import pytest
+
+from conftest import run_command
+from batterysocmonitor.metrics import MetricsExporter
+
+
+# scrape
+#
+# @param    MetricsExporter     exporter    Exporter.
+#
+# @return   Returns the metrics (name: value) and the types (name: type) of
+#               one scrape.
+def scrape(exporter):
+    with urlopen('http://127.0.0.1:' + str(exporter.port) + '/metrics', timeout=5) as response:
+        assert response.headers['Content-Type'].startswith('application/openmetrics-text')
+        lines = response.read().decode().splitlines()
+
+    assert lines[-1] == '# EOF'
+    values = {}
+    types = {}
+    for line in lines[:-1]:
+        if line.startswith('# TYPE '):
+            name, kind = line[len('# TYPE '):].split(' ')
+            types[name] = kind
+        elif not line.startswith('# HELP '):
+            name, value = line.split(' ')
+            family = name
+            if name.endswith('_total'):
+                family = name[:-len('_total')]
+                assert types[family] == 'counter'
+            assert family in types
+            values[name] = float(value)
+    return values, types
+
+
+@pytest.fixture
+def exporter():
+    exporter = MetricsExporter('127.0.0.1:0')
+    yield exporter
+    exporter.close()
+
+
+def test_scrape_before_the_first_sample(exporter):
+    values, types = scrape(exporter)
+    assert 'batterysocmonitor_soc_percent' not in values
+    assert values['process_resident_memory_bytes'] > 0
+    assert values['process_cpu_seconds_total'] > 0
+
+
+def test_scrape(exporter):
+    exporter.publish((60, 87.5, 24570, 3.42, 1052, 105263, None, 7, 0.001, 0, 0, 0.002, 3600))
+    values, types = scrape(exporter)
+    assert values['batterysocmonitor_soc_percent'] == 87.5
+    assert values['batterysocmonitor_consumption_percent_per_hour'] == 3.42
+    assert values['batterysocmonitor_samples_total'] == 7
+    assert values['batterysocmonitor_predicted_seconds'] == 3600
+    assert types['batterysocmonitor_samples'] == 'counter'
+    assert 'batterysocmonitor_power_watts' not in values
+
+
+def test_unknown_values_are_omitted(exporter):
+    exporter.publish((0, 100, -1, -1, -1, -1, None, 1, 0.001, 0, 0, 0, -1))
+    values, types = scrape(exporter)
+    assert values['batterysocmonitor_soc_percent'] == 100
+    for name in ['secsleft_seconds', 'consumption_percent_per_hour', 'seconds_per_percent', 'seconds_per_full_charge', 'predicted_seconds']:
+        assert 'batterysocmonitor_' + name not in values
+        assert 'batterysocmonitor_' + name not in types
+
+
+def test_monitor_with_metrics(tmp_path):
+    process = run_command(['--simulate', 'synthetic:360:60', '--sample_rate', '10', '--output_rate', '10', '--minimum_soc', '90',
+        '--metrics', '127.0.0.1:0'], cwd=str(tmp_path))
+    assert process.returncode == 0, process.stderr
+    assert '# script_terminated_at' in process.stdout
@@ -0,0 +1,35 @@
+#-------------------------------------------------------------------------------
+# BatterySoCMonitor - tests of the monitor command
+#-------------------------------------------------------------------------------
+# @author: Andreas Menzel
+# @license: MIT License
+# @copyright: Copyright (c) 2021 Andreas Menzel
+#-------------------------------------------------------------------------------
+
+import os
+import signal
+import subprocess
+import sys
+from time import sleep
+
+import pytest
+
+from conftest import code_directory
+
+
+@pytest.mark.skipif(sys.platform == 'win32', reason='no SIGTERM')
+def test_sigterm_writes_the_buffered_output(tmp_path):
+    env = dict(os.environ)
+    env['PYTHONPATH'] = code_directory + os.pathsep + env.get('PYTHONPATH', '')
+    # the synthetic battery lasts for years, all output stays in the buffer
+    process = subprocess.Popen([sys.executable, '-m', 'batterysocmonitor', '--simulate', 'synthetic:0.001', '--sample_rate', '1', '--output_rate', '1',
+        '--log_file', 'run.log', '--log_flush_size', '100000000', '--log_flush_interval', '100000'],
+        env=env, cwd=str(tmp_path), stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    sleep(1.5)
+    process.send_signal(signal.SIGTERM)
+    _, stderr = process.communicate(timeout=30)
+    assert process.returncode == 0, stderr
+
+    log = (tmp_path / 'run.log').read_text()
+    assert '# script_terminated_at' in log
+    assert log.count('\n') > 100
@@ -0,0 +1,72 @@
+#-------------------------------------------------------------------------------
+# BatterySoCMonitor - tests of the remote sources
+#-------------------------------------------------------------------------------
+# @author: Andreas Menzel
+# @license: MIT License
+# @copyright: Copyright (c) 2021 Andreas Menzel
+#-------------------------------------------------------------------------------
+
+import signal
+import socket
+import sys
+from time import sleep, monotonic
+
+import pytest
+
+from conftest import start_command
+
+
+# free_port
+#
+# @return   Returns a local port that is not in use.
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+# wait_for_port
+#
+# @param    int     port        Local port.
+# @param    float   timeout     Timeout (in seconds).
+#
+# @return   None
+def wait_for_port(port, timeout):
+    deadline = monotonic() + timeout
+    while True:
+        try:
+            socket.create_connection(('127.0.0.1', port), 1).close()
+            return
+        except OSError:
+            if monotonic() > deadline:
+                raise
+            sleep(0.1)
+
+
+@pytest.mark.skipif(sys.platform == 'win32', reason='no SIGINT')
+def test_sources_of_a_served_battery(tmp_path):
+    port = free_port()
+    unused_port = free_port()
+    server = start_command(['--serve', '127.0.0.1:' + str(port), '--simulate', 'synthetic:360:60', '--log_file', 'serve.log'], cwd=str(tmp_path))
+    try:
+        wait_for_port(port, 30)
+        client = start_command(['--sources', '127.0.0.1:' + str(port) + '@0.5', '127.0.0.1:' + str(unused_port) + '@0.5',
+            '--log_file', 'sources.log'], cwd=str(tmp_path))
+        sleep(2.5)
+        client.send_signal(signal.SIGINT)
+        stdout, stderr = client.communicate(timeout=30)
+        assert client.returncode == 0, stderr
+    finally:
+        server.send_signal(signal.SIGINT)
+        server.communicate(timeout=30)
+
+    source = '127.0.0.1:' + str(port)
+    rows = [line.split('\t') for line in stdout.splitlines() if line.startswith(source + '\t')]
+    assert len(rows) >= 3
+    socs = [float(row[2]) for row in rows]
+    assert socs == sorted(socs, reverse=True) and 55 < socs[-1] < 60
+    # the unused port is reported on every sample, the other source goes on
+    errors = [line for line in stdout.splitlines() if line.startswith('# 127.0.0.1:' + str(unused_port) + '\tERROR: ')]
+    assert len(errors) >= 3
+    assert '# misses\t' + source + '\t0' in stdout
+    assert stdout == (tmp_path / 'sources.log').read_text()
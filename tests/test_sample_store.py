@@ -0,0 +1,50 @@
+#-------------------------------------------------------------------------------
+# BatterySoCMonitor - tests of SampleStore
+#-------------------------------------------------------------------------------
+# @author: Andreas Menzel
+# @license: MIT License
+# @copyright: Copyright (c) 2021 Andreas Menzel
+#-------------------------------------------------------------------------------
+
+import pytest
+
+from batterysocmonitor.estimators import SampleStore
+
+
+def test_capacity_must_be_positive():
+    with pytest.raises(ValueError):
+        SampleStore('d', 0)
+    with pytest.raises(ValueError):
+        SampleStore('d', -1)
+
+
+def test_values_before_the_buffer_is_full():
+    store = SampleStore('d', 4)
+    for value in [1, 2, 3]:
+        store.append(value)
+    assert list(store.values()) == [1, 2, 3]
+    assert len(store) == 3
+
+
+def test_oldest_samples_are_overwritten():
+    store = SampleStore('q', 3)
+    indexes = [store.append(value) for value in range(10)]
+    assert indexes == list(range(10))
+    assert list(store.values()) == [7, 8, 9]
+    assert len(store) == 10
+    # the ring does not grow
+    assert len(store.ring) == 3
+
+
+def test_index_access():
+    store = SampleStore('d', 3)
+    for value in range(5):
+        store.append(value * 10)
+    assert store[2] == 20
+    assert store[4] == 40
+    with pytest.raises(IndexError):
+        store[1] # discarded
+    with pytest.raises(IndexError):
+        store[5] # not yet written
+    with pytest.raises(IndexError):
+        store[-1]
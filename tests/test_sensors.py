@@ -0,0 +1,145 @@
+#-------------------------------------------------------------------------------
+# BatterySoCMonitor - tests of the sensors
+#-------------------------------------------------------------------------------
+# @author: Andreas Menzel
+# @license: MIT License
+# @copyright: Copyright (c) 2021 Andreas Menzel
+#-------------------------------------------------------------------------------
+
+import os
+
+import pytest
+
+from conftest import run_command
+from batterysocmonitor.sensors import POWER_TIME_UNKNOWN, POWER_TIME_UNLIMITED, ReplaySensor, SysfsSensor
+from batterysocmonitor.timing import VirtualClock
+
+
+# write_log
+#
+# @param    Path    path    Filename of the log-file.
+# @param    list    rows    Data rows (tuples of the columns).
+#
+# @return   Returns the filename as a string.
+def write_log(path, rows):
+    path.write_text(''.join('\t'.join(str(column) for column in row) + '\n' for row in rows))
+    return str(path)
+
+
+def test_replay_sensor(tmp_path):
+    filename = write_log(tmp_path / 'replay.log', [
+        (0, 80, 7200, -1, -1, -1, 5.5),
+        (60, 79.9, -1, -1, -1, -1, 5.25),
+        (120, 79.9, -2, -1, -1, -1, -1),
+    ])
+    clock = VirtualClock(1000)
+    sensor = ReplaySensor(filename, clock)
+
+    battery = sensor.read()
+    assert (battery.percent, battery.secsleft, battery.power_plugged, battery.power_now) == (80, 7200, False, 5.5)
+    clock.sleep(60)
+    # unknown remaining time: unknown charger
+    battery = sensor.read()
+    assert (battery.percent, battery.secsleft, battery.power_plugged, battery.power_now) == (79.9, POWER_TIME_UNKNOWN, None, 5.25)
+    assert sensor.finished == False
+    clock.sleep(60)
+    battery = sensor.read()
+    assert (battery.secsleft, battery.power_plugged, battery.power_now) == (POWER_TIME_UNLIMITED, True, None)
+    assert sensor.finished == True
+    sensor.close()
+
+
+def test_replay_until_the_minimum_soc(tmp_path):
+    write_log(tmp_path / 'discharge.log', [(time, round(90 - time / 60, 1), 3600, -1, -1, -1, 4.5) for time in range(0, 600, 60)])
+    process = run_command(['--simulate', 'discharge.log', '--sample_rate', '60', '--output_rate', '60', '--minimum_soc', '85',
+        '--cmd_min_soc', 'echo minimum reached', '--cmd_max_soc', 'echo maximum reached', '--cmd_end', 'echo end'], cwd=str(tmp_path))
+    assert process.returncode == 0, process.stderr
+    assert '\n300\t85\t3600\t' in process.stdout
+    assert '360\t84' not in process.stdout
+    assert '# hook |\tminimum reached' in process.stdout
+    assert '# hook |\tend' in process.stdout
+    assert 'maximum reached' not in process.stdout
+
+
+def test_replay_until_the_maximum_soc(tmp_path):
+    write_log(tmp_path / 'charge.log', [(time, 50 + time / 60, -2, -1, -1, -1) for time in range(0, 600, 60)])
+    process = run_command(['--simulate', 'charge.log', '--sample_rate', '60', '--output_rate', '60', '--maximum_soc', '53',
+        '--cmd_min_soc', 'echo minimum reached', '--cmd_max_soc', 'echo maximum reached', '--cmd_end', 'echo end'], cwd=str(tmp_path))
+    assert process.returncode == 0, process.stderr
+    assert '\n180\t53\t-2\t' in process.stdout
+    assert '# phase\tcharge\t0\t180\t' in process.stdout
+    assert '# hook |\tmaximum reached' in process.stdout
+    assert '# hook |\tend' in process.stdout
+    assert 'minimum reached' not in process.stdout
+
+
+# power_supply
+#
+# Creates a fake /sys/class/power_supply.
+#
+# @param    Path    root        Directory of the power supplies.
+# @param    dict    supplies    Attributes (name: value) of each supply.
+#
+# @return   None
+def power_supply(root, supplies):
+    for supply, attributes in supplies.items():
+        (root / supply).mkdir(parents=True)
+        for attribute, value in attributes.items():
+            (root / supply / attribute).write_text(str(value) + '\n')
+
+
+def test_sysfs_sensor(tmp_path, monkeypatch):
+    power_supply(tmp_path, {
+        'AC': {'type': 'Mains', 'online': 0},
+        'BAT1': {'type': 'Battery', 'status': 'Discharging', 'capacity': 50, 'energy_now': 20000000, 'energy_full': 40000000,
+            'energy_full_design': 50000000, 'power_now': 5000000, 'voltage_now': 12000000, 'model_name': 'Model', 'serial_number': '42'},
+    })
+    monkeypatch.setattr(SysfsSensor, 'root', str(tmp_path))
+    assert SysfsSensor.find_batteries() == ['BAT1']
+
+    sensor = SysfsSensor()
+    battery = sensor.read()
+    assert (battery.percent, battery.secsleft, battery.power_plugged) == (50, 14400, False)
+    assert (battery.energy_now, battery.power_now, battery.energy_full_design) == (20, 5, 50)
+    assert sensor.identity() == ('Model:42', 'Model', '42')
+
+    # the open files are read again
+    (tmp_path / 'AC' / 'online').write_text('1\n')
+    (tmp_path / 'BAT1' / 'energy_now').write_text('30000000\n')
+    battery = sensor.read()
+    assert (battery.percent, battery.secsleft, battery.power_plugged) == (75, POWER_TIME_UNLIMITED, True)
+    sensor.close()
+
+
+def test_sysfs_sensor_with_charge(tmp_path, monkeypatch):
+    # charge (Ah) instead of energy (Wh), no charger
+    power_supply(tmp_path, {
+        'BAT0': {'type': 'Battery', 'status': 'Discharging', 'charge_now': 1000000, 'charge_full': 4000000, 'current_now': 500000, 'voltage_now': 10000000},
+    })
+    monkeypatch.setattr(SysfsSensor, 'root', str(tmp_path))
+
+    sensor = SysfsSensor('BAT0')
+    battery = sensor.read()
+    assert (battery.percent, battery.energy_now, battery.power_now, battery.power_plugged) == (25, 10, 5, False)
+    assert battery.secsleft == 7200
+    sensor.close()
+
+
+def test_sysfs_sensor_with_unreadable_files(tmp_path, monkeypatch):
+    power_supply(tmp_path, {
+        'AC': {'type': 'Mains', 'online': 1},
+        'BAT0': {'type': 'Battery', 'status': 'Discharging', 'capacity': 40},
+    })
+    monkeypatch.setattr(SysfsSensor, 'root', str(tmp_path))
+    with pytest.raises(RuntimeError):
+        SysfsSensor('BAT9')
+
+    sensor = SysfsSensor('BAT0')
+    # reading a directory fails like a removed device (ENODEV)
+    os.close(sensor.fd_online)
+    sensor.fd_online = os.open(str(tmp_path), os.O_RDONLY)
+    os.close(sensor.fds['capacity'])
+    sensor.fds['capacity'] = os.open(str(tmp_path), os.O_RDONLY)
+    battery = sensor.read()
+    assert (battery.percent, battery.secsleft, battery.power_plugged) == (None, POWER_TIME_UNKNOWN, False)
+    sensor.close()
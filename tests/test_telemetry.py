@@ -0,0 +1,98 @@
+#-------------------------------------------------------------------------------
+# BatterySoCMonitor - tests of the telemetry
+#-------------------------------------------------------------------------------
+# @author: Andreas Menzel
+# @license: MIT License
+# @copyright: Copyright (c) 2021 Andreas Menzel
+#-------------------------------------------------------------------------------
+
+import os
+
+import pytest
+
+from conftest import run_command
+from batterysocmonitor import telemetry as telemetry_module
+from batterysocmonitor.telemetry import LoadCollector, NetworkCollector, Telemetry, parse_collectors
+
+
+# FakeCollector
+#
+# Collector that takes cost seconds of a fake perf_counter.
+class FakeCollector:
+    def __init__(self, name, cost, clock):
+        self.name = name
+        self.cost = cost
+        self.clock = clock
+        self.calls = 0
+
+    def collect(self):
+        self.calls += 1
+        self.clock[0] += self.cost
+        return [(self.name, self.calls)]
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = [0]
+    monkeypatch.setattr(telemetry_module, 'perf_counter', lambda: clock[0])
+    return clock
+
+
+def test_parse_collectors():
+    collectors = parse_collectors([])
+    assert len(collectors) == len(telemetry_module.collector_classes)
+    assert all(required == False for _, _, required in collectors)
+    assert parse_collectors(['load', 'network/10']) == [(LoadCollector, 1, True), (NetworkCollector, 10, True)]
+    assert parse_collectors(['network']) == [(NetworkCollector, 5, True)]
+    for specification in ['temperature', 'load/0', 'load/x']:
+        with pytest.raises(ValueError):
+            parse_collectors([specification])
+
+
+def test_collectors_run_every_divisor_th_sample(clock):
+    fast = FakeCollector('fast', 0.001, clock)
+    slow = FakeCollector('slow', 0.001, clock)
+    telemetry = Telemetry([(fast, 1), (slow, 3)], 1)
+    lines = []
+    for sample in range(7):
+        telemetry.collect()
+        lines.append(telemetry.line())
+    assert (fast.calls, slow.calls) == (7, 3)
+    assert lines[0] == ['fast=1', 'slow=1']
+    # the latest values of all collectors
+    assert lines[1] == ['fast=2', 'slow=1']
+    assert telemetry.line() == []
+    assert telemetry.collector_names() == ['fast/1', 'slow/3']
+
+
+def test_budget_doubles_the_divisor_of_the_most_expensive_collector(clock):
+    cheap = FakeCollector('cheap', 0.0005, clock)
+    expensive = FakeCollector('expensive', 0.01, clock)
+    # 2 ms per sample
+    telemetry = Telemetry([(cheap, 1), (expensive, 1)], 0.002)
+    for sample in range(32):
+        telemetry.collect()
+    # 0.5 ms + 10 ms / 8 = 1.75 ms
+    assert telemetry.collector_names() == ['cheap/1', 'expensive/8']
+    assert telemetry.overhead() <= 0.002
+    statistics = dict(telemetry.statistics())
+    assert statistics['telemetry_divisor_changes'] == 3
+    assert statistics['telemetry_expensive_divisor'] == 8
+    assert statistics['telemetry_budget_ms'] == 2
+    assert statistics['telemetry_per_sample_ms'] < 3
+
+
+@pytest.mark.skipif(not hasattr(os, 'getloadavg'), reason='no load average')
+def test_monitor_with_telemetry(tmp_path):
+    process = run_command(['--simulate', 'synthetic:360:60', '--sample_rate', '10', '--output_rate', '10', '--minimum_soc', '57',
+        '--telemetry', 'load/2', '--log_file', 'run.log'], cwd=str(tmp_path))
+    assert process.returncode == 0, process.stderr
+    log = (tmp_path / 'run.log').read_text()
+    # written before the row of the sample, only when collected
+    assert '\n# telemetry\t0\tload_1=' in log
+    assert '\n# telemetry\t10\t' not in log
+    assert '\n# telemetry\t20\tload_1=' in log
+    assert log.index('# telemetry\t20\t') < log.index('\n20\t')
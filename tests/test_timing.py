@@ -0,0 +1,103 @@
+#-------------------------------------------------------------------------------
+# BatterySoCMonitor - tests of the timing
+#-------------------------------------------------------------------------------
+# @author: Andreas Menzel
+# @license: MIT License
+# @copyright: Copyright (c) 2021 Andreas Menzel
+#-------------------------------------------------------------------------------
+
+from conftest import run_command
+from batterysocmonitor.timing import Profiler, Scheduler, VirtualClock
+
+
+# SuspendingClock
+#
+# Virtual clock whose sleeps are delayed (late) or suspend the system
+#     (suspend, only the boot time clock advances).
+class SuspendingClock(VirtualClock):
+    def __init__(self, start):
+        super().__init__(start)
+        self.suspended = 0
+        self.late = 0
+        self.suspend = 0
+
+    def monotonic(self):
+        return self.now - self.suspended
+
+    def sleep(self, seconds):
+        self.now += seconds + self.late + self.suspend
+        self.suspended += self.suspend
+        self.late = 0
+        self.suspend = 0
+
+
+def test_scheduler_compensates_the_duration_of_a_tick():
+    clock = VirtualClock(1000)
+    scheduler = Scheduler(clock, 10)
+    times = []
+    for busy in [0.5, 3, 9.9]:
+        clock.sleep(busy)
+        assert scheduler.wait() == len(times) + 1
+        times.append(scheduler.elapsed())
+    assert times == [10, 20, 30]
+    statistics = dict(scheduler.statistics())
+    assert statistics['ticks'] == 4
+    assert statistics['missed_ticks'] == 0
+    assert statistics['overruns'] == 0
+    assert statistics['jitter_max_ms'] == 0
+
+
+def test_scheduler_skips_passed_deadlines():
+    clock = VirtualClock(1000)
+    scheduler = Scheduler(clock, 10)
+    # the tick took 25 seconds: the deadlines at 10 and 20 passed
+    clock.sleep(25)
+    assert scheduler.wait() == 2
+    assert scheduler.overruns == 1
+    assert scheduler.missed_ticks == 1
+    # the next deadline keeps the schedule
+    assert scheduler.wait() == 3
+    assert scheduler.elapsed() == 30
+
+
+def test_scheduler_detects_suspends():
+    clock = SuspendingClock(1000)
+    scheduler = Scheduler(clock, 10)
+    clock.late = 0.25
+    assert scheduler.wait() == 1
+    assert scheduler.jitter_max == 0.25
+    assert scheduler.suspends == 0
+
+    clock.suspend = 3600
+    assert scheduler.wait() == 362
+    assert scheduler.missed_ticks == 360
+    statistics = dict(scheduler.statistics())
+    assert statistics['suspends'] == 1
+    assert statistics['suspended_s'] == 3600
+
+
+def test_profiler():
+    profiler = Profiler()
+    for sample in range(3):
+        profiler.lap('sensor')
+        profiler.written += 1000
+        profiler.lap('format')
+        profiler.lap('sleep')
+    phases, usage = profiler.statistics(3)
+
+    calls = dict((phase[0], phase[1]) for phase in phases)
+    assert calls == {'sensor': 3, 'format': 3, 'write': 3, 'sleep': 3}
+    shares = [phase[5] for phase in phases if phase[0] != 'sleep']
+    assert abs(sum(shares) - 100) < 1
+    usage = dict(usage)
+    assert usage['cpu_s'] >= 0
+    assert usage['wakeups'] >= 0
+    assert usage['preemptions'] >= 0
+
+
+def test_profile_self(tmp_path):
+    process = run_command(['--simulate', 'synthetic:360:60', '--sample_rate', '10', '--output_rate', '10', '--minimum_soc', '90', '--profile_self'],
+        cwd=str(tmp_path))
+    assert process.returncode == 0, process.stderr
+    assert '# profile\tsensor\t' in process.stdout
+    assert '# profile_cpu_per_sample_ms\t:\t' in process.stdout
@@ -0,0 +1,86 @@
+#-------------------------------------------------------------------------------
+# BatterySoCMonitor - tests of the worker jobs
+#-------------------------------------------------------------------------------
+# @author: Andreas Menzel
+# @license: MIT License
+# @copyright: Copyright (c) 2021 Andreas Menzel
+#-------------------------------------------------------------------------------
+
+import os
+
+import pytest
+
+from conftest import run_command
+from batterysocmonitor.workers import parse_workload
+
+
+def test_parse_workload():
+    assert parse_workload('cpuLoad') == [('cpu', 100, None, None)]
+    assert parse_workload('cpu:50/60+idle/30+memory:128') == [('cpu', 50, None, 60), ('idle', '', None, 30), ('memory', 128, None, None)]
+
+
+def test_only_the_last_phase_can_be_without_duration():
+    with pytest.raises(ValueError):
+        parse_workload('cpu:50+idle/30')
+    with pytest.raises(ValueError):
+        parse_workload('cpu/0+idle')
+
+
+@pytest.mark.skipif(not hasattr(os, 'sched_getaffinity'), reason='no CPU affinity')
+def test_core_must_be_available():
+    core = min(os.sched_getaffinity(0))
+    assert parse_workload('cpu@' + str(core)) == [('cpu', 100, core, None)]
+    with pytest.raises(ValueError):
+        parse_workload('cpu@' + str(max(os.sched_getaffinity(0)) + 1))
+
+
+def test_measure_worker_utilization():
+    from multiprocessing import Process
+    from time import monotonic, sleep
+    from batterysocmonitor.workers import measure_worker_utilization, worker_workload
+
+    worker = Process(target=worker_workload, args=([('cpu', 100, None, None)], 1000))
+    started = monotonic()
+    worker.start()
+    try:
+        sleep(0.5)
+        utilization = measure_worker_utilization([('cpu', started)], [worker])
+    finally:
+        worker.terminate()
+        worker.join()
+    assert utilization[0][0] == 'cpu'
+    assert 0 < utilization[0][1] <= 100 * os.cpu_count() + 1
+
+
+def test_measure_worker_utilization_of_a_finished_worker():
+    from batterysocmonitor.workers import measure_worker_utilization
+
+    class Finished:
+        pid = 2**22 + 1 # above the maximum pid of Linux
+
+    assert measure_worker_utilization([('cpu', 0)], [Finished()]) == [('cpu', -1)]
+
+
+@pytest.mark.skipif(not hasattr(os, 'sched_getaffinity') or len(os.sched_getaffinity(0)) < 2, reason='needs at least 2 cores')
+def test_affinity_is_restored_after_a_pinned_phase():
+    from multiprocessing import Process
+    from time import sleep
+    from batterysocmonitor.workers import worker_workload
+
+    cores = os.sched_getaffinity(0)
+    worker = Process(target=worker_workload, args=([('idle', '', min(cores), 0.1), ('idle', '', None, None)], 1000))
+    worker.start()
+    try:
+        sleep(0.5)
+        assert os.sched_getaffinity(worker.pid) == cores
+    finally:
+        worker.terminate()
+        worker.join()
+
+
+def test_workers_are_terminated_at_the_end():
+    process = run_command(['--simulate', 'synthetic:36000', '--sample_rate', '1', '--workers', 'cpu:10/1', '--cmd_end', 'echo END', '-v'])
+    assert process.returncode == 0, process.stderr
+    assert 'END' in process.stdout
+    assert '# worker\t:\tcpu:10/1\t' in process.stdout
+    assert process.stdout.rstrip().endswith('# Goodbye!')